@@ -26,6 +26,9 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, confusion_matrix
 import pickle
 
+from src.database.drilldown import load_empresa_drilldown
+from src.database.queries import load_resumo_geral
+
 # Configuração SSL
 try:
     _create_unverified_https_context = ssl._create_unverified_context
@@ -197,85 +200,23 @@ def verificar_colunas_tabela(_engine, tabela):
         st.sidebar.warning(f"Não foi possível verificar colunas: {str(e)[:50]}")
         return []
 
-@st.cache_data(ttl=3600)
 def carregar_resumo_geral(_engine):
-    """Carrega dados agregados iniciais (rápido)."""
+    """Carrega dados agregados iniciais (rápido).
+
+    As agregações independentes (panorama, distribuição de risco, top
+    municípios, UFs) rodam em paralelo no pool de conexões, com tempo por
+    query em resumo['timings'] (load_resumo_geral, src/database/queries.py).
+    O resultado fica em cache até dimp_score_final mudar.
+    """
     if _engine is None:
         return {}
     
-    # Verificar colunas disponíveis
-    colunas_disponiveis = verificar_colunas_tabela(_engine, 'teste.dimp_score_final')
-    
-    resumo = {}
-    resumo['colunas_disponiveis'] = colunas_disponiveis
-    
     try:
-        # Panorama Geral
-        query_panorama = """
-        SELECT 
-            COUNT(DISTINCT cnpj) AS total_empresas,
-            COUNT(DISTINCT CASE WHEN classificacao_risco = 'ALTO' THEN cnpj END) AS empresas_alto_risco,
-            COUNT(DISTINCT CASE WHEN classificacao_risco = 'MÉDIO-ALTO' THEN cnpj END) AS empresas_medio_alto,
-            CAST(SUM(total_geral) AS DOUBLE) AS volume_total,
-            CAST(SUM(total_recebido_cpf) AS DOUBLE) AS volume_cpf,
-            CAST(SUM(total_recebido_cnpj) AS DOUBLE) AS volume_cnpj,
-            CAST(AVG(perc_recebido_cpf) AS DOUBLE) AS media_perc_cpf,
-            CAST(AVG(score_risco_final) AS DOUBLE) AS media_score,
-            COUNT(DISTINCT CASE WHEN perc_recebido_cpf >= 80 THEN cnpj END) AS empresas_80pct_cpf
-        FROM teste.dimp_score_final
-        """
-        
-        df_panorama = pd.read_sql(query_panorama, _engine)
-        resumo['panorama'] = df_panorama.to_dict('records')[0] if not df_panorama.empty else {}
-        
-        # Distribuição por Risco
-        query_dist_risco = """
-        SELECT 
-            classificacao_risco,
-            COUNT(*) AS qtd_empresas,
-            CAST(SUM(total_recebido_cpf) AS DOUBLE) AS volume_cpf,
-            CAST(AVG(score_risco_final) AS DOUBLE) AS score_medio
-        FROM teste.dimp_score_final
-        GROUP BY classificacao_risco
-        """
-        
-        resumo['dist_risco'] = pd.read_sql(query_dist_risco, _engine)
-        
-        # Top 20 Municípios
-        query_municipios = """
-        SELECT 
-            municipio,
-            uf,
-            COUNT(DISTINCT cnpj) AS qtd_empresas,
-            CAST(SUM(total_recebido_cpf) AS DOUBLE) AS volume_cpf
-        FROM teste.dimp_score_final
-        WHERE municipio IS NOT NULL
-        GROUP BY municipio, uf
-        ORDER BY volume_cpf DESC
-        LIMIT 20
-        """
-        
-        resumo['top_municipios'] = pd.read_sql(query_municipios, _engine)
-        
-        # Distribuição por UF (substitui GERFE que não existe)
-        query_uf = """
-        SELECT 
-            uf,
-            COUNT(*) AS qtd_empresas,
-            CAST(SUM(total_recebido_cpf) AS DOUBLE) AS volume_cpf,
-            CAST(AVG(score_risco_final) AS DOUBLE) AS score_medio
-        FROM teste.dimp_score_final
-        WHERE uf IS NOT NULL
-        GROUP BY uf
-        ORDER BY volume_cpf DESC
-        """
-        
-        resumo['por_uf'] = pd.read_sql(query_uf, _engine)
-        
+        resumo = load_resumo_geral(_engine)
         st.sidebar.success("✅ Resumo geral carregado!")
-        
     except Exception as e:
         st.sidebar.error(f"Erro ao carregar resumo: {str(e)[:100]}")
+        resumo = {}
     
     return resumo
 
@@ -303,87 +244,20 @@ def carregar_lista_empresas(_engine):
         st.error(f"Erro ao carregar lista: {str(e)}")
         return pd.DataFrame()
 
-@st.cache_data(ttl=600)
-@st.cache_data(ttl=600)
 def carregar_detalhes_empresa(_engine, cnpj):
-    """Carrega detalhes completos de uma empresa específica (sob demanda)."""
-    detalhes = {}
-    
-    try:
-        # Dados principais
-        query_principal = f"""
-        SELECT *
-        FROM teste.dimp_score_final
-        WHERE cnpj = '{cnpj}'
-        """
-        detalhes['principal'] = pd.read_sql(query_principal, _engine)
-        
-        # Sócios que recebem
-        query_socios = f"""
-        SELECT 
-            cpf_socio,
-            nome_socio,
-            nm_qualificacao,
-            CAST(perc_participacao AS DOUBLE) AS perc_participacao,
-            CAST(SUM(vl_total) AS DOUBLE) AS total_recebido,
-            COUNT(DISTINCT referencia) AS meses_recebeu
-        FROM teste.dimp_pagamentos_cpf
-        WHERE cnpj = '{cnpj}'
-        GROUP BY cpf_socio, nome_socio, nm_qualificacao, perc_participacao
-        ORDER BY total_recebido DESC
-        """
-        detalhes['socios'] = pd.read_sql(query_socios, _engine)
-        
-        # Evolução mensal
-        query_evolucao = f"""
-        WITH cnpj_pagtos AS (
-            SELECT referencia, CAST(SUM(vl_total) AS DOUBLE) AS vl_cnpj
-            FROM teste.dimp_pagamentos_cnpj
-            WHERE cnpj = '{cnpj}'
-            GROUP BY referencia
-        ),
-        cpf_pagtos AS (
-            SELECT referencia, CAST(SUM(vl_total) AS DOUBLE) AS vl_cpf
-            FROM teste.dimp_pagamentos_cpf
-            WHERE cnpj = '{cnpj}'
-            GROUP BY referencia
-        )
-        SELECT 
-            COALESCE(c.referencia, p.referencia) AS referencia,
-            COALESCE(c.vl_cnpj, 0) AS vl_cnpj,
-            COALESCE(p.vl_cpf, 0) AS vl_cpf
-        FROM cnpj_pagtos c
-        FULL OUTER JOIN cpf_pagtos p ON c.referencia = p.referencia
-        ORDER BY referencia
-        """
-        detalhes['evolucao'] = pd.read_sql(query_evolucao, _engine)
-        
-        # Operações suspeitas - CORRIGIDO
-        query_operacoes = f"""
-        SELECT 
-            referencia,
-            identificador,
-            tipo_identificador,
-            nome_socio,
-            nm_qualificacao,
-            CAST(vl_credito AS DOUBLE) AS vl_credito,
-            CAST(vl_debito AS DOUBLE) AS vl_debito,
-            CAST(vl_pix AS DOUBLE) AS vl_pix,
-            CAST(vl_boleto AS DOUBLE) AS vl_boleto,
-            CAST(vl_transferencia AS DOUBLE) AS vl_transferencia,
-            CAST(vl_dinheiro AS DOUBLE) AS vl_dinheiro,
-            CAST(vl_total AS DOUBLE) AS vl_total
-        FROM teste.dimp_operacoes_suspeitas
-        WHERE cnpj = '{cnpj}'
-        ORDER BY referencia DESC, vl_total DESC
-        LIMIT 100
-        """
-        detalhes['operacoes'] = pd.read_sql(query_operacoes, _engine)
-        
-    except Exception as e:
-        st.error(f"Erro ao carregar detalhes: {str(e)}")
+    """Carrega detalhes completos de uma empresa específica (sob demanda).
+
+    Usa o drill-down em lote (src/database/drilldown.py): as quatro partes
+    saem em paralelo pelo pool, com parâmetros vinculados, e reruns vêm do
+    st.cache_data de TTL curto de load_empresa_drilldown.
+    """
+    detalhes = load_empresa_drilldown(_engine, cnpj)
     
-    return detalhes
+    # Mesmo formato de antes: a coluna cnpj só separa o lote
+    return {
+        parte: df if parte == 'principal' else df.drop(columns='cnpj', errors='ignore')
+        for parte, df in detalhes.items()
+    }
 
 @st.cache_data(ttl=3600)
 def carregar_dados_ml(_engine):
@@ -1447,7 +1321,6 @@ def carregar_empresas_dimp_agregado(_engine, limite=500, filtrar_cnae=True):
         st.error(f"Erro ao carregar empresas: {str(e)}")
         return pd.DataFrame()
 
-@st.cache_data(ttl=3600)
 @st.cache_data(ttl=3600)
 def carregar_empresas_funcionarios(_engine, limite=500, filtrar_cnae=False):
     """Carrega empresas com funcionários recebendo via CPF."""
@@ -2491,6 +2364,11 @@ def pagina_diagnostico(engine, resumo):
     """, unsafe_allow_html=True)
     
     # Verificar colunas disponíveis
+    if resumo.get('timings'):
+        st.caption("⏱️ Resumo geral: " + ", ".join(
+            f"{nome} {segundos:.2f}s" for nome, segundos in resumo['timings'].items()
+        ))
+    
     if 'colunas_disponiveis' in resumo:
         st.subheader("📋 Colunas Disponíveis na Tabela dimp_score_final")
         
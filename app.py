@@ -14,20 +14,28 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
 # Imports dos módulos
-from config.settings import PAGE_CONFIG, SYSTEM_INFO
+from config.settings import PAGE_CONFIG, SYSTEM_INFO, PAGE_COLUMNS, MAIN_BASE_COLUMNS
 from config.constants import CSS_STYLES, PAGES, ICONS, MESSAGES
 from utils.auth import check_password
 from utils.formatters import (
     format_currency, format_percentage, format_number,
     get_risk_color, get_risk_emoji, create_download_button
 )
-from database.connection import get_engine, test_connection
-from database.queries import load_main_data, filter_data, search_empresa
+from database.connection import get_engine, test_connection, get_pool_metrics
+from database.queries import load_main_data, get_filtered_main_data, search_empresa
+from database.filters import FilterSpec
+from database.sorted_index import get_sorted_indexes
+from database.search_index import get_search_index
+from database.result_cache import get_result_cache
+from database.streaming import iter_pagamentos, aggregate_pagamentos_stream, load_pagamentos_resumo
 from analytics.kpis import (
     calculate_kpis, calculate_kpis_by_classification,
     calculate_kpis_by_municipio, get_top_empresas
 )
+from analytics.cube import get_kpi_cube
+from analytics.accumulator import get_kpi_accumulator
 from analytics.statistics import calculate_descriptive_stats, calculate_correlation_matrix
+from analytics.hypothesis import get_group_tests
 from visualizations.charts import (
     create_risk_distribution_pie, create_top_empresas_bar,
     create_scatter_cpf_vs_total, create_histogram,
@@ -85,20 +93,20 @@ with st.sidebar:
 # CARREGAMENTO DE DADOS
 # =============================================================================
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def load_all_data():
-    """Carrega todos os dados necessários"""
+def load_all_data(columns=None):
+    """Carrega os dados necessários (cache validado pela versão da tabela)"""
     engine = get_engine()
     if engine is None:
         return None
 
     with st.spinner(MESSAGES['loading']['data']):
-        df = load_main_data(engine)
+        df = load_main_data(engine, columns)
 
     return df
 
-# Carregar dados
-df_main = load_all_data()
+# Carregar apenas as colunas usadas pela página selecionada
+selected_page_id = next((p['id'] for p in PAGES if p['name'] == selected_page), None)
+df_main = load_all_data(PAGE_COLUMNS.get(selected_page_id, MAIN_BASE_COLUMNS))
 
 if df_main is None or df_main.empty:
     st.error(MESSAGES['error']['no_data'])
@@ -129,15 +137,22 @@ def page_dashboard_executivo():
             perc_cpf_min = st.slider("% CPF Mínimo", 0, 100, 0)
 
     # Aplicar filtros
-    df_filtered = filter_data(
-        df_main,
+    spec = FilterSpec(
         classificacao=classificacoes if classificacoes else None,
         score_min=score_min,
         perc_cpf_min=perc_cpf_min
     )
+    # Sem df: acima de pushdown_min_rows o filtro vai para o Impala
+    df_filtered = get_filtered_main_data(get_engine(), spec, columns=list(df_main.columns))
 
-    # KPIs Principais
-    kpis = calculate_kpis(df_filtered)
+    # KPIs Principais (acumulador da sessão: cada slider aplica só as linhas que mudaram)
+    accumulator = get_kpi_accumulator(df_main, st.session_state)
+    if accumulator is not None:
+        kpis = accumulator.update(spec).kpis()
+    else:
+        kpis = calculate_kpis(df_filtered)
+
+    cube = get_kpi_cube(df_main)
 
     st.markdown("### 📊 Indicadores Principais")
 
@@ -221,7 +236,7 @@ def page_dashboard_executivo():
 
     with col2:
         st.plotly_chart(
-            create_top_empresas_bar(df_filtered, 10),
+            create_top_empresas_bar(df_main, 10, spec, get_sorted_indexes(df_main)),
             use_container_width=True,
             key="top_empresas"
         )
@@ -235,7 +250,9 @@ def page_dashboard_executivo():
 
     # Top Municípios
     st.markdown("### 🏙️ Top Municípios por Volume")
-    kpis_mun = calculate_kpis_by_municipio(df_filtered, 15)
+    kpis_mun = cube.by_municipio(spec, 15) if cube is not None else None
+    if kpis_mun is None:
+        kpis_mun = calculate_kpis_by_municipio(df_filtered, 15)
 
     if not kpis_mun.empty:
         st.dataframe(
@@ -290,23 +307,26 @@ def page_ranking_empresas():
         limit = st.number_input("Mostrar top", 10, 100, 50)
 
     # Aplicar filtros
-    df_filtered = filter_data(
-        df_main,
+    spec = FilterSpec(
         classificacao=risk_filter if risk_filter else None,
         regime=regime_filter if regime_filter else None
     )
-
-    # Aplicar busca
-    if search_term:
-        df_filtered = search_empresa(df_filtered, search_term)
-
     # Ordenar
     if order_by == "Score de Risco":
-        df_display = df_filtered.nlargest(limit, 'score_risco_final')
+        order_column = 'score_risco_final'
     elif order_by == "Volume Total":
-        df_display = df_filtered.nlargest(limit, 'total_geral')
+        order_column = 'total_geral'
     else:
-        df_display = df_filtered.nlargest(limit, 'perc_recebido_cpf')
+        order_column = 'perc_recebido_cpf'
+
+    if search_term:
+        # Busca pelo índice (construído uma vez por carga), depois filtros e top N
+        df_found = search_empresa(df_main, search_term, index=get_search_index(df_main))
+        df_display = get_top_empresas(df_found, order_column, limit, spec=spec)
+    else:
+        # Top N direto do índice ordenado, filtrando só as candidatas
+        df_display = get_top_empresas(df_main, order_column, limit, spec=spec,
+                                      indexes=get_sorted_indexes(df_main))
 
     # Exibir resultados
     st.markdown(f"### 📋 Resultados: {len(df_display)} empresas")
@@ -408,7 +428,8 @@ def page_machine_learning():
 def page_estatisticas():
     st.markdown("<h1 class='main-header'>📊 Estatísticas Avançadas</h1>", unsafe_allow_html=True)
 
-    tab1, tab2 = st.tabs(["📈 Estatísticas Descritivas", "🔗 Correlações"])
+    tab1, tab2, tab3, tab4 = st.tabs(["📈 Estatísticas Descritivas", "🔗 Correlações",
+                                      "🧪 Testes entre Grupos", "📅 Pagamentos via CPF"])
 
     with tab1:
         st.markdown("### 📊 Estatísticas Descritivas")
@@ -462,6 +483,76 @@ def page_estatisticas():
                 use_container_width=True
             )
 
+    with tab3:
+        st.markdown("### 🧪 Testes de Hipótese entre Grupos")
+
+        col1, col2, col3, col4 = st.columns(4)
+
+        with col1:
+            metric = st.selectbox("Métrica", ['total_geral', 'score_risco_final', 'perc_recebido_cpf',
+                                              'total_recebido_cpf', 'qtd_socios_recebendo'])
+        with col2:
+            group_labels = {'Regime': 'regime_tributario', 'Classificação': 'classificacao_risco',
+                            'CNAE': 'nm_cnae1'}
+            group_column = group_labels[st.selectbox("Agrupar por", list(group_labels))]
+        with col3:
+            test_labels = {'Mann-Whitney U': 'mannwhitneyu', 'T-Test': 'ttest',
+                           'Permutação': 'permutation'}
+            test = test_labels[st.selectbox("Teste", list(test_labels))]
+        with col4:
+            mode_labels = {'Grupo vs demais': 'one_vs_rest', 'Par a par': 'pairwise'}
+            mode = mode_labels[st.selectbox("Comparação", list(mode_labels))]
+
+        with st.spinner("⏳ Executando testes..."):
+            tests = get_group_tests(df_main, metric, group_column, test, mode)
+
+        if tests.empty:
+            st.info("Dados insuficientes para os testes")
+        else:
+            correction_labels = {'bonferroni': 'Bonferroni', 'holm': 'Holm',
+                                 'fdr_bh': 'Benjamini-Hochberg'}
+            correction = tests.attrs.get('correction')
+            adjusted = (f"P-valores ajustados ({correction_labels.get(correction, correction)})"
+                        if correction else "P-valores sem correção para comparações múltiplas")
+            st.caption(f"{adjusted}; {int(tests['significant'].sum())} de "
+                       f"{len(tests)} comparações significativas")
+            if tests.attrs.get('sampled_rows'):
+                st.info(f"ℹ️ Permutação sobre amostra aleatória de "
+                        f"{format_number(tests.attrs['sampled_rows'])} de "
+                        f"{format_number(tests.attrs['total_rows'])} linhas; "
+                        f"tamanhos e médias referem-se à amostra")
+            st.dataframe(tests, use_container_width=True, hide_index=True)
+
+    with tab4:
+        st.markdown("### 📅 Pagamentos via CPF")
+
+        # Passada completa em blocos (memória limitada); resultado em cache
+        if st.checkbox("Agregar tabela de pagamentos via CPF", help="Lê a tabela inteira em blocos"):
+            resumo = load_pagamentos_resumo(get_engine(), 'pagamentos_cpf')
+
+            if not resumo:
+                st.info("Pagamentos indisponíveis")
+            else:
+                kpis_pag = resumo['kpis']
+
+                col1, col2, col3, col4 = st.columns(4)
+
+                with col1:
+                    st.metric("Pagamentos", format_number(kpis_pag['total_pagamentos']))
+                with col2:
+                    st.metric("Volume Total", format_currency(kpis_pag['volume_total']))
+                with col3:
+                    st.metric("Empresas", format_number(kpis_pag['qtd_empresas']))
+                with col4:
+                    st.metric("Sócios", format_number(kpis_pag['qtd_socios']))
+
+                if not resumo['mensal'].empty:
+                    mensal = resumo['mensal']
+                    st.line_chart(mensal.set_index(mensal.columns[0])['volume'])
+
+                st.markdown("#### 👥 Maiores Recebedores")
+                st.dataframe(resumo['por_socio'].head(20), use_container_width=True, hide_index=True)
+
 # =============================================================================
 # PÁGINA: DIAGNÓSTICO
 # =============================================================================
@@ -483,6 +574,107 @@ def page_diagnostico():
 
     st.markdown("---")
 
+    # Telemetria do pool de conexões
+    st.markdown("### 🔗 Pool de Conexões")
+
+    pool = get_pool_metrics()
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("Conexões Abertas", format_number(pool['connects']),
+                  help="Handshakes LDAP/SSL realizados desde o início do processo")
+
+    with col2:
+        st.metric("Latência de Conexão", f"{pool['connect_ms_avg']:.0f} ms",
+                  delta=f"máx {pool['connect_ms_max']:.0f} ms", delta_color="off")
+
+    with col3:
+        st.metric("Checkouts", format_number(pool['checkouts']),
+                  help="Conexões obtidas do pool")
+
+    with col4:
+        st.metric("Espera no Pool", f"{pool['wait_ms_avg']:.1f} ms",
+                  delta=f"máx {pool['wait_ms_max']:.0f} ms", delta_color="off")
+
+    st.json({
+        'em_uso': pool.get('checked_out'),
+        'ociosas': pool.get('idle'),
+        'overflow': pool.get('overflow'),
+        'verificacoes_periodicas': pool['liveness_checks'],
+        'falhas_verificacao': pool['liveness_failures'],
+        'falhas_conexao': pool['connect_failures'],
+        'aquecimento_s': pool['warmup_seconds'],
+        'aquecimento_conexoes': pool['warmup_connections'],
+    })
+
+    if pool['warmup_error']:
+        st.warning(f"⚠️ Falha no pré-aquecimento do pool: {pool['warmup_error']}")
+
+    st.markdown("---")
+
+    # Cache de resultados compartilhado (Arrow IPC)
+    st.markdown("### 🗄️ Cache de Resultados")
+
+    cache = get_result_cache()
+
+    if cache is None:
+        st.info("Cache de resultados desabilitado (DIMP_RESULT_CACHE_ENABLED=0)")
+    else:
+        stats = cache.stats()
+
+        col1, col2, col3, col4 = st.columns(4)
+
+        with col1:
+            st.metric("Entradas", format_number(stats['entries']))
+
+        with col2:
+            st.metric("Tamanho", f"{stats['bytes'] / 1024**2:.1f} MB",
+                      delta=f"limite {stats['max_bytes'] / 1024**3:.1f} GB", delta_color="off")
+
+        with col3:
+            st.metric("Taxa de Acerto", f"{stats['hit_rate'] * 100:.1f}%",
+                      help="Acertos neste processo desde o início")
+
+        with col4:
+            st.metric("Despejos", format_number(stats['evictions']))
+
+        if st.button("🧹 Limpar Cache de Resultados"):
+            removidas = cache.clear()
+            st.success(f"✅ {removidas} entradas removidas")
+
+    st.markdown("---")
+
+    # Memória de uma passada completa em streaming (tracemalloc só aqui)
+    st.markdown("### 🌊 Leitura em Streaming dos Pagamentos")
+
+    passada = None
+    if st.button("📏 Medir Passada Completa"):
+        with st.spinner("⏳ Lendo pagamentos via CPF em blocos..."):
+            try:
+                passada = aggregate_pagamentos_stream(
+                    iter_pagamentos(get_engine(), 'pagamentos_cpf'), track_memory=True
+                )
+            except Exception as e:
+                st.warning(f"⚠️ Erro ao ler pagamentos em streaming: {str(e)[:100]}")
+
+    if passada is not None:
+        memoria = passada['memoria']
+
+        col1, col2, col3, col4 = st.columns(4)
+
+        with col1:
+            st.metric("Linhas", format_number(memoria['rows']),
+                      delta=f"{memoria['chunks']} blocos", delta_color="off")
+        with col2:
+            st.metric("Pico Python/NumPy", f"{memoria['peak_python_bytes'] / 1024**2:.1f} MB")
+        with col3:
+            st.metric("Pico Arrow", f"{memoria['peak_arrow_bytes'] / 1024**2:.1f} MB")
+        with col4:
+            st.metric("Tempo", f"{memoria['seconds']:.1f} s")
+
+    st.markdown("---")
+
     # Estatísticas dos dados
     st.markdown("### 📊 Estatísticas dos Dados Carregados")
 
@@ -497,6 +689,16 @@ def page_diagnostico():
     with col3:
         st.metric("Memória Utilizada", f"{df_main.memory_usage(deep=True).sum() / 1024**2:.2f} MB")
 
+    # Ganho da representação compacta aplicada na carga
+    memory_report = df_main.attrs.get('memory_report')
+
+    if memory_report:
+        st.caption(
+            f"Tipos compactos: {memory_report['bytes_before'] / 1024**2:.2f} MB → "
+            f"{memory_report['bytes_after'] / 1024**2:.2f} MB "
+            f"(-{memory_report['reduction_pct']:.1f}%)"
+        )
+
     # Informações das colunas
     st.markdown("### 📋 Informações das Colunas")
 
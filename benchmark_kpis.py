@@ -0,0 +1,120 @@
+"""
+Micro-benchmark do cálculo de KPIs do projeto DIMP
+Compara calculate_kpis (passada única sobre arrays NumPy) com a
+implementação anterior, que filtrava o DataFrame uma vez por KPI.
+
+Uso:
+    python benchmark_kpis.py                          # 100 mil, 1 e 10 milhões de linhas
+    python benchmark_kpis.py --linhas 100000 1000000 --repeticoes 5
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.analytics.kpis import calculate_kpis
+
+CLASSIFICACOES = ['ALTO', 'MÉDIO-ALTO', 'MÉDIO', 'BAIXO']
+
+
+def calculate_kpis_referencia(df):
+    """Implementação anterior (um sub-DataFrame por classe e por alerta)."""
+    kpis = {
+        'total_empresas': len(df),
+        'total_empresas_ativas': len(df),
+        'volume_total': df['total_geral'].sum(),
+        'volume_cpf': df['total_recebido_cpf'].sum(),
+        'volume_cnpj': df['total_recebido_cnpj'].sum(),
+        'media_score_risco': df['score_risco_final'].mean(),
+        'media_perc_cpf': df['perc_recebido_cpf'].mean(),
+        'media_volume': df['total_geral'].mean(),
+        'empresas_alto_risco': len(df[df['classificacao_risco'] == 'ALTO']),
+        'empresas_medio_alto': len(df[df['classificacao_risco'] == 'MÉDIO-ALTO']),
+        'empresas_medio': len(df[df['classificacao_risco'] == 'MÉDIO']),
+        'empresas_baixo': len(df[df['classificacao_risco'] == 'BAIXO']),
+        'perc_alto_risco': len(df[df['classificacao_risco'] == 'ALTO']) / len(df) * 100,
+        'perc_medio_alto': len(df[df['classificacao_risco'] == 'MÉDIO-ALTO']) / len(df) * 100,
+        'total_socios_recebendo': df['qtd_socios_recebendo'].sum(),
+        'media_socios_por_empresa': df['qtd_socios_recebendo'].mean(),
+        'empresas_alerta_critico': len(df[df['score_risco_final'] >= 90]),
+        'empresas_acima_50pct_cpf': len(df[df['perc_recebido_cpf'] > 50]),
+    }
+
+    if kpis['volume_total'] > 0:
+        kpis['perc_total_cpf'] = (kpis['volume_cpf'] / kpis['volume_total']) * 100
+    else:
+        kpis['perc_total_cpf'] = 0
+
+    return kpis
+
+
+def gerar_dados(linhas, seed=42):
+    """Gera DataFrame sintético com as colunas e tipos da tabela principal."""
+    rng = np.random.default_rng(seed)
+
+    total = rng.lognormal(12, 1.5, linhas)
+    cpf = total * rng.uniform(0, 1, linhas)
+
+    return pd.DataFrame({
+        'classificacao_risco': pd.Categorical.from_codes(
+            rng.integers(0, len(CLASSIFICACOES), linhas), sorted(CLASSIFICACOES)
+        ),
+        'score_risco_final': rng.uniform(0, 100, linhas).astype(np.float32),
+        'total_geral': total,
+        'total_recebido_cpf': cpf,
+        'total_recebido_cnpj': total - cpf,
+        'perc_recebido_cpf': (cpf / total * 100).astype(np.float32),
+        'qtd_socios_recebendo': rng.integers(0, 8, linhas).astype(np.int8),
+    })
+
+
+def medir(func, df, repeticoes):
+    """Melhor tempo (segundos) entre as repetições."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        func(df)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def conferir(df):
+    """Confere se as duas implementações produzem os mesmos KPIs."""
+    novo = calculate_kpis(df)
+    antigo = calculate_kpis_referencia(df)
+    return all(np.isclose(float(novo[k]), float(antigo[k]), rtol=1e-6) for k in antigo)
+
+
+def main():
+    """Executa o benchmark para cada tamanho solicitado."""
+    parser = argparse.ArgumentParser(description='Benchmark do cálculo de KPIs do DIMP')
+    parser.add_argument('--linhas', type=int, nargs='+',
+                        default=[100_000, 1_000_000, 10_000_000],
+                        help='Quantidades de linhas a testar')
+    parser.add_argument('--repeticoes', type=int, default=3,
+                        help='Repetições por medição (vale o melhor tempo)')
+    args = parser.parse_args()
+
+    print(f"{'linhas':>12}  {'anterior':>10}  {'atual':>10}  {'ganho':>7}  resultado")
+
+    divergentes = 0
+
+    for linhas in args.linhas:
+        df = gerar_dados(linhas)
+        iguais = conferir(df)
+        divergentes += not iguais
+
+        antes = medir(calculate_kpis_referencia, df, args.repeticoes)
+        depois = medir(calculate_kpis, df, args.repeticoes)
+
+        print(f"{linhas:>12,}  {antes * 1000:>8.1f}ms  {depois * 1000:>8.1f}ms  "
+              f"{antes / depois:>6.1f}x  {'✓ iguais' if iguais else '✗ divergentes'}")
+
+    return 1 if divergentes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
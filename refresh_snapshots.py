@@ -0,0 +1,90 @@
+"""
+Script para reconstruir os snapshots locais do projeto DIMP
+Executar fora do horário de pico (ex.: cron após o pipeline noturno)
+
+Uso:
+    python refresh_snapshots.py            # reconstrói todos os snapshots
+    python refresh_snapshots.py --listar   # lista snapshots existentes
+"""
+
+import argparse
+import sys
+import time
+
+from src.config.settings import TABLES, INCREMENTAL_CONFIG
+from src.database.connection import get_engine
+from src.database.incremental import sync_table_incremental
+from src.database.queries import refresh_main_snapshot
+from src.database.snapshot import list_snapshots
+
+
+def reconstruir_principal(engine):
+    """Reconstrói o snapshot da tabela principal e resume o resultado."""
+    path = refresh_main_snapshot(engine)
+    return f"snapshot gravado em {path}" if path else "snapshot não gravado"
+
+
+def sincronizar_incremental(table_key):
+    """Cria função de sincronização incremental para uma tabela."""
+    def _sincronizar(engine):
+        _, report = sync_table_incremental(engine, table_key)
+        return (f"{len(report['novas'])} partições novas, "
+                f"{len(report['alteradas'])} alteradas, "
+                f"{report['rows_fetched']:,} linhas buscadas")
+    return _sincronizar
+
+
+# Funções de reconstrução por tabela
+REFRESHERS = {
+    'main': reconstruir_principal,
+}
+REFRESHERS.update({key: sincronizar_incremental(key) for key in INCREMENTAL_CONFIG})
+
+
+def listar_snapshots():
+    """Lista os snapshots existentes de cada tabela."""
+    for table_key in REFRESHERS:
+        snapshots = list_snapshots(TABLES[table_key])
+        print(f"\n{TABLES[table_key]}:")
+
+        if not snapshots:
+            print("  (nenhum snapshot)")
+
+        for snap in snapshots:
+            print(f"  - {snap['token']}  {snap['size_bytes'] / 1024**2:.1f} MB  "
+                  f"idade {snap['age'] / 3600:.1f} h")
+
+
+def main():
+    """Reconstrói os snapshots solicitados."""
+    parser = argparse.ArgumentParser(description='Reconstrói snapshots locais do DIMP')
+    parser.add_argument('--tabela', choices=sorted(REFRESHERS), action='append',
+                        help='Tabela a reconstruir (padrão: todas)')
+    parser.add_argument('--listar', action='store_true', help='Apenas lista snapshots')
+    args = parser.parse_args()
+
+    if args.listar:
+        listar_snapshots()
+        return 0
+
+    engine = get_engine()
+    if engine is None:
+        print("✗ Não foi possível criar a conexão com o banco")
+        return 1
+
+    com_erro = 0
+
+    for table_key in args.tabela or sorted(REFRESHERS):
+        inicio = time.time()
+        try:
+            resumo = REFRESHERS[table_key](engine)
+            print(f"✓ {TABLES[table_key]}: {resumo} ({time.time() - inicio:.1f}s)")
+        except Exception as e:
+            print(f"✗ Erro ao reconstruir {TABLES[table_key]}: {e}")
+            com_erro += 1
+
+    return 1 if com_erro else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
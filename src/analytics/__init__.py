@@ -4,3 +4,12 @@ Módulo de Análises e KPIs do Sistema DIMP
 from .kpis import *
 from .statistics import *
 from .comparisons import *
+from .cube import *
+from .accumulator import *
+from .groups import *
+from .percentiles import *
+from .descriptive import *
+from .sketches import *
+from .anomalies import *
+from .concentration import *
+from .hypothesis import *
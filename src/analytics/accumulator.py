@@ -0,0 +1,356 @@
+"""
+Manutenção Incremental de KPIs
+
+Mantém as medidas aditivas dos KPIs (contagem, somas, somas de quadrados e
+contagem por classe) das linhas que atendem aos filtros atuais. Quando um
+filtro de faixa muda (ex.: slider de score ou de %CPF), apenas as linhas
+entre o limite antigo e o novo são somadas ou subtraídas; elas são obtidas
+por busca binária nos índices ordenados. O custo de cada interação é
+proporcional à mudança, não ao tamanho da tabela.
+"""
+
+from typing import Dict, Any, List, Optional, MutableMapping
+
+import numpy as np
+import pandas as pd
+
+from ..database.derived import snapshot_cached
+from ..database.filters import FILTER_COLUMNS
+from ..database.sorted_index import SORTED_INDEX_COLUMNS, get_sorted_indexes
+from .kpis import KPI_MEASURES, kpis_from_totals
+
+# Recalcula do zero após tantas atualizações incrementais (limita o acúmulo
+# de erro de arredondamento nas somas)
+ACCUMULATOR_REBUILD_EVERY = 500
+
+# Fração da tabela acima da qual a variação é recalculada por máscara
+ACCUMULATOR_MAX_DELTA_RATIO = 0.5
+
+# Colunas lidas por KPIRowData (medidas, índices ordenados e filtros)
+_ROW_DATA_COLUMNS = list(dict.fromkeys(
+    KPI_MEASURES + SORTED_INDEX_COLUMNS + [column for column, _ in FILTER_COLUMNS.values()]
+))
+
+
+class KPIRowData:
+    """Arrays das colunas usadas pelos KPIs e filtros, compartilhados entre sessões."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.n_rows = len(df)
+        self.indexes = get_sorted_indexes(df)
+
+        self.values: Dict[str, np.ndarray] = {}
+        for column in set(KPI_MEASURES) | set(self.indexes):
+            if column in df.columns:
+                self.values[column] = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        # Colunas dos filtros de lista: códigos (-1 = nulo) e categorias
+        self.codes: Dict[str, np.ndarray] = {}
+        self.categories: Dict[str, pd.Index] = {}
+        for column, op in FILTER_COLUMNS.values():
+            if op != 'in' or column not in df.columns:
+                continue
+            series = df[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                codes, categories = series.cat.codes.to_numpy(), series.cat.categories
+            else:
+                codes, categories = pd.factorize(series, sort=True)
+            self.codes[column] = codes
+            self.categories[column] = pd.Index(categories)
+
+    def allowed(self, column: str, values) -> np.ndarray:
+        """Tabela de consulta por código+1 (posição 0 = nulo, nunca aceito)."""
+        return np.concatenate([[False], self.categories[column].isin(values)])
+
+
+class KPIAccumulator:
+    """
+    Medidas aditivas das linhas que atendem a um FilterSpec.
+
+    O estado é pequeno (somas e contagens) e pode ser guardado por sessão;
+    os arrays e índices ficam em KPIRowData, compartilhado.
+    """
+
+    def __init__(self, data: KPIRowData):
+        self.data = data
+        self.measures = [col for col in KPI_MEASURES if col in data.values]
+        self._filters: Optional[List[tuple]] = None
+        self._updates = 0
+        self.last_delta_rows = 0
+        self._reset_totals()
+
+    # ------------------------------------------------------------------
+    # Medidas
+    # ------------------------------------------------------------------
+
+    def _reset_totals(self):
+        self.n = 0
+        self.sums = dict.fromkeys(self.measures, 0.0)
+        self.squares = dict.fromkeys(self.measures, 0.0)
+        self.counts = dict.fromkeys(self.measures, 0)
+        labels = self.data.categories.get('classificacao_risco', [])
+        self.class_counts = np.zeros(len(labels) + 1, dtype=np.int64)
+        self.alerta_critico = 0
+        self.acima_50pct_cpf = 0
+
+    def add(self, rows: np.ndarray, sign: int = 1):
+        """
+        Soma (sign=1) ou subtrai (sign=-1) um conjunto de linhas.
+
+        Args:
+            rows: Posições (iloc) ou máscara booleana das linhas
+            sign: 1 para adicionar, -1 para remover
+        """
+        rows = np.asarray(rows)
+        size = int(np.count_nonzero(rows)) if rows.dtype == bool else len(rows)
+        if size == 0:
+            return
+
+        self.n += sign * size
+
+        for column in self.measures:
+            values = self.data.values[column][rows]
+            valid = ~np.isnan(values)
+            self.sums[column] += sign * values.sum(where=valid)
+            self.squares[column] += sign * np.square(values).sum(where=valid)
+            self.counts[column] += sign * int(np.count_nonzero(valid))
+
+            # Comparações com NaN resultam em False
+            if column == 'score_risco_final':
+                self.alerta_critico += sign * int(np.count_nonzero(values >= 90))
+            elif column == 'perc_recebido_cpf':
+                self.acima_50pct_cpf += sign * int(np.count_nonzero(values > 50))
+
+        if 'classificacao_risco' in self.data.codes:
+            codes = self.data.codes['classificacao_risco'][rows]
+            self.class_counts += sign * np.bincount(codes + 1, minlength=len(self.class_counts))
+
+    def remove(self, rows: np.ndarray):
+        """Subtrai um conjunto de linhas (ver add)."""
+        self.add(rows, sign=-1)
+
+    # ------------------------------------------------------------------
+    # Filtros
+    # ------------------------------------------------------------------
+
+    def _usable(self, filters: List[tuple]) -> List[tuple]:
+        """Filtros sobre colunas existentes (os demais são ignorados, como em to_mask)."""
+        return [f for f in filters if f[1] in self.data.values or f[1] in self.data.codes]
+
+    def _mask(self, filters: List[tuple], rows: Optional[np.ndarray] = None,
+              skip_column: Optional[str] = None) -> np.ndarray:
+        """Máscara dos filtros sobre todas as linhas ou sobre as posições dadas."""
+        size = self.data.n_rows if rows is None else len(rows)
+        mask = np.ones(size, dtype=bool)
+
+        for _, column, op, value in filters:
+            if column == skip_column:
+                continue
+
+            if op == 'in':
+                codes = self.data.codes[column]
+                codes = codes if rows is None else codes[rows]
+                mask &= self.data.allowed(column, value)[codes + 1]
+                continue
+
+            values = self.data.values[column]
+            values = values if rows is None else values[rows]
+            mask &= values >= value if op == '>=' else values <= value
+
+        return mask
+
+    @staticmethod
+    def _range(filters: List[tuple], column: str) -> tuple:
+        low = high = None
+        for _, col, op, value in filters:
+            if col == column and op == '>=':
+                low = value
+            elif col == column and op == '<=':
+                high = value
+        return low, high
+
+    def _rebuild(self, filters: List[tuple]):
+        self._reset_totals()
+        self.add(self._mask(filters))
+        self._filters = filters
+        self._updates = 0
+        self.last_delta_rows = self.data.n_rows
+
+    def update(self, spec=None) -> 'KPIAccumulator':
+        """
+        Leva o estado para os filtros de spec.
+
+        Se apenas filtros de faixa sobre colunas indexadas mudaram, aplica
+        somente as linhas entre os limites antigos e novos; caso contrário
+        (ou se a variação for grande), recalcula pela máscara.
+
+        Args:
+            spec: FilterSpec (database.filters); None = sem filtros
+
+        Returns:
+            KPIAccumulator: o próprio acumulador
+        """
+        filters = self._usable(spec.active() if spec is not None else [])
+
+        if filters == self._filters:
+            self.last_delta_rows = 0
+            return self
+
+        previous = self._filters
+        discrete = sorted((f for f in filters if f[2] == 'in'), key=str)
+
+        if (previous is None
+                or discrete != sorted((f for f in previous if f[2] == 'in'), key=str)
+                or self._updates >= ACCUMULATOR_REBUILD_EVERY):
+            self._rebuild(filters)
+            return self
+
+        changed = sorted({
+            f[1] for f in set(map(_hashable, filters)) ^ set(map(_hashable, previous))
+        })
+        if any(column not in self.data.indexes for column in changed):
+            self._rebuild(filters)
+            return self
+
+        # Limites antigos e novos na ordem de cada índice
+        slices = []
+        for column in changed:
+            index = self.data.indexes[column]
+            old = index.bounds(*self._range(previous, column))
+            new = index.bounds(*self._range(filters, column))
+            slices.append((column, old, new))
+
+        delta = sum(abs(new[0] - old[0]) + abs(new[1] - old[1]) for _, old, new in slices)
+        if delta > self.data.n_rows * ACCUMULATOR_MAX_DELTA_RATIO:
+            self._rebuild(filters)
+            return self
+
+        # Uma coluna por vez: as demais usam o valor já aplicado
+        current = list(previous)
+        for column, old, new in slices:
+            current = [f for f in current if f[1] != column] + [f for f in filters if f[1] == column]
+            order = self.data.indexes[column].order
+
+            for start, stop, sign in _interval_delta(old, new):
+                rows = order[start:stop]
+                rows = rows[self._mask(current, rows, skip_column=column)]
+                self.add(rows, sign)
+
+        self._filters = filters
+        self._updates += 1
+        self.last_delta_rows = delta
+
+        if self.n == 0:
+            self._reset_totals()
+
+        return self
+
+    # ------------------------------------------------------------------
+    # Resultados
+    # ------------------------------------------------------------------
+
+    def kpis(self) -> Dict[str, Any]:
+        """
+        KPIs do estado atual (mesmas chaves de calculate_kpis).
+
+        Returns:
+            dict: KPIs calculados
+        """
+        classes = {}
+        if 'classificacao_risco' in self.data.categories:
+            labels = self.data.categories['classificacao_risco']
+            classes = dict(zip(labels, self.class_counts[1:].tolist()))
+
+        return kpis_from_totals(
+            self.n, self.sums, self.counts, classes,
+            alerta_critico=self.alerta_critico,
+            acima_50pct_cpf=self.acima_50pct_cpf,
+        )
+
+    def stats(self, column: str) -> Optional[Dict[str, float]]:
+        """
+        Contagem, média e desvio-padrão amostral de uma medida.
+
+        Args:
+            column: Coluna de KPI_MEASURES
+
+        Returns:
+            dict ou None: 'count', 'mean', 'std'
+        """
+        if column not in self.measures:
+            return None
+
+        count = self.counts[column]
+        if count == 0:
+            return {'count': 0, 'mean': 0.0, 'std': 0.0}
+
+        mean = self.sums[column] / count
+        var = (self.squares[column] - count * mean * mean) / (count - 1) if count > 1 else 0.0
+
+        return {'count': int(count), 'mean': float(mean), 'std': float(np.sqrt(max(var, 0.0)))}
+
+
+def _hashable(filter_: tuple) -> tuple:
+    name, column, op, value = filter_
+    return name, column, op, tuple(value) if isinstance(value, list) else value
+
+
+def _interval_delta(old: tuple, new: tuple):
+    """
+    Trechos que saem (-1) e entram (+1) ao trocar o intervalo [old) por [new).
+
+    Yields:
+        tuple: (início, fim, sinal)
+    """
+    (old_start, old_stop), (new_start, new_stop) = old, new
+
+    # Saem: partes de old fora de new
+    yield old_start, min(old_stop, new_start), -1
+    yield max(old_start, new_stop), old_stop, -1
+
+    # Entram: partes de new fora de old
+    yield new_start, min(new_stop, old_start), 1
+    yield max(new_start, old_stop), new_stop, 1
+
+
+def get_kpi_row_data(df: pd.DataFrame) -> Optional[KPIRowData]:
+    """
+    Obtém os arrays compartilhados do DataFrame principal, uma vez por carga.
+
+    Args:
+        df: DataFrame principal (sem filtros)
+
+    Returns:
+        KPIRowData ou None: Dados, ou None se o DataFrame estiver vazio
+    """
+    if df is None or df.empty:
+        return None
+
+    return snapshot_cached(df, 'kpi_row_data', KPIRowData, columns=_ROW_DATA_COLUMNS)
+
+
+def get_kpi_accumulator(df: pd.DataFrame, store: MutableMapping,
+                        key: str = 'kpi_accumulator') -> Optional[KPIAccumulator]:
+    """
+    Obtém o acumulador guardado em store (ex.: st.session_state).
+
+    Um novo acumulador é criado quando a carga do DataFrame muda.
+
+    Args:
+        df: DataFrame principal (sem filtros)
+        store: Armazenamento por sessão
+        key: Chave no armazenamento
+
+    Returns:
+        KPIAccumulator ou None: Acumulador, ou None se o DataFrame estiver vazio
+    """
+    data = get_kpi_row_data(df)
+    if data is None:
+        return None
+
+    accumulator = store.get(key)
+    if accumulator is None or accumulator.data is not data:
+        accumulator = KPIAccumulator(data)
+        store[key] = accumulator
+
+    return accumulator
@@ -0,0 +1,212 @@
+"""
+Detecção de Anomalias por Grupo
+
+Aplica z-score, IQR ou z-score modificado (mediana/MAD) dentro de cada
+grupo (CNAE, regime, município...) para várias métricas de uma vez. As
+estatísticas de todos os grupos saem de uma ordenação por (grupo, valor) e
+de somas por grupo (np.bincount), sem laço Python sobre os grupos; o
+resultado são arrays compactos de máscara e escore alinhados às linhas, sem
+copiar o DataFrame.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+ANOMALY_METHODS = ['zscore', 'iqr', 'modified_zscore']
+
+
+def _group_codes(df: pd.DataFrame, group_column: Optional[str]):
+    """Códigos do grupo de cada linha (-1 = nulo) e rótulos dos grupos."""
+    if group_column is None:
+        return np.zeros(len(df), dtype=np.int64), pd.Index(['TODOS'])
+
+    series = df[group_column]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy().astype(np.int64), pd.Index(series.cat.categories)
+
+    codes, labels = pd.factorize(series)
+    return codes.astype(np.int64), pd.Index(labels)
+
+
+def _sorted_by_group(values: np.ndarray, group: np.ndarray, n_groups: int):
+    """Valores ordenados por (grupo, valor), início e tamanho de cada grupo."""
+    sorted_values = values[np.lexsort((values, group))]
+    count = np.bincount(group, minlength=n_groups)
+    start = np.concatenate([[0], np.cumsum(count)])[:-1]
+    return sorted_values, start, count
+
+
+def _group_quantile(sorted_values: np.ndarray, start: np.ndarray, count: np.ndarray,
+                    q: float) -> np.ndarray:
+    """Quantil q de cada grupo, com interpolação linear (como Series.quantile)."""
+    result = np.full(len(count), np.nan)
+    filled = count > 0
+
+    position = q * (count[filled] - 1)
+    low = np.floor(position).astype(np.int64)
+    high = np.ceil(position).astype(np.int64)
+    base = start[filled]
+
+    low_values = sorted_values[base + low]
+    high_values = sorted_values[base + high]
+    result[filled] = low_values + (high_values - low_values) * (position - low)
+    return result
+
+
+class GroupedAnomalies:
+    """
+    Máscara e escore de anomalia por linha e métrica.
+
+    is_anomaly e score têm uma coluna por métrica (na ordem de columns) e
+    uma linha por linha do DataFrame; linhas com valor ou grupo nulo não são
+    anomalias e têm escore nulo.
+    """
+
+    def __init__(self, columns: List[str], is_anomaly: np.ndarray, score: np.ndarray,
+                 codes: np.ndarray, labels: pd.Index, method: str, threshold: float):
+        self.columns = columns
+        self.is_anomaly = is_anomaly
+        self.score = score
+        self.codes = codes
+        self.labels = labels
+        self.method = method
+        self.threshold = threshold
+
+    def rows(self, column: Optional[str] = None) -> np.ndarray:
+        """
+        Posições (iloc) das linhas anômalas.
+
+        Args:
+            column: Métrica; None = anômala em qualquer métrica
+
+        Returns:
+            np.ndarray: Posições das linhas
+        """
+        if column is None:
+            return np.flatnonzero(self.is_anomaly.any(axis=1))
+        return np.flatnonzero(self.is_anomaly[:, self.columns.index(column)])
+
+    def counts_by_group(self) -> pd.DataFrame:
+        """
+        Quantidade de anomalias por grupo e métrica.
+
+        Returns:
+            pd.DataFrame: Índice = grupo, uma coluna por métrica
+        """
+        valid = self.codes >= 0
+        counts = {
+            column: np.bincount(self.codes[valid], weights=self.is_anomaly[valid, i],
+                                minlength=len(self.labels)).astype(np.int64)
+            for i, column in enumerate(self.columns)
+        }
+        return pd.DataFrame(counts, index=self.labels)
+
+    def frame(self, df: pd.DataFrame, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Linhas anômalas de df com o escore de cada métrica.
+
+        Args:
+            df: DataFrame usado na detecção
+            columns: Colunas de df a incluir (padrão: todas)
+
+        Returns:
+            pd.DataFrame: Linhas anômalas com colunas score_<métrica>
+        """
+        rows = self.rows()
+        result = df.iloc[rows] if columns is None else df.iloc[rows][columns]
+        result = result.copy()
+        for i, column in enumerate(self.columns):
+            result[f'score_{column}'] = self.score[rows, i]
+        return result
+
+
+def _column_scores(values: np.ndarray, codes: np.ndarray, n_groups: int,
+                   method: str, threshold: float):
+    """Escores e máscara de uma métrica em todos os grupos."""
+    score = np.full(len(values), np.nan, dtype=np.float32)
+    is_anomaly = np.zeros(len(values), dtype=bool)
+
+    rows = np.flatnonzero((codes >= 0) & ~np.isnan(values))
+    if not len(rows):
+        return score, is_anomaly
+
+    group, x = codes[rows], values[rows]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if method == 'zscore':
+            count = np.bincount(group, minlength=n_groups)
+            mean = np.bincount(group, weights=x, minlength=n_groups) / count
+            deviation = x - mean[group]
+            squares = np.bincount(group, weights=deviation * deviation, minlength=n_groups)
+            std = np.where(count > 1, np.sqrt(squares / (count - 1)), np.nan)
+            row_score = np.abs(deviation / std[group])
+            flagged = row_score > threshold
+
+        elif method == 'iqr':
+            sorted_values, start, count = _sorted_by_group(x, group, n_groups)
+            q1 = _group_quantile(sorted_values, start, count, 0.25)
+            median = _group_quantile(sorted_values, start, count, 0.5)
+            q3 = _group_quantile(sorted_values, start, count, 0.75)
+            iqr = q3 - q1
+            flagged = (x < (q1 - threshold * iqr)[group]) | (x > (q3 + threshold * iqr)[group])
+            row_score = np.abs((x - median[group]) / iqr[group])
+
+        else:  # modified_zscore
+            sorted_values, start, count = _sorted_by_group(x, group, n_groups)
+            median = _group_quantile(sorted_values, start, count, 0.5)
+            deviation = x - median[group]
+            sorted_deviation, _, _ = _sorted_by_group(np.abs(deviation), group, n_groups)
+            mad = _group_quantile(sorted_deviation, start, count, 0.5)
+            row_score = np.abs(0.6745 * deviation / mad[group])
+            flagged = row_score > threshold
+
+    score[rows] = row_score
+    is_anomaly[rows] = flagged
+    return score, is_anomaly
+
+
+def detect_grouped_anomalies(df: pd.DataFrame, columns: List[str],
+                             group_column: Optional[str] = 'nm_cnae1',
+                             method: str = 'modified_zscore',
+                             threshold: float = 3.5) -> Optional[GroupedAnomalies]:
+    """
+    Detecta anomalias de várias métricas dentro de cada grupo.
+
+    Mesmos métodos de detect_anomalies_statistical, com as estatísticas
+    (média/desvio, quartis, mediana/MAD) calculadas por grupo.
+
+    Args:
+        df: DataFrame
+        columns: Métricas numéricas
+        group_column: Coluna de agrupamento (ex.: 'nm_cnae1',
+                      'regime_tributario', 'municipio'); None = tabela inteira
+        method: 'zscore', 'iqr' ou 'modified_zscore'
+        threshold: Limiar (ex.: 3 para z-score, 1.5 para IQR, 3.5 para MAD)
+
+    Returns:
+        GroupedAnomalies ou None: Resultado, ou None se não houver métricas
+                                  ou coluna de grupo válidas
+    """
+    if method not in ANOMALY_METHODS:
+        raise ValueError(f"Método desconhecido: {method}")
+
+    columns = [col for col in columns if col in df.columns]
+    if df.empty or not columns or (group_column is not None and group_column not in df.columns):
+        return None
+
+    codes, labels = _group_codes(df, group_column)
+
+    scores: Dict[str, np.ndarray] = {}
+    flags: Dict[str, np.ndarray] = {}
+    for column in columns:
+        values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        scores[column], flags[column] = _column_scores(values, codes, len(labels), method, threshold)
+
+    return GroupedAnomalies(
+        columns,
+        np.column_stack([flags[col] for col in columns]),
+        np.column_stack([scores[col] for col in columns]),
+        codes, labels, method, threshold,
+    )
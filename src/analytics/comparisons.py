@@ -6,14 +6,23 @@ import pandas as pd
 import numpy as np
 from typing import List, Dict, Any, Optional
 
+from ..database.cnpj_index import CNPJIndex, find_cnpj_position, resolve_cnpj_index
+from .groups import GroupPositions, get_row_group
+from .percentiles import PERCENTILE_METRICS, PERCENTILE_SCOPES, get_percentile_ranks
 
-def compare_empresas(df: pd.DataFrame, cnpjs: List[str]) -> pd.DataFrame:
+# Métricas comparadas com o regime tributário
+REGIME_METRICS = ['score_risco_final', 'total_geral', 'perc_recebido_cpf']
+
+
+def compare_empresas(df: pd.DataFrame, cnpjs: List[str],
+                     index: Optional[CNPJIndex] = None) -> pd.DataFrame:
     """
     Compara múltiplas empresas lado a lado.
 
     Args:
         df: DataFrame com dados
         cnpjs: Lista de CNPJs para comparar
+        index: Índice de CNPJ de df (padrão: o da carga, database.cnpj_index)
 
     Returns:
         pd.DataFrame: Comparação das empresas
@@ -21,7 +30,11 @@ def compare_empresas(df: pd.DataFrame, cnpjs: List[str]) -> pd.DataFrame:
     if df.empty or not cnpjs:
         return pd.DataFrame()
 
-    empresas = df[df['cnpj'].isin(cnpjs)].copy()
+    index = resolve_cnpj_index(df, index)
+    if index is not None:
+        empresas = df.iloc[np.sort(index.positions(cnpjs))].copy()
+    else:
+        empresas = df[df['cnpj'].isin(cnpjs)].copy()
 
     if empresas.empty:
         return pd.DataFrame()
@@ -39,37 +52,43 @@ def compare_empresas(df: pd.DataFrame, cnpjs: List[str]) -> pd.DataFrame:
     return empresas[cols_existentes]
 
 
-def compare_with_sector(df: pd.DataFrame, cnpj: str, sector_column: str = 'nm_cnae1') -> Dict[str, Any]:
+def compare_with_sector(df: pd.DataFrame, cnpj: str, sector_column: str = 'nm_cnae1',
+                        index: Optional[CNPJIndex] = None) -> Dict[str, Any]:
     """
     Compara empresa com a média do seu setor.
 
+    Estatísticas e rankings vêm das posições por grupo (analytics.groups),
+    construídas uma vez por carga; cada métrica é uma busca binária. Fora da
+    carga completa, só o setor da empresa é calculado.
+
     Args:
         df: DataFrame
         cnpj: CNPJ da empresa
         sector_column: Coluna do setor
+        index: Índice de CNPJ de df (padrão: o da carga, database.cnpj_index)
 
     Returns:
         dict: Comparação com setor
     """
-    if df.empty or cnpj not in df['cnpj'].values:
+    position = find_cnpj_position(df, cnpj, index)
+    if position is None:
         return {}
 
-    empresa = df[df['cnpj'] == cnpj].iloc[0]
-    setor_value = empresa.get(sector_column)
-
-    if pd.isna(setor_value):
-        return {}
+    groups, setor = get_row_group(df, sector_column, position)
+    return _compare_with_sector(df.iloc[position], cnpj, groups, setor)
 
-    setor_df = df[df[sector_column] == setor_value]
 
-    if len(setor_df) < 2:
+def _compare_with_sector(empresa: pd.Series, cnpj: str, groups: Optional[GroupPositions],
+                         setor: Optional[int]) -> Dict[str, Any]:
+    """Comparação com o setor a partir da linha e do grupo da empresa."""
+    if setor is None or groups.size(setor) < 2:
         return {}
 
     comparison = {
         'empresa': {
             'cnpj': cnpj,
             'razao_social': empresa.get('nm_razao_social', 'N/A'),
-            'setor': setor_value
+            'setor': groups.label(setor)
         },
         'metricas_empresa': {},
         'metricas_setor': {},
@@ -82,98 +101,105 @@ def compare_with_sector(df: pd.DataFrame, cnpj: str, sector_column: str = 'nm_cn
                 'total_recebido_cpf', 'qtd_socios_recebendo']
 
     for metrica in metricas:
-        if metrica not in df.columns:
+        if metrica not in groups.sorted:
             continue
 
         valor_empresa = empresa.get(metrica, 0)
-        media_setor = setor_df[metrica].mean()
-        mediana_setor = setor_df[metrica].median()
+        resumo = groups.summary(setor, metrica)
+        media_setor = resumo['media']
 
         comparison['metricas_empresa'][metrica] = valor_empresa
         comparison['metricas_setor'][f'{metrica}_media'] = media_setor
-        comparison['metricas_setor'][f'{metrica}_mediana'] = mediana_setor
+        comparison['metricas_setor'][f'{metrica}_mediana'] = resumo['mediana']
 
         # Diferença percentual em relação à média
         if media_setor != 0:
             diff_pct = ((valor_empresa - media_setor) / media_setor) * 100
             comparison['diferencas'][metrica] = diff_pct
 
-        # Posição no ranking do setor
-        setor_sorted = setor_df.sort_values(metrica, ascending=False)
-        posicao = list(setor_sorted['cnpj']).index(cnpj) + 1
-        total_setor = len(setor_df)
-        comparison['posicao_ranking'][metrica] = {
-            'posicao': posicao,
-            'total': total_setor,
-            'percentil': (total_setor - posicao) / total_setor * 100
-        }
+        # Posição no ranking do setor (busca binária nos valores ordenados)
+        comparison['posicao_ranking'][metrica] = groups.rank(setor, metrica, valor_empresa)
 
     return comparison
 
 
-def compare_with_regime(df: pd.DataFrame, cnpj: str) -> Dict[str, Any]:
+def compare_with_regime(df: pd.DataFrame, cnpj: str,
+                        index: Optional[CNPJIndex] = None) -> Dict[str, Any]:
     """
     Compara empresa com a média do seu regime tributário.
 
     Args:
         df: DataFrame
         cnpj: CNPJ da empresa
+        index: Índice de CNPJ de df (padrão: o da carga, database.cnpj_index)
 
     Returns:
         dict: Comparação com regime
     """
-    if df.empty or cnpj not in df['cnpj'].values or 'regime_tributario' not in df.columns:
+    if 'regime_tributario' not in df.columns:
         return {}
 
-    empresa = df[df['cnpj'] == cnpj].iloc[0]
-    regime = empresa.get('regime_tributario')
-
-    if pd.isna(regime):
+    position = find_cnpj_position(df, cnpj, index)
+    if position is None:
         return {}
 
-    regime_df = df[df['regime_tributario'] == regime]
+    groups, regime = get_row_group(df, 'regime_tributario', position, REGIME_METRICS)
+    return _compare_with_regime(df.iloc[position], groups, regime)
+
+
+def _compare_with_regime(empresa: pd.Series, groups: Optional[GroupPositions],
+                         regime: Optional[int]) -> Dict[str, Any]:
+    """Comparação com o regime a partir da linha e do grupo da empresa."""
+    if regime is None:
+        return {}
 
     comparison = {
-        'regime': regime,
-        'qtd_empresas_regime': len(regime_df),
+        'regime': groups.label(regime),
+        'qtd_empresas_regime': groups.size(regime),
         'metricas': {}
     }
 
-    metricas = ['score_risco_final', 'total_geral', 'perc_recebido_cpf']
-
-    for metrica in metricas:
-        if metrica not in df.columns:
+    for metrica in REGIME_METRICS:
+        if metrica not in groups.sorted:
             continue
 
         valor_empresa = empresa.get(metrica, 0)
-        media_regime = regime_df[metrica].mean()
-        std_regime = regime_df[metrica].std()
+        resumo = groups.summary(regime, metrica)
 
         comparison['metricas'][metrica] = {
             'valor_empresa': valor_empresa,
-            'media_regime': media_regime,
-            'desvio_padrao': std_regime,
-            'z_score': (valor_empresa - media_regime) / std_regime if std_regime > 0 else 0
+            'media_regime': resumo['media'],
+            'desvio_padrao': resumo['desvio_padrao'],
+            'z_score': groups.z_score(regime, metrica, valor_empresa)
         }
 
     return comparison
 
 
-def benchmark_analysis(df: pd.DataFrame, cnpj: str) -> Dict[str, Any]:
+def benchmark_analysis(df: pd.DataFrame, cnpj: str,
+                       index: Optional[CNPJIndex] = None) -> Dict[str, Any]:
     """
     Análise de benchmark completa de uma empresa.
 
+    A empresa é localizada uma única vez e a mesma linha é usada nas
+    comparações com setor e regime. Estatísticas gerais e percentis (geral,
+    no setor e no regime) são lidos da tabela de percentis da carga
+    (analytics.percentiles); fora da carga completa, só a linha da empresa
+    e os seus grupos são calculados.
+
     Args:
         df: DataFrame
         cnpj: CNPJ da empresa
+        index: Índice de CNPJ de df (padrão: o da carga, database.cnpj_index)
 
     Returns:
         dict: Análise de benchmark
     """
-    if df.empty or cnpj not in df['cnpj'].values:
+    position = find_cnpj_position(df, cnpj, index)
+    if position is None:
         return {}
 
-    empresa = df[df['cnpj'] == cnpj].iloc[0]
+    empresa = df.iloc[position]
 
     benchmark = {
         'empresa': {
@@ -183,43 +209,44 @@ def benchmark_analysis(df: pd.DataFrame, cnpj: str) -> Dict[str, Any]:
         'comparacao_geral': {},
         'comparacao_setor': {},
         'comparacao_regime': {},
-        'percentis': {}
+        'percentis': {},
+        'percentis_setor': {},
+        'percentis_regime': {}
     }
 
-    metricas = ['score_risco_final', 'total_geral', 'perc_recebido_cpf']
+    # Grupos da empresa obtidos uma vez para percentis e comparações
+    row_groups = {column: get_row_group(df, column, position)
+                  for column in PERCENTILE_SCOPES.values()}
+    ranks = get_percentile_ranks(df, position, row_groups)
 
-    # Comparação geral
-    for metrica in metricas:
-        if metrica not in df.columns:
+    # Comparação geral (estatísticas e percentis calculados uma vez por carga)
+    for metrica in PERCENTILE_METRICS:
+        if metrica not in ranks.summary:
             continue
 
-        valor = empresa.get(metrica, 0)
-        serie = df[metrica]
-
         benchmark['comparacao_geral'][metrica] = {
-            'valor': valor,
-            'media_geral': serie.mean(),
-            'mediana_geral': serie.median(),
-            'min_geral': serie.min(),
-            'max_geral': serie.max()
+            'valor': empresa.get(metrica, 0),
+            **ranks.summary[metrica]
         }
+        benchmark['percentis'][metrica] = ranks.percentile(position, metrica)
 
-        # Calcular percentil
-        percentil = (serie < valor).sum() / len(serie) * 100
-        benchmark['percentis'][metrica] = percentil
+        for scope in PERCENTILE_SCOPES:
+            if f'{metrica}_percentil_{scope}' in ranks.table.columns:
+                benchmark[f'percentis_{scope}'][metrica] = ranks.percentile(position, metrica, scope)
 
     # Comparações específicas
     if 'nm_cnae1' in df.columns:
-        benchmark['comparacao_setor'] = compare_with_sector(df, cnpj)
+        benchmark['comparacao_setor'] = _compare_with_sector(empresa, cnpj, *row_groups['nm_cnae1'])
 
     if 'regime_tributario' in df.columns:
-        benchmark['comparacao_regime'] = compare_with_regime(df, cnpj)
+        benchmark['comparacao_regime'] = _compare_with_regime(empresa, *row_groups['regime_tributario'])
 
     return benchmark
 
 
 def identify_similar_companies(df: pd.DataFrame, cnpj: str, n: int = 10,
-                               similarity_features: List[str] = None) -> pd.DataFrame:
+                               similarity_features: List[str] = None,
+                               index: Optional[CNPJIndex] = None) -> pd.DataFrame:
     """
     Identifica empresas similares com base em features.
 
@@ -228,11 +255,13 @@ def identify_similar_companies(df: pd.DataFrame, cnpj: str, n: int = 10,
         cnpj: CNPJ de referência
         n: Número de empresas similares
         similarity_features: Features para comparação
+        index: Índice de CNPJ de df (padrão: o da carga, database.cnpj_index)
 
     Returns:
         pd.DataFrame: Empresas similares
     """
-    if df.empty or cnpj not in df['cnpj'].values:
+    position = find_cnpj_position(df, cnpj, index)
+    if position is None:
         return pd.DataFrame()
 
     if similarity_features is None:
@@ -245,10 +274,14 @@ def identify_similar_companies(df: pd.DataFrame, cnpj: str, n: int = 10,
     if not features:
         return pd.DataFrame()
 
-    empresa_ref = df[df['cnpj'] == cnpj][features].iloc[0]
+    empresa_ref = df.iloc[position][features].astype(float)
+
+    # Demais empresas (uma linha por CNPJ na tabela principal)
+    outras = np.ones(len(df), dtype=bool)
+    outras[position] = False
 
     # Calcular distância euclidiana normalizada
-    df_features = df[df['cnpj'] != cnpj][features].copy()
+    df_features = df.loc[outras, features].astype(float)
 
     # Normalizar features
     for feature in features:
@@ -261,7 +294,7 @@ def identify_similar_companies(df: pd.DataFrame, cnpj: str, n: int = 10,
     # Calcular distâncias
     distances = np.sqrt(((df_features - empresa_ref.values) ** 2).sum(axis=1))
 
-    df_copy = df[df['cnpj'] != cnpj].copy()
+    df_copy = df[outras].copy()
     df_copy['similarity_distance'] = distances
     df_copy = df_copy.sort_values('similarity_distance').head(n)
 
@@ -0,0 +1,179 @@
+"""
+Índices de Concentração por Grupo
+
+Calcula Gini, HHI e CR-k de todos os grupos (município, CNAE, rede de sócios
+de uma empresa...) numa única ordenação por (grupo, valor) sobre arrays
+NumPy, com somas por grupo via np.bincount. Aceita pesos (cada valor
+representando w entidades) e um acumulador que soma os valores por entidade
+a cada novo mês de pagamentos e recalcula os índices a partir desses totais.
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Quantidade de maiores participantes do CR-k
+CONCENTRATION_TOP_K = 4
+
+
+def concentration_indices(values: np.ndarray, groups: Optional[np.ndarray] = None,
+                          weights: Optional[np.ndarray] = None,
+                          k: int = CONCENTRATION_TOP_K) -> pd.DataFrame:
+    """
+    Gini, HHI e CR-k de cada grupo numa passada vetorizada.
+
+    Args:
+        values: Valor de cada entidade (nulos são ignorados)
+        groups: Rótulo do grupo de cada valor; None = um único grupo
+        weights: Quantidade de entidades representadas por cada valor
+                 (padrão 1)
+        k: Maiores participantes considerados no CR-k
+
+    Returns:
+        pd.DataFrame: Índice = grupo; colunas 'gini_index', 'hhi',
+                      'cr{k}', 'total_value' e 'count'
+    """
+    values = np.asarray(values, dtype=np.float64)
+    weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=np.float64)
+
+    if groups is None:
+        codes, labels = np.zeros(len(values), dtype=np.int64), pd.Index([None])
+    else:
+        codes, labels = pd.factorize(np.asarray(groups, dtype=object))
+        labels = pd.Index(labels)
+
+    valid = (codes >= 0) & ~np.isnan(values) & (weights > 0)
+    codes, values, weights = codes[valid], values[valid], weights[valid]
+    n_groups = len(labels)
+
+    # Ordem crescente de valor dentro de cada grupo
+    order = np.lexsort((values, codes))
+    group, x, w = codes[order], values[order], weights[order]
+    wx = w * x
+
+    count = np.bincount(group, weights=w, minlength=n_groups)
+    total = np.bincount(group, weights=wx, minlength=n_groups)
+    size = np.bincount(group, minlength=n_groups)
+    start = np.concatenate([[0], np.cumsum(size)])[:-1]
+
+    # Somas acumuladas dentro do grupo (valor e quantidade de entidades)
+    cum_value = np.cumsum(wx)
+    cum_value -= np.repeat(np.concatenate([[0], cum_value])[start], size)
+    cum_weight = np.cumsum(w)
+    cum_weight -= np.repeat(np.concatenate([[0], cum_weight])[start], size)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Gini = 1 - soma(p_i * (L_{i-1} + L_i)), L = curva de Lorenz
+        share = cum_value / total[group]
+        previous = (cum_value - wx) / total[group]
+        gini = 1 - np.bincount(group, weights=w / count[group] * (previous + share),
+                               minlength=n_groups)
+
+        # HHI na escala tradicional (0 a 10000)
+        hhi = np.bincount(group, weights=w * (x / total[group]) ** 2, minlength=n_groups) * 10000
+
+        # CR-k: entidades acima da posição atual ocupam parte das k vagas
+        above = count[group] - cum_weight
+        taken = np.clip(k - above, 0, w)
+        crk = np.bincount(group, weights=taken * x, minlength=n_groups) / total * 100
+
+    positive = total > 0
+    result = pd.DataFrame({
+        'gini_index': np.where(positive, gini, np.nan),
+        'hhi': np.where(positive, hhi, 0.0),
+        f'cr{k}': np.where(positive, crk, 0.0),
+        'total_value': total,
+        'count': count,
+    }, index=labels)
+
+    return result[size > 0]
+
+
+def calculate_concentration_by_group(df: pd.DataFrame, value_column: str,
+                                     group_column: Optional[str] = None,
+                                     entity_column: Optional[str] = None,
+                                     weight_column: Optional[str] = None,
+                                     k: int = CONCENTRATION_TOP_K) -> pd.DataFrame:
+    """
+    Índices de concentração por grupo a partir de um DataFrame.
+
+    Args:
+        df: DataFrame
+        value_column: Coluna de valores
+        group_column: Coluna de agrupamento (ex.: 'municipio', 'nm_cnae1',
+                      'cnpj' para a rede de sócios de cada empresa)
+        entity_column: Coluna da entidade (ex.: 'cpf_socio'); quando
+                       informada, os valores são somados por entidade antes
+        weight_column: Coluna de pesos (entidades representadas por linha)
+        k: Maiores participantes considerados no CR-k
+
+    Returns:
+        pd.DataFrame: Um grupo por linha (ver concentration_indices)
+    """
+    needed = [c for c in (value_column, group_column, entity_column, weight_column) if c]
+    if df.empty or any(c not in df.columns for c in needed):
+        return pd.DataFrame()
+
+    if entity_column is not None:
+        keys = [c for c in (group_column, entity_column) if c]
+        df = df.groupby(keys, observed=True, sort=False)[value_column].sum(min_count=1).reset_index()
+        weight_column = None
+
+    return concentration_indices(
+        df[value_column].to_numpy(dtype=np.float64, na_value=np.nan),
+        df[group_column].to_numpy() if group_column else None,
+        df[weight_column].to_numpy(dtype=np.float64, na_value=np.nan) if weight_column else None,
+        k,
+    )
+
+
+class ConcentrationAccumulator:
+    """
+    Totais por (grupo, entidade) atualizados a cada bloco de pagamentos.
+
+    Ao incluir um novo mês, apenas os pagamentos do mês são agregados e
+    somados aos totais; os índices são recalculados sobre os totais (uma
+    linha por entidade), sem reler os meses anteriores.
+    """
+
+    def __init__(self, value_column: str = 'vl_total', group_column: str = 'cnpj',
+                 entity_column: str = 'cpf_socio', k: int = CONCENTRATION_TOP_K):
+        self.value_column = value_column
+        self.group_column = group_column
+        self.entity_column = entity_column
+        self.k = k
+        self.totals = pd.Series(dtype='float64')
+        self.rows = 0
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """
+        Incorpora um bloco (ex.: um mês de pagamentos).
+
+        Args:
+            chunk: Bloco com as colunas de grupo, entidade e valor
+        """
+        columns = [self.group_column, self.entity_column, self.value_column]
+        if chunk.empty or any(c not in chunk.columns for c in columns):
+            return
+
+        self.rows += len(chunk)
+        part = chunk.groupby([self.group_column, self.entity_column],
+                             observed=True, sort=False)[self.value_column].sum()
+        self.totals = part if self.totals.empty else self.totals.add(part, fill_value=0)
+
+    def result(self) -> pd.DataFrame:
+        """
+        Índices atuais por grupo.
+
+        Returns:
+            pd.DataFrame: Um grupo por linha (ver concentration_indices)
+        """
+        if self.totals.empty:
+            return pd.DataFrame()
+
+        return concentration_indices(
+            self.totals.to_numpy(dtype=np.float64),
+            self.totals.index.get_level_values(0).to_numpy(),
+            k=self.k,
+        )
@@ -0,0 +1,349 @@
+"""
+Cubo de KPIs Pré-Agregado
+
+Agrega a tabela principal uma única vez por (classificação, regime, UF,
+município, CNAE, faixa de score, faixa de %CPF) com medidas aditivas
+(contagem, somas e somas de quadrados). KPIs de qualquer combinação de
+filtros compatível com o cubo são obtidos somando células, sem varrer as
+linhas novamente.
+"""
+
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..database.derived import snapshot_cached
+from .kpis import KPI_MEASURES, kpis_from_totals
+
+CUBE_SCORE_BUCKET = 10      # Largura das faixas de score_risco_final
+CUBE_PERC_CPF_BUCKET = 10   # Largura das faixas de perc_recebido_cpf
+
+# Dimensões categóricas (filtro do FilterSpec -> coluna)
+CUBE_DIMENSIONS = {
+    'classificacao': 'classificacao_risco',
+    'regime': 'regime_tributario',
+    'uf': 'uf',
+    'municipio': 'municipio',
+    'setor': 'nm_cnae1',
+}
+
+# Medidas numéricas: soma, soma de quadrados e contagem de não nulos
+CUBE_MEASURES = KPI_MEASURES
+
+_SCORE_COL = 'faixa_score'
+_PERC_COL = 'faixa_perc_cpf'
+
+# Colunas lidas na construção do cubo
+_CUBE_COLUMNS = list(dict.fromkeys(
+    list(CUBE_DIMENSIONS.values()) + CUBE_MEASURES + ['score_risco_final', 'perc_recebido_cpf']
+))
+
+
+def _bucket(values: np.ndarray, width: float) -> np.ndarray:
+    """Limite inferior da faixa; o valor máximo (ex.: 100) cai na última faixa."""
+    buckets = np.floor(values / width) * width
+    top = np.nanmax(values) if np.isfinite(values).any() else 0
+    top_bucket = np.floor(top / width) * width
+    if top == top_bucket and top > 0:
+        buckets[buckets == top_bucket] = top_bucket - width
+    return buckets
+
+
+class KPICube:
+    """Cubo de medidas aditivas sobre o DataFrame principal."""
+
+    def __init__(self, cells: pd.DataFrame, dimensions: List[str], measures: List[str],
+                 score_range: tuple, perc_range: tuple):
+        self.cells = cells
+        self.dimensions = dimensions
+        self.measures = measures
+        self.score_range = score_range
+        self.perc_range = perc_range
+
+    @classmethod
+    def build(cls, df: pd.DataFrame) -> 'KPICube':
+        """
+        Constrói o cubo a partir do DataFrame principal.
+
+        Args:
+            df: DataFrame com dados principais
+
+        Returns:
+            KPICube: Cubo agregado
+        """
+        dimensions = [col for col in CUBE_DIMENSIONS.values() if col in df.columns]
+        measures = [col for col in CUBE_MEASURES if col in df.columns]
+
+        data = {col: df[col].to_numpy() for col in dimensions}
+        data['n'] = np.ones(len(df), dtype=np.int64)
+
+        score = (df['score_risco_final'].to_numpy(dtype=float, na_value=np.nan)
+                 if 'score_risco_final' in df.columns else np.full(len(df), np.nan))
+        perc = (df['perc_recebido_cpf'].to_numpy(dtype=float, na_value=np.nan)
+                if 'perc_recebido_cpf' in df.columns else np.full(len(df), np.nan))
+
+        data[_SCORE_COL] = _bucket(score, CUBE_SCORE_BUCKET)
+        data[_PERC_COL] = _bucket(perc, CUBE_PERC_CPF_BUCKET)
+        data['alerta_critico'] = (score >= 90).astype(np.int64)
+        data['acima_50pct_cpf'] = (perc > 50).astype(np.int64)
+
+        for col in measures:
+            values = df[col].to_numpy(dtype=float, na_value=np.nan)
+            valid = ~np.isnan(values)
+            data[f'{col}_sum'] = np.where(valid, values, 0.0)
+            data[f'{col}_sq'] = np.where(valid, values * values, 0.0)
+            data[f'{col}_cnt'] = valid.astype(np.int64)
+
+        keys = dimensions + [_SCORE_COL, _PERC_COL]
+        cells = (
+            pd.DataFrame(data)
+            .groupby(keys, observed=True, dropna=False, sort=False)
+            .sum()
+            .reset_index()
+        )
+
+        def _range(values):
+            finite = values[np.isfinite(values)]
+            return (finite.min(), finite.max()) if finite.size else (np.nan, np.nan)
+
+        return cls(cells, dimensions, measures, _range(score), _range(perc))
+
+    @staticmethod
+    def _aligned(value: float, value_range: tuple, width: float) -> bool:
+        """Mínimo coincide com limite de faixa (o máximo exato cai na faixa anterior)."""
+        if value <= value_range[0]:
+            return True
+        return value % width == 0 and value != value_range[1]
+
+    def supports(self, spec) -> bool:
+        """
+        Indica se os filtros podem ser respondidos pelo cubo.
+
+        Faixas numéricas precisam coincidir com os limites das faixas (ou
+        não excluir nenhuma linha); filtros sem dimensão no cubo (valor
+        mínimo) não são suportados.
+
+        Args:
+            spec: FilterSpec (database.filters)
+
+        Returns:
+            bool: True se os KPIs podem vir do cubo
+        """
+        if spec is None:
+            return True
+
+        for name, column, _, value in spec.active():
+            if name in CUBE_DIMENSIONS:
+                if CUBE_DIMENSIONS[name] not in self.dimensions:
+                    return False
+            elif name == 'score_min':
+                if not self._aligned(value, self.score_range, CUBE_SCORE_BUCKET):
+                    return False
+            elif name == 'score_max':
+                if not value >= self.score_range[1]:
+                    return False
+            elif name == 'perc_cpf_min':
+                if not self._aligned(value, self.perc_range, CUBE_PERC_CPF_BUCKET):
+                    return False
+            else:
+                return False
+
+        return True
+
+    @staticmethod
+    def _bucket_mask(buckets: np.ndarray, name: str, value: float, value_range: tuple) -> np.ndarray:
+        """Células de faixa que atendem a um filtro de mínimo ou máximo (ver supports)."""
+        if name.endswith('_max') or value <= value_range[0]:
+            # Não exclui nenhum valor: apenas as faixas nulas ficam de fora
+            return ~np.isnan(buckets)
+        return buckets >= value
+
+    def select(self, spec=None) -> pd.DataFrame:
+        """
+        Células que atendem aos filtros.
+
+        Args:
+            spec: FilterSpec compatível (ver supports)
+
+        Returns:
+            pd.DataFrame: Células do cubo
+        """
+        if spec is None or spec.is_empty():
+            return self.cells
+
+        cells = self.cells
+        mask = np.ones(len(cells), dtype=bool)
+
+        # Faixas nulas nunca atendem a um filtro numérico (como no FilterSpec)
+        for name, column, _, value in spec.active():
+            if name in CUBE_DIMENSIONS:
+                mask &= cells[column].isin(value).to_numpy()
+            elif name in ('score_min', 'score_max'):
+                mask &= self._bucket_mask(cells[_SCORE_COL].to_numpy(), name, value, self.score_range)
+            elif name == 'perc_cpf_min':
+                mask &= self._bucket_mask(cells[_PERC_COL].to_numpy(), name, value, self.perc_range)
+
+        return cells[mask]
+
+    def _totals(self, cells: pd.DataFrame) -> pd.Series:
+        measure_cols = [col for col in cells.columns if col not in self.dimensions
+                        and col not in (_SCORE_COL, _PERC_COL)]
+        return cells[measure_cols].sum()
+
+    def kpis(self, spec=None) -> Optional[Dict[str, Any]]:
+        """
+        KPIs do dashboard (mesmas chaves de calculate_kpis) a partir do cubo.
+
+        Args:
+            spec: FilterSpec com os filtros aplicados
+
+        Returns:
+            dict ou None: KPIs, ou None se o filtro não for compatível
+        """
+        if not self.supports(spec):
+            return None
+
+        cells = self.select(spec)
+        totals = self._totals(cells)
+        n = int(totals.get('n', 0))
+
+        if 'classificacao_risco' in self.dimensions:
+            por_classe = cells.groupby('classificacao_risco', observed=True)['n'].sum()
+            classes = {label: int(count) for label, count in por_classe.items()}
+        else:
+            classes = {}
+
+        return kpis_from_totals(
+            n,
+            sums={col: totals[f'{col}_sum'] for col in self.measures},
+            counts={col: int(totals[f'{col}_cnt']) for col in self.measures},
+            classes=classes,
+            alerta_critico=totals.get('alerta_critico', 0),
+            acima_50pct_cpf=totals.get('acima_50pct_cpf', 0),
+        )
+
+    def stats(self, column: str, spec=None) -> Optional[Dict[str, float]]:
+        """
+        Contagem, média e desvio-padrão de uma medida (via somas de quadrados).
+
+        Args:
+            column: Medida do cubo
+            spec: FilterSpec compatível
+
+        Returns:
+            dict ou None: 'count', 'mean', 'std' (amostral)
+        """
+        if column not in self.measures or not self.supports(spec):
+            return None
+
+        totals = self._totals(self.select(spec))
+        count = totals[f'{column}_cnt']
+        if count == 0:
+            return {'count': 0, 'mean': 0.0, 'std': 0.0}
+
+        mean = totals[f'{column}_sum'] / count
+        var = (totals[f'{column}_sq'] - count * mean * mean) / (count - 1) if count > 1 else 0.0
+
+        return {'count': int(count), 'mean': float(mean), 'std': float(np.sqrt(max(var, 0.0)))}
+
+    def _group(self, dimension: str, spec) -> Optional[pd.DataFrame]:
+        """Soma as células por uma dimensão (None se incompatível)."""
+        if dimension not in self.dimensions or not self.supports(spec):
+            return None
+
+        cells = self.select(spec)
+        measure_cols = ['n'] + [f'{col}_{suffix}' for col in self.measures
+                                for suffix in ('sum', 'cnt')]
+        return cells.groupby(dimension, observed=True)[measure_cols].sum()
+
+    def _group_mean(self, grouped: pd.DataFrame, column: str) -> pd.Series:
+        if f'{column}_sum' not in grouped.columns:
+            return pd.Series(np.nan, index=grouped.index)
+        return grouped[f'{column}_sum'] / grouped[f'{column}_cnt'].replace(0, np.nan)
+
+    def _group_sum(self, grouped: pd.DataFrame, column: str) -> pd.Series:
+        if f'{column}_sum' not in grouped.columns:
+            return pd.Series(0.0, index=grouped.index)
+        return grouped[f'{column}_sum']
+
+    def by_municipio(self, spec=None, top_n: int = 20) -> Optional[pd.DataFrame]:
+        """Equivalente a calculate_kpis_by_municipio, a partir do cubo."""
+        grouped = self._group('municipio', spec)
+        if grouped is None:
+            return None
+
+        result = pd.DataFrame({
+            'municipio': grouped.index,
+            'qtd_empresas': grouped['n'].to_numpy(),
+            'volume_total': self._group_sum(grouped, 'total_geral').to_numpy(),
+            'volume_cpf': self._group_sum(grouped, 'total_recebido_cpf').to_numpy(),
+            'score_medio': self._group_mean(grouped, 'score_risco_final').to_numpy(),
+        })
+        return result.sort_values('volume_total', ascending=False).head(top_n)
+
+    def by_uf(self, spec=None) -> Optional[pd.DataFrame]:
+        """Equivalente a calculate_kpis_by_uf, a partir do cubo."""
+        grouped = self._group('uf', spec)
+        if grouped is None:
+            return None
+
+        return pd.DataFrame({
+            'uf': grouped.index,
+            'qtd_empresas': grouped['n'].to_numpy(),
+            'volume_total': self._group_sum(grouped, 'total_geral').to_numpy(),
+            'volume_cpf': self._group_sum(grouped, 'total_recebido_cpf').to_numpy(),
+            'score_medio': self._group_mean(grouped, 'score_risco_final').to_numpy(),
+        })
+
+    def by_regime(self, spec=None) -> Optional[pd.DataFrame]:
+        """Equivalente a calculate_kpis_by_regime, a partir do cubo."""
+        grouped = self._group('regime_tributario', spec)
+        if grouped is None:
+            return None
+
+        return pd.DataFrame({
+            'regime_tributario': grouped.index,
+            'cnpj_count': grouped['n'].to_numpy(),
+            'total_geral_sum': self._group_sum(grouped, 'total_geral').to_numpy(),
+            'total_geral_mean': self._group_mean(grouped, 'total_geral').to_numpy(),
+            'total_recebido_cpf_sum': self._group_sum(grouped, 'total_recebido_cpf').to_numpy(),
+            'perc_recebido_cpf_mean': self._group_mean(grouped, 'perc_recebido_cpf').to_numpy(),
+            'score_risco_final_mean': self._group_mean(grouped, 'score_risco_final').to_numpy(),
+        })
+
+    def by_setor(self, spec=None, top_n: int = 15) -> Optional[pd.DataFrame]:
+        """Equivalente a calculate_kpis_by_setor, a partir do cubo."""
+        grouped = self._group('nm_cnae1', spec)
+        if grouped is None:
+            return None
+
+        result = pd.DataFrame({
+            'setor': grouped.index,
+            'qtd_empresas': grouped['n'].to_numpy(),
+            'volume_total': self._group_sum(grouped, 'total_geral').to_numpy(),
+            'volume_cpf': self._group_sum(grouped, 'total_recebido_cpf').to_numpy(),
+            'perc_medio_cpf': self._group_mean(grouped, 'perc_recebido_cpf').to_numpy(),
+            'score_medio': self._group_mean(grouped, 'score_risco_final').to_numpy(),
+        })
+        return result.sort_values('volume_total', ascending=False).head(top_n)
+
+
+def get_kpi_cube(df: pd.DataFrame) -> Optional[KPICube]:
+    """
+    Obtém o cubo do DataFrame principal, construindo-o uma vez por snapshot.
+
+    O cubo é reaproveitado entre reruns enquanto df.attrs['snapshot_token']
+    e a ordem das linhas não mudarem (ver database.derived). Sem token, o
+    cubo não é guardado.
+
+    Args:
+        df: DataFrame principal (sem filtros)
+
+    Returns:
+        KPICube ou None: Cubo, ou None se o DataFrame estiver vazio
+    """
+    if df is None or df.empty:
+        return None
+
+    return snapshot_cached(df, 'kpi_cube', KPICube.build, columns=_CUBE_COLUMNS)
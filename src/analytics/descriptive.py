@@ -0,0 +1,295 @@
+"""
+Motor de Estatísticas Descritivas
+
+Calcula contagem, média, desvio-padrão, assimetria, curtose, mínimo, máximo
+e quantis de várias colunas com uma passada por coluna: os momentos centrais
+saem de uma única diferença em relação à média e os quantis de um único
+np.partition nas posições necessárias.
+
+No modo streaming (StreamingDescriptiveStats), os momentos de cada bloco são
+combinados com os acumulados (Welford/Chan, exato) e os quantis vêm de um
+resumo de tamanho fixo (analytics.sketches, aproximado), de modo que a memória
+não depende do número de linhas.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .sketches import STATS_SKETCH_SIZE, QuantileSketch
+
+# Quantis reportados (nome -> fração); a mediana é calculada junto
+DESCRIPTIVE_QUANTILES = {
+    'q25': 0.25,
+    'q75': 0.75,
+    'q90': 0.90,
+    'q95': 0.95,
+    'q99': 0.99,
+}
+
+_QUANTILES = np.array([0.5] + list(DESCRIPTIVE_QUANTILES.values()))
+
+
+class ColumnMoments:
+    """Contagem, média, somas de potências centrais (2 a 4), mínimo e máximo."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @classmethod
+    def from_values(cls, values: np.ndarray) -> 'ColumnMoments':
+        """
+        Momentos de um array sem nulos.
+
+        Args:
+            values: Valores (float64, sem NaN)
+
+        Returns:
+            ColumnMoments: Momentos do array
+        """
+        moments = cls()
+        n = len(values)
+        if n == 0:
+            return moments
+
+        mean = values.sum() / n
+        deviation = values - mean
+        squares = deviation * deviation
+
+        moments.n = n
+        moments.mean = float(mean)
+        moments.m2 = float(squares.sum())
+        moments.m3 = float((squares * deviation).sum())
+        moments.m4 = float((squares * squares).sum())
+        moments.min = float(values.min())
+        moments.max = float(values.max())
+        return moments
+
+    def merge(self, other: 'ColumnMoments') -> 'ColumnMoments':
+        """
+        Combina com os momentos de outro bloco (fórmulas de Chan/Pébay).
+
+        Args:
+            other: Momentos do bloco
+
+        Returns:
+            ColumnMoments: o próprio objeto, atualizado
+        """
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+
+        na, nb = self.n, other.n
+        n = na + nb
+        delta = other.mean - self.mean
+        delta_n = delta / n
+
+        m2 = self.m2 + other.m2 + delta * delta_n * na * nb
+        m3 = (self.m3 + other.m3
+              + delta * delta_n * delta_n * na * nb * (na - nb)
+              + 3 * delta_n * (na * other.m2 - nb * self.m2))
+        m4 = (self.m4 + other.m4
+              + delta * delta_n ** 3 * na * nb * (na * na - na * nb + nb * nb)
+              + 6 * delta_n * delta_n * (na * na * other.m2 + nb * nb * self.m2)
+              + 4 * delta_n * (na * other.m3 - nb * self.m3))
+
+        self.n = n
+        self.mean += delta_n * nb
+        self.m2, self.m3, self.m4 = m2, m3, m4
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Estatísticas com as mesmas convenções do pandas.
+
+        Desvio-padrão amostral (ddof=1), assimetria e curtose (excesso)
+        ajustadas pelo tamanho da amostra, como Series.skew/Series.kurtosis.
+
+        Returns:
+            dict: 'count', 'mean', 'std', 'min', 'max', 'skewness', 'kurtosis'
+        """
+        n = self.n
+        std = np.sqrt(self.m2 / (n - 1)) if n > 1 else np.nan
+
+        if n < 3:
+            skewness = np.nan
+        elif self.m2 == 0:
+            skewness = 0.0
+        else:
+            skewness = n * np.sqrt(n - 1) / (n - 2) * self.m3 / self.m2 ** 1.5
+
+        if n < 4:
+            kurtosis = np.nan
+        elif self.m2 == 0:
+            kurtosis = 0.0
+        else:
+            kurtosis = ((n + 1) * n * (n - 1) * self.m4 / ((n - 2) * (n - 3) * self.m2 ** 2)
+                        - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3)))
+
+        return {
+            'count': n,
+            'mean': self.mean if n else np.nan,
+            'std': std,
+            'min': self.min if n else np.nan,
+            'max': self.max if n else np.nan,
+            'skewness': skewness,
+            'kurtosis': kurtosis,
+        }
+
+
+def exact_quantiles(values: np.ndarray, quantiles: Sequence[float]) -> np.ndarray:
+    """
+    Quantis com interpolação linear (como Series.quantile) via um np.partition.
+
+    Args:
+        values: Valores (float64, sem NaN)
+        quantiles: Frações entre 0 e 1
+
+    Returns:
+        np.ndarray: Quantis, na ordem pedida
+    """
+    quantiles = np.asarray(quantiles, dtype=np.float64)
+    if len(values) == 0:
+        return np.full(len(quantiles), np.nan)
+
+    position = quantiles * (len(values) - 1)
+    low = np.floor(position).astype(np.int64)
+    high = np.ceil(position).astype(np.int64)
+
+    partitioned = np.partition(values, np.unique(np.concatenate([low, high])))
+    low_values, high_values = partitioned[low], partitioned[high]
+
+    return low_values + (high_values - low_values) * (position - low)
+
+
+def _column_values(df: pd.DataFrame, column: str) -> np.ndarray:
+    """Valores não nulos da coluna como float64."""
+    values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+    return values[~np.isnan(values)]
+
+
+def _stats_row(moments: ColumnMoments, quantiles: np.ndarray) -> Dict[str, float]:
+    """Linha no formato de calculate_descriptive_stats."""
+    stats = moments.stats()
+    row = {
+        'count': stats['count'],
+        'mean': stats['mean'],
+        'median': quantiles[0],
+        'std': stats['std'],
+        'min': stats['min'],
+        'max': stats['max'],
+    }
+    row.update(zip(DESCRIPTIVE_QUANTILES, quantiles[1:]))
+    row['skewness'] = stats['skewness']
+    row['kurtosis'] = stats['kurtosis']
+    return row
+
+
+def describe_columns(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """
+    Estatísticas descritivas de várias colunas, uma passada por coluna.
+
+    Args:
+        df: DataFrame
+        columns: Colunas numéricas
+
+    Returns:
+        pd.DataFrame: Uma linha por coluna (colunas sem valores são omitidas)
+    """
+    rows = {}
+
+    for column in columns:
+        if column not in df.columns:
+            continue
+
+        values = _column_values(df, column)
+        if len(values) == 0:
+            continue
+
+        rows[column] = _stats_row(ColumnMoments.from_values(values),
+                                  exact_quantiles(values, _QUANTILES))
+
+    return pd.DataFrame(rows).T
+
+
+class StreamingDescriptiveStats:
+    """
+    Acumula estatísticas descritivas bloco a bloco.
+
+    Momentos são exatos; quantis são aproximados (QuantileSketch). A memória
+    ocupada é proporcional ao número de colunas, não ao de linhas.
+    """
+
+    def __init__(self, columns: List[str], sketch_size: int = STATS_SKETCH_SIZE):
+        self.columns = columns
+        self.rows = 0
+        self.chunks = 0
+        self.moments = {column: ColumnMoments() for column in columns}
+        self.sketches = {column: QuantileSketch(sketch_size) for column in columns}
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """
+        Incorpora um bloco.
+
+        Args:
+            chunk: Bloco de linhas
+        """
+        if chunk.empty:
+            return
+
+        self.rows += len(chunk)
+        self.chunks += 1
+
+        for column in self.columns:
+            if column not in chunk.columns:
+                continue
+
+            values = _column_values(chunk, column)
+            self.moments[column].merge(ColumnMoments.from_values(values))
+            self.sketches[column].update(values)
+
+    def result(self) -> pd.DataFrame:
+        """
+        Estatísticas finais (mesmo formato de describe_columns).
+
+        Returns:
+            pd.DataFrame: Uma linha por coluna com valores
+        """
+        rows = {
+            column: _stats_row(moments, self.sketches[column].quantiles(_QUANTILES))
+            for column, moments in self.moments.items() if moments.n > 0
+        }
+        return pd.DataFrame(rows).T
+
+
+def describe_columns_stream(chunks: Iterable[pd.DataFrame], columns: List[str],
+                            sketch_size: Optional[int] = None) -> pd.DataFrame:
+    """
+    Estatísticas descritivas de uma tabela lida em blocos.
+
+    Args:
+        chunks: Iterável de blocos (ex.: database.streaming.iter_pagamentos)
+        columns: Colunas numéricas
+        sketch_size: Capacidade dos níveis do resumo de quantis (padrão
+                     STATS_SKETCH_SIZE)
+
+    Returns:
+        pd.DataFrame: Uma linha por coluna (quantis aproximados)
+    """
+    accumulator = StreamingDescriptiveStats(columns, sketch_size or STATS_SKETCH_SIZE)
+
+    for chunk in chunks:
+        accumulator.update(chunk)
+
+    return accumulator.result()
@@ -0,0 +1,231 @@
+"""
+Posições e Métricas por Grupo (Setor e Regime)
+
+Para uma coluna de agrupamento (ex.: nm_cnae1, regime_tributario), guarda
+as posições das linhas de cada grupo e, para cada métrica, os valores
+ordenados dentro do grupo junto com média, mediana e desvio-padrão. Posição
+no ranking, percentil e z-score de uma empresa no seu grupo viram uma busca
+binária, sem filtrar nem ordenar o grupo a cada consulta. As estruturas são
+construídas uma vez por carga (snapshot_token); fora da carga completa
+(sem token ou numa seleção), get_row_group calcula só o grupo consultado.
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..database.derived import is_snapshot_frame, snapshot_cached
+
+# Métricas comparadas com setor e regime
+GROUP_METRICS = ['score_risco_final', 'total_geral', 'perc_recebido_cpf',
+                 'total_recebido_cpf', 'qtd_socios_recebendo']
+
+
+class GroupPositions:
+    """Posições das linhas e métricas ordenadas por grupo de uma coluna."""
+
+    def __init__(self, df: pd.DataFrame, column: str, metrics: Sequence[str] = GROUP_METRICS,
+                 rows: Optional[np.ndarray] = None):
+        """
+        Args:
+            df: DataFrame
+            column: Coluna de agrupamento
+            metrics: Métricas a ordenar e resumir
+            rows: Posições (crescentes) de um único grupo; as demais linhas
+                  ficam fora de qualquer grupo (padrão: todos os grupos)
+        """
+        if rows is None:
+            series = df[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                codes, labels = series.cat.codes.to_numpy(), series.cat.categories
+            else:
+                codes, labels = pd.factorize(series)
+
+            # Posições agrupadas (nulos na coluna ficam fora de qualquer grupo)
+            order = np.argsort(codes, kind='stable')
+            order = order[codes[order] >= 0]
+        else:
+            codes = np.full(len(df), -1, dtype=np.int64)
+            codes[rows] = 0
+            labels = [df[column].iat[rows[0]]] if len(rows) else []
+            order = np.asarray(rows)
+
+        self.column = column
+        self.codes = codes
+        self.labels = pd.Index(labels)
+
+        n_groups = len(labels)
+        group = codes[order]
+
+        self.sizes = np.bincount(group, minlength=n_groups)
+        self.ptr = np.concatenate([[0], np.cumsum(self.sizes)])
+        self.rows = order
+
+        self.sorted: Dict[str, np.ndarray] = {}
+        self.counts: Dict[str, np.ndarray] = {}
+        self.means: Dict[str, np.ndarray] = {}
+        self.medians: Dict[str, np.ndarray] = {}
+        self.stds: Dict[str, np.ndarray] = {}
+
+        start = self.ptr[:-1]
+
+        for metric in metrics:
+            if metric not in df.columns:
+                continue
+
+            values = df[metric].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+            valid = ~np.isnan(values)
+
+            # Ordena por (grupo, valor); nulos ficam no fim de cada grupo
+            sorted_values = values[np.lexsort((values, group))] if n_groups > 1 else np.sort(values)
+
+            count = np.bincount(group[valid], minlength=n_groups)
+            total = np.bincount(group, weights=np.where(valid, values, 0.0), minlength=n_groups)
+
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = np.where(count > 0, total / count, np.nan)
+                deviation = np.where(valid, values - mean[group], 0.0)
+                squares = np.bincount(group, weights=deviation * deviation, minlength=n_groups)
+                std = np.where(count > 1, np.sqrt(squares / (count - 1)), np.nan)
+
+            # Mediana: elemento(s) central(is) dos valores válidos do grupo
+            median = np.full(n_groups, np.nan)
+            filled = count > 0
+            low = start[filled] + (count[filled] - 1) // 2
+            high = start[filled] + count[filled] // 2
+            median[filled] = (sorted_values[low] + sorted_values[high]) / 2
+
+            self.sorted[metric] = sorted_values
+            self.counts[metric] = count
+            self.means[metric] = mean
+            self.medians[metric] = median
+            self.stds[metric] = std
+
+    def group_of(self, position: int) -> Optional[int]:
+        """Código do grupo da linha (None se a coluna for nula)."""
+        code = int(self.codes[position])
+        return code if code >= 0 else None
+
+    def label(self, group: int):
+        """Valor da coluna de agrupamento do grupo."""
+        return self.labels[group]
+
+    def size(self, group: int) -> int:
+        """Quantidade de linhas do grupo."""
+        return int(self.sizes[group])
+
+    def group_rows(self, group: int) -> np.ndarray:
+        """Posições (iloc) das linhas do grupo."""
+        return self.rows[self.ptr[group]:self.ptr[group + 1]]
+
+    def summary(self, group: int, metric: str) -> Dict[str, float]:
+        """
+        Média, mediana e desvio-padrão amostral da métrica no grupo.
+
+        Args:
+            group: Código do grupo
+            metric: Métrica (de GROUP_METRICS)
+
+        Returns:
+            dict: 'count', 'media', 'mediana', 'desvio_padrao'
+        """
+        return {
+            'count': int(self.counts[metric][group]),
+            'media': float(self.means[metric][group]),
+            'mediana': float(self.medians[metric][group]),
+            'desvio_padrao': float(self.stds[metric][group]),
+        }
+
+    def rank(self, group: int, metric: str, value: float) -> Dict[str, float]:
+        """
+        Posição de um valor no ranking decrescente do grupo.
+
+        Empates recebem a melhor posição; valores nulos ficam após os demais.
+
+        Args:
+            group: Código do grupo
+            metric: Métrica (de GROUP_METRICS)
+            value: Valor da empresa
+
+        Returns:
+            dict: 'posicao', 'total', 'percentil'
+        """
+        total = self.size(group)
+        count = int(self.counts[metric][group])
+
+        if pd.isna(value):
+            posicao = count + 1
+        else:
+            start = self.ptr[group]
+            segment = self.sorted[metric][start:start + count]
+            posicao = count - int(np.searchsorted(segment, value, side='right')) + 1
+
+        return {
+            'posicao': posicao,
+            'total': total,
+            'percentil': (total - posicao) / total * 100,
+        }
+
+    def z_score(self, group: int, metric: str, value: float) -> float:
+        """Z-score do valor no grupo (0 se o desvio-padrão não for positivo)."""
+        std = self.stds[metric][group]
+        return (value - self.means[metric][group]) / std if std > 0 else 0
+
+
+def get_group_positions(df: pd.DataFrame, column: str) -> Optional[GroupPositions]:
+    """
+    Obtém as posições por grupo de uma coluna, construindo-as uma vez por carga.
+
+    São reaproveitadas enquanto df.attrs['snapshot_token'] e a ordem das
+    linhas não mudarem (ver database.derived). Sem token, a estrutura não é
+    guardada.
+
+    Args:
+        df: DataFrame principal (sem filtros)
+        column: Coluna de agrupamento (ex.: 'nm_cnae1', 'regime_tributario')
+
+    Returns:
+        GroupPositions ou None: Estrutura, ou None se a coluna não existir
+    """
+    if df is None or column not in df.columns:
+        return None
+
+    return snapshot_cached(df, 'group_positions', lambda data: GroupPositions(data, column),
+                           args=column, columns=[column] + GROUP_METRICS)
+
+
+def get_row_group(df: pd.DataFrame, column: str, position: int,
+                  metrics: Sequence[str] = GROUP_METRICS) -> Tuple[Optional[GroupPositions], Optional[int]]:
+    """
+    Estrutura por grupo e o grupo de uma linha.
+
+    Na carga completa (is_snapshot_frame) usa as posições de todos os grupos
+    (get_group_positions, guardadas por carga). Nos demais DataFrames, que
+    não guardam a estrutura, calcula apenas o grupo da linha e as métricas
+    pedidas, sem ordenar os demais grupos.
+
+    Args:
+        df: DataFrame
+        column: Coluna de agrupamento (ex.: 'nm_cnae1', 'regime_tributario')
+        position: Posição (iloc) da linha
+        metrics: Métricas usadas (apenas fora da carga completa)
+
+    Returns:
+        tuple: (GroupPositions, código do grupo); (None, None) se a coluna
+               não existir
+    """
+    if df is None or column not in df.columns:
+        return None, None
+
+    if is_snapshot_frame(df):
+        groups = get_group_positions(df, column)
+        return groups, groups.group_of(position)
+
+    value = df[column].iat[position]
+    if pd.isna(value):
+        return None, None
+
+    rows = np.flatnonzero((df[column] == value).to_numpy(dtype=bool, na_value=False))
+    groups = GroupPositions(df, column, metrics, rows=rows)
+    return groups, groups.group_of(position)
@@ -0,0 +1,370 @@
+"""
+Testes de Hipótese em Lote entre Grupos
+
+Compara uma métrica entre todos os grupos de uma coluna (regime,
+classificação, CNAE), par a par ou cada grupo contra os demais, com t-test,
+Mann-Whitney U ou teste de permutação, e corrige os p-valores para
+comparações múltiplas. Contagens, médias, variâncias e somas de postos dos
+grupos saem de somas por grupo (np.bincount) sobre uma única ordenação; o
+modo permutação distribui as permutações entre threads. Os resultados são
+guardados por carga (snapshot_token).
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from ..config.settings import ANALYTICS_CONFIG
+from ..database.derived import snapshot_cached
+
+HYPOTHESIS_TESTS = ['ttest', 'mannwhitneyu', 'permutation']
+HYPOTHESIS_MODES = ['pairwise', 'one_vs_rest']
+HYPOTHESIS_CORRECTIONS = ['bonferroni', 'holm', 'fdr_bh']
+
+# Rótulo do grupo complementar no modo one_vs_rest
+REST_LABEL = 'DEMAIS'
+
+# Elementos por lote de permutações (linhas x permutações)
+_PERMUTATION_BATCH_CELLS = 4_000_000
+
+
+def adjust_p_values(p_values: np.ndarray, method: Optional[str] = 'holm') -> np.ndarray:
+    """
+    Corrige p-valores para comparações múltiplas.
+
+    Args:
+        p_values: P-valores (nulos são mantidos e não contam como testes)
+        method: 'bonferroni', 'holm', 'fdr_bh' (Benjamini-Hochberg) ou None
+
+    Returns:
+        np.ndarray: P-valores ajustados
+    """
+    p_values = np.asarray(p_values, dtype=np.float64)
+    if method is None:
+        return p_values.copy()
+    if method not in HYPOTHESIS_CORRECTIONS:
+        raise ValueError(f"Correção desconhecida: {method}")
+
+    adjusted = np.full(len(p_values), np.nan)
+    valid = np.flatnonzero(~np.isnan(p_values))
+    m = len(valid)
+    if m == 0:
+        return adjusted
+
+    order = valid[np.argsort(p_values[valid], kind='stable')]
+    ranked = p_values[order]
+
+    if method == 'bonferroni':
+        result = ranked * m
+    elif method == 'holm':
+        result = np.maximum.accumulate(ranked * (m - np.arange(m)))
+    else:
+        result = np.minimum.accumulate((ranked * m / np.arange(1, m + 1))[::-1])[::-1]
+
+    adjusted[order] = np.minimum(result, 1.0)
+    return adjusted
+
+
+class _GroupedValues:
+    """Valores válidos ordenados por (grupo, valor) e somas por grupo."""
+
+    def __init__(self, values: np.ndarray, codes: np.ndarray, labels: pd.Index, min_size: int):
+        valid = (codes >= 0) & ~np.isnan(values)
+        values, codes = values[valid], codes[valid]
+
+        # Somente grupos com tamanho mínimo, recodificados em 0..G-1
+        size = np.bincount(codes, minlength=len(labels))
+        kept = np.flatnonzero(size >= min_size)
+        remap = np.full(len(labels), -1)
+        remap[kept] = np.arange(len(kept))
+        codes = remap[codes]
+        values, codes = values[codes >= 0], codes[codes >= 0]
+
+        order = np.lexsort((values, codes))
+        self.values = values[order]
+        self.codes = codes[order]
+        self.labels = labels[kept]
+
+        n_groups = len(kept)
+        self.n = np.bincount(self.codes, minlength=n_groups)
+        self.start = np.concatenate([[0], np.cumsum(self.n)])[:-1]
+        self.mean = np.bincount(self.codes, weights=self.values, minlength=n_groups) / np.maximum(self.n, 1)
+        deviation = self.values - self.mean[self.codes]
+        self.m2 = np.bincount(self.codes, weights=deviation * deviation, minlength=n_groups)
+
+    def segment(self, group: int) -> np.ndarray:
+        """Valores ordenados do grupo."""
+        return self.values[self.start[group]:self.start[group] + self.n[group]]
+
+    def rest(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Contagem, média e soma de quadrados centrada do complemento de cada grupo."""
+        total_n = self.n.sum()
+        total_mean = self.values.mean()
+        total_m2 = self.m2.sum() + (self.n * (self.mean - total_mean) ** 2).sum()
+
+        rest_n = total_n - self.n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rest_mean = (total_n * total_mean - self.n * self.mean) / rest_n
+            rest_m2 = total_m2 - self.m2 - self.n * rest_n / total_n * (self.mean - rest_mean) ** 2
+        return rest_n, rest_mean, np.maximum(rest_m2, 0.0)
+
+
+def _ttest(n_a, mean_a, m2_a, n_b, mean_b, m2_b):
+    """T-test de Student (variâncias iguais, como stats.ttest_ind), vetorizado."""
+    dof = n_a + n_b - 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pooled = (m2_a + m2_b) / dof
+        statistic = (mean_a - mean_b) / np.sqrt(pooled * (1 / n_a + 1 / n_b))
+    p_value = 2 * stats.t.sf(np.abs(statistic), dof)
+    return statistic, p_value
+
+
+def _mannwhitney_p(u: np.ndarray, n_a: np.ndarray, n_b: np.ndarray,
+                   tie_term: np.ndarray) -> np.ndarray:
+    """P-valor bilateral assintótico com correção de continuidade (como scipy)."""
+    n = n_a + n_b
+    mu = n_a * n_b / 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sigma = np.sqrt(n_a * n_b / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+        u_max = np.maximum(u, n_a * n_b - u)
+        z = (u_max - mu - 0.5) / sigma
+    return np.minimum(2 * stats.norm.sf(z), 1.0)
+
+
+def _tie_counts(sorted_values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Valores distintos e contagens de um array ordenado."""
+    if len(sorted_values) == 0:
+        return sorted_values, np.empty(0, dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate([[True], sorted_values[1:] != sorted_values[:-1]]))
+    counts = np.diff(np.concatenate([starts, [len(sorted_values)]]))
+    return sorted_values[starts], counts
+
+
+def _mannwhitney_pair(a: np.ndarray, b: np.ndarray, ties_a, ties_b) -> Tuple[float, float]:
+    """U de a contra b (ambos ordenados) e termo de empates da união."""
+    below = np.searchsorted(b, a, side='left')
+    equal = np.searchsorted(b, a, side='right') - below
+    u = below.sum() + 0.5 * equal.sum()
+
+    (values_a, counts_a), (values_b, counts_b) = ties_a, ties_b
+    tie_term = float((counts_a ** 3 - counts_a).sum() + (counts_b ** 3 - counts_b).sum())
+    _, in_a, in_b = np.intersect1d(values_a, values_b, assume_unique=True, return_indices=True)
+    if len(in_a):
+        ta, tb = counts_a[in_a].astype(np.float64), counts_b[in_b].astype(np.float64)
+        tie_term += float((3 * ta * ta * tb + 3 * ta * tb * tb).sum())
+
+    return float(u), tie_term
+
+
+def _permutation_counts(task, n_permutations: int, seed) -> np.ndarray:
+    """Quantas permutações produzem diferença de médias tão extrema quanto a observada."""
+    pooled, n_a, observed = task
+    rng = np.random.default_rng(seed)
+    total = pooled.sum()
+    n_b = len(pooled) - n_a
+
+    batch = max(1, _PERMUTATION_BATCH_CELLS // max(len(pooled), 1))
+    extreme = 0
+    done = 0
+    while done < n_permutations:
+        size = min(batch, n_permutations - done)
+        shuffled = rng.permuted(np.broadcast_to(pooled, (size, len(pooled))), axis=1)
+        sum_a = shuffled[:, :n_a].sum(axis=1)
+        diff = sum_a / n_a - (total - sum_a) / n_b
+        extreme += int(np.count_nonzero(np.abs(diff) >= np.abs(observed) - 1e-12 * abs(observed)))
+        done += size
+    return extreme
+
+
+def _rest_permutation_counts(data: '_GroupedValues', observed: np.ndarray,
+                             n_permutations: int, seed) -> np.ndarray:
+    """
+    Extremos de cada grupo contra os demais: cada permutação embaralha os
+    rótulos de todas as linhas e serve a todos os grupos de uma vez.
+    """
+    rng = np.random.default_rng(seed)
+    n_groups = len(data.n)
+    total_n, total = len(data.values), data.values.sum()
+
+    extreme = np.zeros(n_groups, dtype=np.int64)
+    for _ in range(n_permutations):
+        sums = np.bincount(rng.permutation(data.codes), weights=data.values, minlength=n_groups)
+        diff = sums / data.n - (total - sums) / (total_n - data.n)
+        extreme += np.abs(diff) >= np.abs(observed) - 1e-12 * np.abs(observed)
+    return extreme
+
+
+def _parallel(function, tasks: List[tuple], seed: int, max_workers: Optional[int] = None) -> list:
+    """Executa function(*task, seed) em threads, com uma semente independente por tarefa."""
+    seeds = np.random.SeedSequence(seed).spawn(len(tasks))
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(tasks)))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda args: function(*args[0], args[1]), zip(tasks, seeds)))
+
+
+def _permutation_p_values(data: '_GroupedValues', a: np.ndarray, b: Optional[np.ndarray],
+                          observed: np.ndarray, n_permutations: int, seed: int) -> np.ndarray:
+    """P-valores de permutação ((extremos + 1) / (permutações + 1)), em paralelo."""
+    if b is None:
+        # Permutações divididas entre as threads; contagens somadas no fim
+        workers = max(1, min(os.cpu_count() or 1, n_permutations))
+        shares = np.diff(np.linspace(0, n_permutations, workers + 1).astype(int))
+        counts = _parallel(_rest_permutation_counts,
+                           [(data, observed, int(share)) for share in shares], seed)
+        extremes = np.sum(counts, axis=0)
+    else:
+        tasks = [((np.concatenate([data.segment(i), data.segment(j)]), int(data.n[i]), d),
+                  n_permutations) for i, j, d in zip(a, b, observed)]
+        extremes = np.asarray(_parallel(_permutation_counts, tasks, seed))
+
+    return (extremes.astype(np.float64) + 1) / (n_permutations + 1)
+
+
+def run_group_tests(df: pd.DataFrame, metric: str, group_column: str,
+                    test: str = 'mannwhitneyu', mode: str = 'one_vs_rest',
+                    correction: Optional[str] = ANALYTICS_CONFIG['testes_correcao'],
+                    alpha: float = ANALYTICS_CONFIG['testes_alpha'],
+                    max_groups: int = ANALYTICS_CONFIG['testes_max_grupos_pares'],
+                    n_permutations: int = ANALYTICS_CONFIG['testes_permutacoes'],
+                    seed: int = 42) -> pd.DataFrame:
+    """
+    Compara uma métrica entre os grupos de uma coluna, em lote.
+
+    Args:
+        df: DataFrame
+        metric: Coluna numérica (ex.: 'total_geral')
+        group_column: Coluna de agrupamento (ex.: 'regime_tributario',
+                      'classificacao_risco', 'nm_cnae1')
+        test: 'ttest', 'mannwhitneyu' ou 'permutation' (diferença de médias)
+        mode: 'pairwise' (os max_groups maiores grupos, par a par) ou
+              'one_vs_rest' (cada grupo contra os demais)
+        correction: Correção para comparações múltiplas (ver adjust_p_values)
+        alpha: Nível de significância, aplicado ao p-valor ajustado
+        max_groups: Máximo de grupos no modo pairwise
+        n_permutations: Permutações por comparação no modo permutation
+        seed: Semente das permutações
+
+    Returns:
+        pd.DataFrame: Uma comparação por linha ('group_a', 'group_b', 'n_a',
+                      'n_b', 'mean_a', 'mean_b', 'statistic', 'p_value',
+                      'p_adjusted', 'significant'). attrs registra a correção
+                      ('correction'), as linhas de df ('total_rows') e, quando
+                      o modo permutação amostra, as linhas usadas
+                      ('sampled_rows'; None sem amostragem). Nesse caso n e
+                      médias são os da amostra.
+    """
+    if test not in HYPOTHESIS_TESTS:
+        raise ValueError(f"Teste desconhecido: {test}")
+    if mode not in HYPOTHESIS_MODES:
+        raise ValueError(f"Modo desconhecido: {mode}")
+
+    if df.empty or metric not in df.columns or group_column not in df.columns:
+        return pd.DataFrame()
+
+    values = df[metric].to_numpy(dtype=np.float64, na_value=np.nan)
+    series = df[group_column]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, labels = series.cat.codes.to_numpy().astype(np.int64), pd.Index(series.cat.categories)
+    else:
+        codes, labels = pd.factorize(series)
+        labels = pd.Index(labels)
+
+    # Amostra para o modo permutação (as permutações custam O(linhas))
+    max_rows = ANALYTICS_CONFIG['testes_permutacao_max_linhas']
+    sampled_rows = None
+    if test == 'permutation' and len(values) > max_rows:
+        sample = np.random.default_rng(seed).choice(len(values), max_rows, replace=False)
+        values, codes = values[sample], codes[sample]
+        sampled_rows = max_rows
+
+    data = _GroupedValues(values, codes, labels, min_size=2)
+    if len(data.labels) < 2:
+        return pd.DataFrame()
+
+    if mode == 'pairwise':
+        top = np.sort(np.argsort(-data.n, kind='stable')[:max_groups])
+        a, b = np.triu_indices(len(top), k=1)
+        a, b = top[a], top[b]
+        n_b, mean_b, m2_b = data.n[b], data.mean[b], data.m2[b]
+        label_b = data.labels[b]
+    else:
+        a = np.arange(len(data.labels))
+        n_b, mean_b, m2_b = data.rest()
+        label_b = [REST_LABEL] * len(a)
+
+    n_a, mean_a = data.n[a], data.mean[a]
+
+    if test == 'ttest':
+        statistic, p_value = _ttest(n_a, mean_a, data.m2[a], n_b, mean_b, m2_b)
+
+    elif test == 'mannwhitneyu' and mode == 'one_vs_rest':
+        # Postos globais uma vez; U de cada grupo pela soma dos seus postos
+        ranks = stats.rankdata(data.values)
+        rank_sum = np.bincount(data.codes, weights=ranks, minlength=len(data.labels))
+        statistic = rank_sum - n_a * (n_a + 1) / 2
+        _, counts = _tie_counts(np.sort(data.values))
+        tie_term = float((counts.astype(np.float64) ** 3 - counts).sum())
+        p_value = _mannwhitney_p(statistic, n_a, n_b, np.full(len(a), tie_term))
+
+    elif test == 'mannwhitneyu':
+        segments = {g: data.segment(g) for g in np.unique(np.concatenate([a, b]))}
+        ties = {g: _tie_counts(v) for g, v in segments.items()}
+        results = [_mannwhitney_pair(segments[i], segments[j], ties[i], ties[j]) for i, j in zip(a, b)]
+        statistic = np.array([u for u, _ in results])
+        p_value = _mannwhitney_p(statistic, n_a.astype(np.float64), n_b.astype(np.float64),
+                                 np.array([t for _, t in results]))
+
+    else:
+        statistic = mean_a - mean_b
+        p_value = _permutation_p_values(data, a, b if mode == 'pairwise' else None,
+                                        statistic, n_permutations, seed)
+
+    p_adjusted = adjust_p_values(p_value, correction)
+
+    result = pd.DataFrame({
+        'group_a': data.labels[a],
+        'group_b': label_b,
+        'n_a': n_a,
+        'n_b': n_b,
+        'mean_a': mean_a,
+        'mean_b': mean_b,
+        'statistic': statistic,
+        'p_value': p_value,
+        'p_adjusted': p_adjusted,
+        'significant': p_adjusted < alpha,
+    }).sort_values('p_adjusted', kind='stable').reset_index(drop=True)
+    result.attrs.update(correction=correction, total_rows=len(df), sampled_rows=sampled_rows)
+    return result
+
+
+def get_group_tests(df: pd.DataFrame, metric: str, group_column: str,
+                    test: str = 'mannwhitneyu', mode: str = 'one_vs_rest', **kwargs) -> pd.DataFrame:
+    """
+    Testes entre grupos (ver run_group_tests), guardados por carga.
+
+    O resultado é reaproveitado enquanto df.attrs['snapshot_token'] e a
+    ordem das linhas não mudarem (ver database.derived). Sem token, os
+    testes não são guardados.
+
+    Args:
+        df: DataFrame principal (sem filtros)
+        metric: Coluna numérica
+        group_column: Coluna de agrupamento
+        test: 'ttest', 'mannwhitneyu' ou 'permutation'
+        mode: 'pairwise' ou 'one_vs_rest'
+        **kwargs: Demais parâmetros de run_group_tests
+
+    Returns:
+        pd.DataFrame: Resultado dos testes
+    """
+    return snapshot_cached(
+        df, 'group_tests',
+        lambda data: run_group_tests(data, metric, group_column, test, mode, **kwargs),
+        args=(metric, group_column, test, mode, tuple(sorted(kwargs.items()))),
+        columns=[metric, group_column],
+    )
@@ -6,56 +6,109 @@ import pandas as pd
 import numpy as np
 from typing import Dict, Any, List, Optional
 
+from ..database.sorted_index import top_rows
+from .sketches import QuantileSketch
 
-def calculate_kpis(df: pd.DataFrame) -> Dict[str, Any]:
+
+def _column_sum_count(df: pd.DataFrame, column: str):
     """
-    Calcula KPIs principais do dashboard.
+    Soma e quantidade de não nulos de uma coluna numérica, numa só passada.
+
+    Returns:
+        tuple: (array float64 da coluna, soma, contagem); (None, 0, 0) se a
+               coluna não existir
+    """
+    if column not in df.columns:
+        return None, 0, 0
+
+    values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = ~np.isnan(values)
+    count = int(np.count_nonzero(valid))
+    total = values.sum() if count == len(values) else values.sum(where=valid)
+
+    return values, total, count
+
+
+def _class_counts(series: pd.Series) -> Dict[Any, int]:
+    """Contagem por classe: bincount sobre os códigos (categoria) ou value_counts."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        counts = np.bincount(codes + 1, minlength=len(series.cat.categories) + 1)[1:]
+        return dict(zip(series.cat.categories, counts.tolist()))
+
+    return series.value_counts(dropna=True).to_dict()
+
+
+# Colunas somadas pelos KPIs principais
+KPI_MEASURES = [
+    'total_geral', 'total_recebido_cpf', 'total_recebido_cnpj',
+    'score_risco_final', 'perc_recebido_cpf', 'qtd_socios_recebendo',
+]
+
+
+def kpis_from_totals(n: int, sums: Dict[str, float], counts: Dict[str, int],
+                     classes: Dict[Any, int], alerta_critico: int,
+                     acima_50pct_cpf: int) -> Dict[str, Any]:
+    """
+    Monta os KPIs principais a partir de medidas aditivas.
+
+    Compartilhado por calculate_kpis e pelas estruturas que mantêm somas
+    (cubo de KPIs, acumulador incremental).
 
     Args:
-        df: DataFrame com dados principais
+        n: Quantidade de empresas
+        sums: Soma por coluna de KPI_MEASURES (colunas ausentes ficam de fora)
+        counts: Quantidade de não nulos por coluna
+        classes: Empresas por classificação de risco (vazio se a coluna não existe)
+        alerta_critico: Empresas com score >= 90
+        acima_50pct_cpf: Empresas com mais de 50% recebido de CPF
 
     Returns:
         dict: Dicionário com KPIs calculados
     """
-    if df.empty:
+    if n == 0:
         return get_empty_kpis()
 
+    def _mean(column):
+        if column not in sums:
+            return 0
+        return sums[column] / counts[column] if counts[column] else np.nan
+
+    alto = classes.get('ALTO', 0)
+    medio_alto = classes.get('MÉDIO-ALTO', 0)
+
     kpis = {
         # KPIs Básicos
-        'total_empresas': len(df),
-        'total_empresas_ativas': len(df),  # Assumindo que todas são ativas
+        'total_empresas': n,
+        'total_empresas_ativas': n,  # Assumindo que todas são ativas
 
         # KPIs Financeiros
-        'volume_total': df['total_geral'].sum() if 'total_geral' in df.columns else 0,
-        'volume_cpf': df['total_recebido_cpf'].sum() if 'total_recebido_cpf' in df.columns else 0,
-        'volume_cnpj': df['total_recebido_cnpj'].sum() if 'total_recebido_cnpj' in df.columns else 0,
+        'volume_total': sums.get('total_geral', 0),
+        'volume_cpf': sums.get('total_recebido_cpf', 0),
+        'volume_cnpj': sums.get('total_recebido_cnpj', 0),
 
         # Médias
-        'media_score_risco': df['score_risco_final'].mean() if 'score_risco_final' in df.columns else 0,
-        'media_perc_cpf': df['perc_recebido_cpf'].mean() if 'perc_recebido_cpf' in df.columns else 0,
-        'media_volume': df['total_geral'].mean() if 'total_geral' in df.columns else 0,
+        'media_score_risco': _mean('score_risco_final'),
+        'media_perc_cpf': _mean('perc_recebido_cpf'),
+        'media_volume': _mean('total_geral'),
 
         # Distribuição de Risco
-        'empresas_alto_risco': len(df[df['classificacao_risco'] == 'ALTO']) if 'classificacao_risco' in df.columns else 0,
-        'empresas_medio_alto': len(df[df['classificacao_risco'] == 'MÉDIO-ALTO']) if 'classificacao_risco' in df.columns else 0,
-        'empresas_medio': len(df[df['classificacao_risco'] == 'MÉDIO']) if 'classificacao_risco' in df.columns else 0,
-        'empresas_baixo': len(df[df['classificacao_risco'] == 'BAIXO']) if 'classificacao_risco' in df.columns else 0,
+        'empresas_alto_risco': alto,
+        'empresas_medio_alto': medio_alto,
+        'empresas_medio': classes.get('MÉDIO', 0),
+        'empresas_baixo': classes.get('BAIXO', 0),
 
         # Percentuais de Risco
-        'perc_alto_risco': (len(df[df['classificacao_risco'] == 'ALTO']) / len(df) * 100) if len(df) > 0 and 'classificacao_risco' in df.columns else 0,
-        'perc_medio_alto': (len(df[df['classificacao_risco'] == 'MÉDIO-ALTO']) / len(df) * 100) if len(df) > 0 and 'classificacao_risco' in df.columns else 0,
+        'perc_alto_risco': alto / n * 100 if classes else 0,
+        'perc_medio_alto': medio_alto / n * 100 if classes else 0,
 
         # Sócios
-        'total_socios_recebendo': df['qtd_socios_recebendo'].sum() if 'qtd_socios_recebendo' in df.columns else 0,
-        'media_socios_por_empresa': df['qtd_socios_recebendo'].mean() if 'qtd_socios_recebendo' in df.columns else 0,
+        'total_socios_recebendo': sums.get('qtd_socios_recebendo', 0),
+        'media_socios_por_empresa': _mean('qtd_socios_recebendo'),
 
         # Alertas
-        'empresas_alerta_critico': len(df[
-            (df['score_risco_final'] >= 90) if 'score_risco_final' in df.columns else False
-        ]),
-        'empresas_acima_50pct_cpf': len(df[
-            (df['perc_recebido_cpf'] > 50) if 'perc_recebido_cpf' in df.columns else False
-        ]),
+        'empresas_alerta_critico': int(alerta_critico),
+        'empresas_acima_50pct_cpf': int(acima_50pct_cpf),
     }
 
     # Percentual CPF do total
@@ -67,6 +120,42 @@ def calculate_kpis(df: pd.DataFrame) -> Dict[str, Any]:
     return kpis
 
 
+def calculate_kpis(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Calcula KPIs principais do dashboard.
+
+    Cada coluna é convertida uma única vez para array NumPy; contagens por
+    classe saem de um único bincount/value_counts e os alertas de somas
+    mascaradas, sem criar DataFrames intermediários.
+
+    Args:
+        df: DataFrame com dados principais
+
+    Returns:
+        dict: Dicionário com KPIs calculados
+    """
+    if df.empty:
+        return get_empty_kpis()
+
+    arrays, sums, counts = {}, {}, {}
+    for column in KPI_MEASURES:
+        values, total, count = _column_sum_count(df, column)
+        if values is not None:
+            arrays[column], sums[column], counts[column] = values, total, count
+
+    classes = _class_counts(df['classificacao_risco']) if 'classificacao_risco' in df.columns else {}
+
+    # Comparações com NaN resultam em False
+    score = arrays.get('score_risco_final')
+    perc = arrays.get('perc_recebido_cpf')
+
+    return kpis_from_totals(
+        len(df), sums, counts, classes,
+        alerta_critico=np.count_nonzero(score >= 90) if score is not None else 0,
+        acima_50pct_cpf=np.count_nonzero(perc > 50) if perc is not None else 0,
+    )
+
+
 def get_empty_kpis() -> Dict[str, Any]:
     """Retorna estrutura de KPIs vazia."""
     return {
@@ -105,7 +194,7 @@ def calculate_kpis_by_classification(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty or 'classificacao_risco' not in df.columns:
         return pd.DataFrame()
 
-    grouped = df.groupby('classificacao_risco').agg({
+    grouped = df.groupby('classificacao_risco', observed=True).agg({
         'cnpj': 'count',
         'total_geral': ['sum', 'mean', 'median'],
         'total_recebido_cpf': ['sum', 'mean'],
@@ -132,7 +221,7 @@ def calculate_kpis_by_regime(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty or 'regime_tributario' not in df.columns:
         return pd.DataFrame()
 
-    grouped = df.groupby('regime_tributario').agg({
+    grouped = df.groupby('regime_tributario', observed=True).agg({
         'cnpj': 'count',
         'total_geral': ['sum', 'mean'],
         'total_recebido_cpf': 'sum',
@@ -159,7 +248,7 @@ def calculate_kpis_by_municipio(df: pd.DataFrame, top_n: int = 20) -> pd.DataFra
     if df.empty or 'municipio' not in df.columns:
         return pd.DataFrame()
 
-    grouped = df.groupby('municipio').agg({
+    grouped = df.groupby('municipio', observed=True).agg({
         'cnpj': 'count',
         'total_geral': 'sum',
         'total_recebido_cpf': 'sum',
@@ -185,7 +274,7 @@ def calculate_kpis_by_uf(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty or 'uf' not in df.columns:
         return pd.DataFrame()
 
-    grouped = df.groupby('uf').agg({
+    grouped = df.groupby('uf', observed=True).agg({
         'cnpj': 'count',
         'total_geral': 'sum',
         'total_recebido_cpf': 'sum',
@@ -216,7 +305,7 @@ def calculate_kpis_by_setor(df: pd.DataFrame, top_n: int = 15) -> pd.DataFrame:
     if cnae_col not in df.columns:
         return pd.DataFrame()
 
-    grouped = df.groupby(cnae_col).agg({
+    grouped = df.groupby(cnae_col, observed=True).agg({
         'cnpj': 'count',
         'total_geral': 'sum',
         'total_recebido_cpf': 'sum',
@@ -233,7 +322,7 @@ def calculate_kpis_by_setor(df: pd.DataFrame, top_n: int = 15) -> pd.DataFrame:
 
 
 def identify_outliers(df: pd.DataFrame, column: str, method: str = 'iqr',
-                     threshold: float = 1.5) -> pd.DataFrame:
+                     threshold: float = 1.5, sketch: Optional[QuantileSketch] = None) -> pd.DataFrame:
     """
     Identifica outliers em uma coluna.
 
@@ -242,6 +331,8 @@ def identify_outliers(df: pd.DataFrame, column: str, method: str = 'iqr',
         column: Nome da coluna
         method: Método ('iqr' ou 'zscore')
         threshold: Limiar (1.5 para IQR, 3 para Z-score)
+        sketch: Resumo de quantis da coluna (analytics.sketches); no método
+                'iqr', os limites vêm do resumo em vez de ordenar a coluna
 
     Returns:
         pd.DataFrame: DataFrame com outliers
@@ -250,11 +341,14 @@ def identify_outliers(df: pd.DataFrame, column: str, method: str = 'iqr',
         return pd.DataFrame()
 
     if method == 'iqr':
-        Q1 = df[column].quantile(0.25)
-        Q3 = df[column].quantile(0.75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - threshold * IQR
-        upper_bound = Q3 + threshold * IQR
+        if sketch is not None:
+            _, _, lower_bound, upper_bound = sketch.iqr_bounds(threshold)
+        else:
+            Q1 = df[column].quantile(0.25)
+            Q3 = df[column].quantile(0.75)
+            IQR = Q3 - Q1
+            lower_bound = Q1 - threshold * IQR
+            upper_bound = Q3 + threshold * IQR
         return df[(df[column] < lower_bound) | (df[column] > upper_bound)]
 
     elif method == 'zscore':
@@ -278,7 +372,8 @@ def calculate_risk_distribution(df: pd.DataFrame) -> Dict[str, Any]:
         return {}
 
     total = len(df)
-    dist = df['classificacao_risco'].value_counts().to_dict()
+    counts = df['classificacao_risco'].value_counts()
+    dist = counts[counts > 0].to_dict()
 
     return {
         'counts': dist,
@@ -315,15 +410,21 @@ def calculate_temporal_metrics(df: pd.DataFrame, date_column: str) -> pd.DataFra
 
 
 def get_top_empresas(df: pd.DataFrame, column: str = 'score_risco_final',
-                    n: int = 10, ascending: bool = False) -> pd.DataFrame:
+                    n: int = 10, ascending: bool = False, spec=None,
+                    indexes: Optional[dict] = None) -> pd.DataFrame:
     """
     Obtém top N empresas por determinada coluna.
 
+    Com os índices ordenados de df, lê apenas as primeiras posições do
+    índice em vez de percorrer a tabela.
+
     Args:
         df: DataFrame
         column: Coluna para ordenação
         n: Número de empresas
         ascending: Ordenação crescente?
+        spec: FilterSpec a aplicar antes do top N (opcional)
+        indexes: Índices ordenados de df (database.sorted_index)
 
     Returns:
         pd.DataFrame: Top empresas
@@ -331,4 +432,4 @@ def get_top_empresas(df: pd.DataFrame, column: str = 'score_risco_final',
     if df.empty or column not in df.columns:
         return pd.DataFrame()
 
-    return df.nlargest(n, column) if not ascending else df.nsmallest(n, column)
+    return top_rows(df, column, n, ascending, spec=spec, indexes=indexes)
@@ -0,0 +1,243 @@
+"""
+Percentis Pré-Calculados por Empresa
+
+Calcula, numa passada vetorizada por carga (snapshot_token), a posição e o
+percentil de todas as empresas em cada métrica de benchmark: no geral e
+dentro do setor (CNAE) e do regime tributário. A tabela fica alinhada às
+linhas do DataFrame principal, de modo que o benchmark de uma empresa é uma
+consulta por posição e relatórios como "empresas no topo do setor" são um
+único filtro sobre a tabela. Fora da carga completa (sem token ou numa
+seleção), o benchmark calcula apenas a linha da empresa consultada.
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..database.derived import is_snapshot_frame, snapshot_cached
+from .groups import GroupPositions, get_group_positions, get_row_group
+
+# Métricas do benchmark
+PERCENTILE_METRICS = ['score_risco_final', 'total_geral', 'perc_recebido_cpf']
+
+# Escopos de grupo (sufixo da coluna -> coluna de agrupamento)
+PERCENTILE_SCOPES = {
+    'setor': 'nm_cnae1',
+    'regime': 'regime_tributario',
+}
+
+
+def _overall_percentile(values: np.ndarray) -> np.ndarray:
+    """Percentual das linhas com valor estritamente menor (nulos = 0)."""
+    valid = ~np.isnan(values)
+    ordered = np.sort(values[valid])
+
+    less = np.zeros(len(values), dtype=np.float64)
+    less[valid] = np.searchsorted(ordered, values[valid], side='left')
+
+    return less / len(values) * 100
+
+
+def _group_positions(values: np.ndarray, codes: np.ndarray, sizes: np.ndarray,
+                     counts: np.ndarray) -> np.ndarray:
+    """
+    Posição de cada linha no ranking decrescente do seu grupo.
+
+    Mesma regra de GroupPositions.rank: empates recebem a melhor posição e
+    valores nulos ficam após os demais; linhas sem grupo ficam nulas.
+    """
+    position = np.full(len(values), np.nan)
+
+    in_group = codes >= 0
+    position[in_group & np.isnan(values)] = counts[codes[in_group & np.isnan(values)]] + 1
+
+    rows = np.flatnonzero(in_group & ~np.isnan(values))
+    if not len(rows):
+        return position
+
+    group = codes[rows]
+    order = np.lexsort((values[rows], group))
+    sorted_values, sorted_group = values[rows][order], group[order]
+
+    # Índice do último elemento de cada sequência de empates
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = (sorted_values[1:] != sorted_values[:-1]) | (sorted_group[1:] != sorted_group[:-1])
+    run_end = np.flatnonzero(last)[np.cumsum(np.concatenate([[True], last[:-1]])) - 1]
+
+    # Quantidade de valores <= ao da linha dentro do grupo
+    group_start = np.concatenate([[0], np.cumsum(counts)])[:-1]
+    at_most = run_end + 1 - group_start[sorted_group]
+
+    position[rows[order]] = counts[sorted_group] - at_most + 1
+    return position
+
+
+class PercentileRanks:
+    """Posições e percentis das empresas, alinhados às linhas do DataFrame."""
+
+    def __init__(self, df: pd.DataFrame, position: Optional[int] = None,
+                 row_groups: Optional[Dict[str, Tuple[Optional[GroupPositions], Optional[int]]]] = None):
+        """
+        Args:
+            df: DataFrame
+            position: Posição (iloc) de uma empresa; quando informada, só a
+                      linha dela é calculada (padrão: todas as linhas)
+            row_groups: Coluna de agrupamento -> (GroupPositions, grupo da
+                        empresa), já obtidos com get_row_group (com position)
+        """
+        self.n_rows = len(df)
+        self.position = position
+        self.summary: Dict[str, Dict[str, float]] = {}
+
+        columns = {}
+        metrics = [m for m in PERCENTILE_METRICS if m in df.columns]
+
+        if position is not None and row_groups is None:
+            row_groups = {column: get_row_group(df, column, position, PERCENTILE_METRICS)
+                          for column in PERCENTILE_SCOPES.values()}
+
+        for metric in metrics:
+            values = df[metric].to_numpy(dtype=np.float64, na_value=np.nan)
+
+            self.summary[metric] = {
+                'media_geral': float(np.nanmean(values)) if len(values) else np.nan,
+                'mediana_geral': float(np.nanmedian(values)) if len(values) else np.nan,
+                'min_geral': float(np.nanmin(values)) if len(values) else np.nan,
+                'max_geral': float(np.nanmax(values)) if len(values) else np.nan,
+            }
+
+            if position is not None:
+                columns.update(self._row_columns(df, metric, values, position, row_groups))
+                continue
+
+            columns[f'{metric}_percentil'] = _overall_percentile(values).astype(np.float32)
+
+            for scope, group_column in PERCENTILE_SCOPES.items():
+                groups = get_group_positions(df, group_column)
+                if groups is None or metric not in groups.counts:
+                    continue
+
+                position_in_group = _group_positions(values, groups.codes, groups.sizes,
+                                                     groups.counts[metric])
+                total = np.where(groups.codes >= 0, groups.sizes[groups.codes], np.nan)
+
+                columns[f'{metric}_posicao_{scope}'] = position_in_group.astype(np.float32)
+                columns[f'{metric}_percentil_{scope}'] = ((total - position_in_group) / total * 100).astype(np.float32)
+
+        index = df.index if position is None else df.index[[position]]
+        self.table = pd.DataFrame(columns, index=index)
+
+    @staticmethod
+    def _row_columns(df: pd.DataFrame, metric: str, values: np.ndarray, position: int,
+                     row_groups: Dict[str, tuple]) -> Dict[str, np.ndarray]:
+        """Colunas da tabela para uma única linha (mesmas regras da passada completa)."""
+        value = values[position]
+        less = 0 if np.isnan(value) else int(np.count_nonzero(values < value))
+        columns = {f'{metric}_percentil': np.array([less / len(values) * 100], dtype=np.float32)}
+
+        for scope, group_column in PERCENTILE_SCOPES.items():
+            if group_column not in df.columns:
+                continue
+
+            # Linha sem grupo (coluna nula): posição e percentil nulos
+            groups, group = row_groups.get(group_column, (None, None))
+            rank = groups.rank(group, metric, value) if group is not None else {}
+
+            columns[f'{metric}_posicao_{scope}'] = np.array([rank.get('posicao', np.nan)], dtype=np.float32)
+            columns[f'{metric}_percentil_{scope}'] = np.array([rank.get('percentil', np.nan)], dtype=np.float32)
+
+        return columns
+
+    def _row(self, position: int) -> int:
+        """Linha da tabela correspondente à posição da empresa."""
+        if self.position is None:
+            return position
+        if position != self.position:
+            raise ValueError(f"Percentis calculados apenas para a posição {self.position}")
+        return 0
+
+    def row(self, position: int) -> Dict[str, float]:
+        """
+        Posições e percentis de uma empresa.
+
+        Args:
+            position: Posição (iloc) da empresa no DataFrame
+
+        Returns:
+            dict: coluna -> valor
+        """
+        return self.table.iloc[self._row(position)].to_dict()
+
+    def percentile(self, position: int, metric: str, scope: Optional[str] = None) -> float:
+        """
+        Percentil de uma empresa numa métrica.
+
+        Args:
+            position: Posição (iloc) da empresa no DataFrame
+            metric: Métrica (de PERCENTILE_METRICS)
+            scope: None (geral), 'setor' ou 'regime'
+
+        Returns:
+            float: Percentil (0-100)
+        """
+        column = f'{metric}_percentil' if scope is None else f'{metric}_percentil_{scope}'
+        return float(self.table[column].iat[self._row(position)])
+
+
+def get_percentile_ranks(df: pd.DataFrame, position: Optional[int] = None,
+                         row_groups: Optional[Dict[str, tuple]] = None) -> Optional[PercentileRanks]:
+    """
+    Obtém as posições e percentis do DataFrame, calculando-os uma vez por carga.
+
+    Na carga completa (is_snapshot_frame), a tabela de todas as linhas é
+    reaproveitada enquanto df.attrs['snapshot_token'] e a ordem das linhas
+    não mudarem (ver database.derived). Nos demais DataFrames a tabela não é
+    guardada; com position, apenas a linha da empresa é calculada.
+
+    Args:
+        df: DataFrame principal (sem filtros)
+        position: Posição (iloc) da empresa consultada (opcional)
+        row_groups: Grupos da empresa já obtidos com get_row_group (opcional)
+
+    Returns:
+        PercentileRanks ou None: Percentis, ou None se o DataFrame estiver vazio
+    """
+    if df is None or df.empty:
+        return None
+
+    if position is not None and not is_snapshot_frame(df):
+        return PercentileRanks(df, position, row_groups)
+
+    return snapshot_cached(df, 'percentile_ranks', PercentileRanks,
+                           columns=PERCENTILE_METRICS + list(PERCENTILE_SCOPES.values()))
+
+
+def top_percentile_companies(df: pd.DataFrame, metric: str, min_percentile: float = 90,
+                             scope: Optional[str] = 'setor') -> pd.DataFrame:
+    """
+    Empresas com percentil mínimo numa métrica (ex.: topo 10% do setor).
+
+    Args:
+        df: DataFrame principal (sem filtros)
+        metric: Métrica (de PERCENTILE_METRICS)
+        min_percentile: Percentil mínimo (inclusive)
+        scope: None (geral), 'setor' ou 'regime'
+
+    Returns:
+        pd.DataFrame: Empresas selecionadas com a posição e o percentil
+    """
+    ranks = get_percentile_ranks(df)
+    column = f'{metric}_percentil' if scope is None else f'{metric}_percentil_{scope}'
+
+    if ranks is None or column not in ranks.table.columns:
+        return pd.DataFrame()
+
+    selected = np.flatnonzero(ranks.table[column].to_numpy() >= min_percentile)
+    rank_columns = [column] if scope is None else [f'{metric}_posicao_{scope}', column]
+
+    result = df.iloc[selected].copy()
+    for col in rank_columns:
+        result[col] = ranks.table[col].to_numpy()[selected]
+
+    return result.sort_values(column, ascending=False)
@@ -5,13 +5,20 @@ Análises Estatísticas Avançadas
 import pandas as pd
 import numpy as np
 from scipy import stats
-from typing import Dict, Any, Tuple, List
+from typing import Dict, Any, Tuple, List, Optional
+
+from .concentration import calculate_concentration_by_group
+from .descriptive import describe_columns
+from .sketches import QuantileSketch
 
 
 def calculate_descriptive_stats(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
     """
     Calcula estatísticas descritivas para múltiplas colunas.
 
+    Momentos e quantis de cada coluna saem de uma única passada e de um
+    único np.partition (ver analytics.descriptive).
+
     Args:
         df: DataFrame
         columns: Lista de colunas numéricas
@@ -22,34 +29,7 @@ def calculate_descriptive_stats(df: pd.DataFrame, columns: List[str]) -> pd.Data
     if df.empty:
         return pd.DataFrame()
 
-    stats_dict = {}
-
-    for col in columns:
-        if col not in df.columns:
-            continue
-
-        series = df[col].dropna()
-
-        if len(series) == 0:
-            continue
-
-        stats_dict[col] = {
-            'count': len(series),
-            'mean': series.mean(),
-            'median': series.median(),
-            'std': series.std(),
-            'min': series.min(),
-            'max': series.max(),
-            'q25': series.quantile(0.25),
-            'q75': series.quantile(0.75),
-            'q90': series.quantile(0.90),
-            'q95': series.quantile(0.95),
-            'q99': series.quantile(0.99),
-            'skewness': series.skew(),
-            'kurtosis': series.kurtosis()
-        }
-
-    return pd.DataFrame(stats_dict).T
+    return describe_columns(df, columns)
 
 
 def calculate_correlation_matrix(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
@@ -103,7 +83,8 @@ def perform_normality_test(series: pd.Series) -> Dict[str, Any]:
 
 
 def calculate_percentiles(df: pd.DataFrame, column: str,
-                         percentiles: List[float] = [0.25, 0.5, 0.75, 0.9, 0.95, 0.99]) -> Dict[str, float]:
+                         percentiles: List[float] = [0.25, 0.5, 0.75, 0.9, 0.95, 0.99],
+                         sketch: Optional[QuantileSketch] = None) -> Dict[str, float]:
     """
     Calcula percentis para uma coluna.
 
@@ -111,10 +92,15 @@ def calculate_percentiles(df: pd.DataFrame, column: str,
         df: DataFrame
         column: Nome da coluna
         percentiles: Lista de percentis
+        sketch: Resumo de quantis da coluna (analytics.sketches); quando
+                informado, os percentis são aproximados e df não é lido
 
     Returns:
         dict: Percentis calculados
     """
+    if sketch is not None:
+        return {f'p{int(p*100)}': v for p, v in zip(percentiles, sketch.quantiles(percentiles))}
+
     if df.empty or column not in df.columns:
         return {}
 
@@ -124,7 +110,8 @@ def calculate_percentiles(df: pd.DataFrame, column: str,
 
 
 def detect_anomalies_statistical(df: pd.DataFrame, column: str,
-                                method: str = 'zscore', threshold: float = 3) -> pd.DataFrame:
+                                method: str = 'zscore', threshold: float = 3,
+                                sketch: Optional[QuantileSketch] = None) -> pd.DataFrame:
     """
     Detecta anomalias usando métodos estatísticos.
 
@@ -133,6 +120,8 @@ def detect_anomalies_statistical(df: pd.DataFrame, column: str,
         column: Coluna para análise
         method: Método ('zscore', 'iqr', 'modified_zscore')
         threshold: Limiar para detecção
+        sketch: Resumo de quantis da coluna (analytics.sketches); no método
+                'iqr', quartis e mediana vêm do resumo em vez de ordenar a coluna
 
     Returns:
         pd.DataFrame: Dados com flag de anomalia
@@ -149,13 +138,15 @@ def detect_anomalies_statistical(df: pd.DataFrame, column: str,
         df_copy['anomaly_score'] = z_scores
 
     elif method == 'iqr':
-        Q1 = series.quantile(0.25)
-        Q3 = series.quantile(0.75)
+        if sketch is not None:
+            Q1, median, Q3 = sketch.quantiles([0.25, 0.5, 0.75])
+        else:
+            Q1, median, Q3 = series.quantile([0.25, 0.5, 0.75])
         IQR = Q3 - Q1
         lower_bound = Q1 - threshold * IQR
         upper_bound = Q3 + threshold * IQR
         df_copy['is_anomaly'] = (series < lower_bound) | (series > upper_bound)
-        df_copy['anomaly_score'] = np.abs((series - series.median()) / IQR)
+        df_copy['anomaly_score'] = np.abs((series - median) / IQR)
 
     elif method == 'modified_zscore':
         median = series.median()
@@ -168,50 +159,34 @@ def detect_anomalies_statistical(df: pd.DataFrame, column: str,
 
 
 def calculate_concentration_index(df: pd.DataFrame, value_column: str,
-                                  group_column: str = None) -> Dict[str, float]:
+                                  group_column: str = None) -> Dict[str, Any]:
     """
     Calcula índice de concentração (Gini, HHI).
 
     Args:
         df: DataFrame
         value_column: Coluna de valores
-        group_column: Coluna de agrupamento (opcional)
+        group_column: Coluna de agrupamento (opcional); quando informada,
+                      retorna os índices de cada grupo
 
     Returns:
-        dict: Índices de concentração
+        dict: Índices de concentração ('gini_index', 'hhi', 'cr4',
+              'total_value', 'count'), ou grupo -> índices
     """
     if df.empty or value_column not in df.columns:
         return {}
 
-    values = df[value_column].dropna().sort_values()
+    result = calculate_concentration_by_group(df, value_column, group_column)
 
-    # Índice de Gini
-    n = len(values)
-    if n == 0:
+    if result.empty:
         return {}
 
-    cumsum = values.cumsum()
-    gini = (2 * (cumsum * np.arange(1, n + 1)).sum() / (n * cumsum.iloc[-1])) - (n + 1) / n
-
-    # HHI (Herfindahl-Hirschman Index)
-    total = values.sum()
-    if total > 0:
-        market_shares = (values / total) ** 2
-        hhi = market_shares.sum() * 10000  # Multiplicar por 10000 para escala tradicional
-    else:
-        hhi = 0
-
-    # CR4 (Concentration Ratio dos top 4)
-    top4_sum = values.nlargest(4).sum()
-    cr4 = (top4_sum / total * 100) if total > 0 else 0
-
-    return {
-        'gini_index': gini,
-        'hhi': hhi,
-        'cr4': cr4,
-        'total_value': total,
-        'count': n
-    }
+    if group_column is not None:
+        return result.to_dict('index')
+
+    indices = result.iloc[0].to_dict()
+    indices['count'] = int(indices['count'])
+    return indices
 
 
 def perform_hypothesis_test(group1: pd.Series, group2: pd.Series,
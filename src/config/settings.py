@@ -79,6 +79,16 @@ TABLES = {
     'socios_multiplos': 'teste.dimp_socios_multiplas_empresas'
 }
 
+# Pool de conexões com o Impala
+POOL_CONFIG = {
+    'pool_size': int(os.getenv('DIMP_POOL_SIZE', 5)),
+    'max_overflow': int(os.getenv('DIMP_POOL_MAX_OVERFLOW', 5)),
+    'pool_timeout': 30,           # Segundos aguardando conexão livre
+    'pool_recycle': 3600,         # Recicla conexões após 1 hora
+    'warmup_connections': int(os.getenv('DIMP_POOL_WARMUP', 2)),
+    'liveness_interval': 300      # Verificação de conexão ociosa (segundos)
+}
+
 # =============================================================================
 # CACHE E PERFORMANCE
 # =============================================================================
@@ -90,6 +100,37 @@ CACHE_CONFIG = {
     'ttl_extra_long': 7200 # 2 horas
 }
 
+# Snapshots locais (Arrow IPC) compartilhados entre processos
+SNAPSHOT_CONFIG = {
+    'enabled': os.getenv('DIMP_SNAPSHOT_ENABLED', '1') == '1',
+    'dir': os.getenv(
+        'DIMP_SNAPSHOT_DIR',
+        os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data-snapshots')
+    ),
+    'max_age': int(os.getenv('DIMP_SNAPSHOT_MAX_AGE', 86400)),  # 24 horas
+    'keep': 2  # Snapshots mantidos por tabela
+}
+
+# Cache de resultados de queries (Arrow IPC em disco, compartilhado entre processos)
+RESULT_CACHE_CONFIG = {
+    'enabled': os.getenv('DIMP_RESULT_CACHE_ENABLED', '1') == '1',
+    'dir': os.getenv('DIMP_RESULT_CACHE_DIR', os.path.join(SNAPSHOT_CONFIG['dir'], 'results')),
+    'max_bytes': int(os.getenv('DIMP_RESULT_CACHE_MAX_BYTES', 2 * 1024**3)),  # 2 GB
+    'max_entries': 1000
+}
+
+# Validação de caches pela impressão digital das tabelas de origem
+FRESHNESS_CONFIG = {
+    'enabled': os.getenv('DIMP_FRESHNESS_ENABLED', '1') == '1',
+    'check_interval': int(os.getenv('DIMP_FRESHNESS_CHECK_INTERVAL', 60))  # segundos entre consultas
+}
+
+# Sincronização incremental por partição (chave de TABLES -> colunas)
+INCREMENTAL_CONFIG = {
+    'pagamentos_cpf': {'partition_column': 'referencia', 'checksum_column': 'vl_total'},
+    'pagamentos_cnpj': {'partition_column': 'referencia', 'checksum_column': 'vl_total'},
+}
+
 # =============================================================================
 # FILTROS E LIMITES
 # =============================================================================
@@ -98,7 +139,34 @@ FILTERS_CONFIG = {
     'classificacao_risco': ['ALTO', 'MÉDIO-ALTO', 'MÉDIO', 'BAIXO'],
     'max_empresas_display': 1000,
     'min_score_risco': 0,
-    'max_score_risco': 100
+    'max_score_risco': 100,
+    'pushdown_min_rows': 2000000  # Acima disso, filtros vão para o Impala
+}
+
+# =============================================================================
+# PROJEÇÃO DE COLUNAS
+# =============================================================================
+
+# Colunas de dimp_score_final usadas por KPIs, filtros, gráficos e ML
+MAIN_BASE_COLUMNS = [
+    'cnpj', 'nm_razao_social', 'classificacao_risco', 'score_risco_final',
+    'total_geral', 'total_recebido_cpf', 'total_recebido_cnpj', 'perc_recebido_cpf',
+    'qtd_socios_recebendo', 'regime_tributario', 'municipio', 'uf', 'nm_cnae1'
+]
+
+# Colunas carregadas por página (None = todas)
+PAGE_COLUMNS = {
+    'dashboard': MAIN_BASE_COLUMNS,
+    'ranking': MAIN_BASE_COLUMNS,
+    'ml': MAIN_BASE_COLUMNS,
+    'estatisticas': MAIN_BASE_COLUMNS + ['score_proporcao', 'score_volume_cpf'],
+    'diagnostico': None
+}
+
+# Representação compacta do DataFrame principal (schemas.MAIN_COMPACT_DTYPES)
+MEMORY_CONFIG = {
+    'compact_dtypes': os.getenv('DIMP_COMPACT_DTYPES', '1') == '1',
+    'category_max_ratio': 0.5  # Texto não declarado vira categoria abaixo desta razão únicos/linhas
 }
 
 # =============================================================================
@@ -189,7 +257,13 @@ ANALYTICS_CONFIG = {
     'correlacao_min': 0.3,
     'outlier_threshold': 3,  # Desvios padrão
     'min_empresas_setor': 3,
-    'min_transacoes_temporal': 3
+    'min_transacoes_temporal': 3,
+    # Testes de hipótese entre grupos
+    'testes_max_grupos_pares': 20,       # Maiores grupos nas comparações par a par
+    'testes_correcao': 'holm',           # 'bonferroni', 'holm', 'fdr_bh' ou None
+    'testes_alpha': 0.05,
+    'testes_permutacoes': 1000,
+    'testes_permutacao_max_linhas': 200000,  # Amostra máxima no modo permutação
 }
 
 # =============================================================================
@@ -1,5 +1,6 @@
 """
 Módulo de Banco de Dados do Sistema DIMP
 """
-from .connection import get_engine, test_connection
+from .connection import get_engine, test_connection, get_pool_metrics
+from .result_cache import get_result_cache, cached_read_sql
 from .queries import *
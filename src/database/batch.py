@@ -0,0 +1,77 @@
+"""
+Execução Concorrente de Queries Independentes
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Union, Tuple
+
+from ..config.settings import POOL_CONFIG
+from .fetch import read_sql_frame
+from .result_cache import cached_read_sql
+
+QuerySpec = Union[str, Tuple[str, Optional[Dict[str, Any]]], Tuple[str, Optional[Dict[str, Any]], Optional[dict]]]
+
+
+def _run_timed(_engine, query: str, params: Optional[Dict[str, Any]], schema: Optional[dict],
+               ttl: Optional[float] = None):
+    """Executa uma query medindo o tempo de parede."""
+    start = time.perf_counter()
+    if ttl is None:
+        df = read_sql_frame(_engine, query, params, schema=schema)
+    else:
+        df = cached_read_sql(_engine, query, params, schema=schema, ttl=ttl)
+    return df, time.perf_counter() - start
+
+
+def execute_queries_concurrently(_engine, queries: Dict[str, QuerySpec],
+                                 max_workers: Optional[int] = None,
+                                 ttl: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Executa queries independentes em paralelo sobre conexões do pool.
+
+    Cada query usa sua própria conexão; o número de threads é limitado pelo
+    tamanho do pool para não abrir conexões além do configurado.
+
+    Args:
+        _engine: SQLAlchemy engine
+        queries: {nome: query} ou {nome: (query, params[, schema])}
+        max_workers: Máximo de queries simultâneas (padrão: pool_size)
+        ttl: Quando informado, as queries passam pelo cache de resultados
+             (result_cache) com essa validade em segundos
+
+    Returns:
+        dict: 'results' {nome: DataFrame}, 'timings' {nome: segundos},
+              'errors' {nome: mensagem} e 'elapsed' (segundos no total)
+    """
+    batch = {
+        'results': {},
+        'timings': {},
+        'errors': {},
+        'elapsed': 0.0
+    }
+
+    if not queries:
+        return batch
+
+    max_workers = max_workers or POOL_CONFIG['pool_size']
+    max_workers = max(1, min(max_workers, len(queries)))
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dimp-query') as executor:
+        futures = {}
+
+        for name, spec in queries.items():
+            if isinstance(spec, str):
+                spec = (spec,)
+            query, params, schema = (tuple(spec) + (None, None))[:3]
+            futures[name] = executor.submit(_run_timed, _engine, query, params, schema, ttl)
+
+        for name, future in futures.items():
+            try:
+                batch['results'][name], batch['timings'][name] = future.result()
+            except Exception as e:
+                batch['errors'][name] = str(e)
+
+    batch['elapsed'] = time.perf_counter() - start
+    return batch
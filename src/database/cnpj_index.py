@@ -0,0 +1,140 @@
+"""
+Índice CNPJ -> Posição da Linha
+
+Tabela hash (pandas.Index) construída uma vez por carga (snapshot_token)
+para que análises por empresa localizem a linha em O(1), sem comparar a
+coluna cnpj inteira a cada consulta.
+"""
+
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .derived import is_snapshot_frame, snapshot_cached
+
+
+class CNPJIndex:
+    """Mapeia CNPJ para a posição (iloc) da primeira linha com esse CNPJ."""
+
+    def __init__(self, cnpjs):
+        values = pd.Index(np.asarray(cnpjs, dtype=object))
+        first = ~values.duplicated(keep='first')
+
+        self.n_rows = len(values)
+        self._index = values[first]
+        self._positions = np.flatnonzero(first)
+
+        # Constrói a tabela hash agora, não na primeira consulta
+        self._index.get_indexer(self._index[:1])
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, cnpj) -> bool:
+        return cnpj in self._index
+
+    def position(self, cnpj) -> Optional[int]:
+        """
+        Posição da empresa.
+
+        Args:
+            cnpj: CNPJ da empresa
+
+        Returns:
+            int ou None: Posição (iloc), ou None se o CNPJ não existir
+        """
+        try:
+            return int(self._positions[self._index.get_loc(cnpj)])
+        except KeyError:
+            return None
+
+    def positions(self, cnpjs: Iterable) -> np.ndarray:
+        """
+        Posições de vários CNPJs (os inexistentes são omitidos).
+
+        Args:
+            cnpjs: CNPJs das empresas
+
+        Returns:
+            np.ndarray: Posições (iloc), na ordem dos CNPJs encontrados
+        """
+        found = self._index.get_indexer(pd.Index(list(cnpjs), dtype=object))
+        return self._positions[found[found >= 0]]
+
+
+def build_cnpj_index(df: pd.DataFrame) -> Optional[CNPJIndex]:
+    """
+    Constrói o índice de CNPJ de um DataFrame.
+
+    Args:
+        df: DataFrame com a coluna cnpj
+
+    Returns:
+        CNPJIndex ou None: Índice, ou None se não houver coluna cnpj
+    """
+    if 'cnpj' not in df.columns:
+        return None
+    return CNPJIndex(df['cnpj'].to_numpy(dtype=object))
+
+
+def resolve_cnpj_index(df: pd.DataFrame, index: Optional[CNPJIndex] = None) -> Optional[CNPJIndex]:
+    """
+    Índice a usar nas buscas por CNPJ em df.
+
+    Sem índice informado, usa o da carga (get_cnpj_index) quando df é a
+    carga completa (is_snapshot_frame). Para seleções (que herdam o token)
+    ou DataFrames sem token, construir um índice custaria mais que uma
+    varredura, então retorna None.
+
+    Args:
+        df: DataFrame com dados
+        index: Índice de CNPJ construído sobre df (opcional)
+
+    Returns:
+        CNPJIndex ou None: Índice, ou None para buscar por varredura
+    """
+    if index is None and is_snapshot_frame(df):
+        return get_cnpj_index(df)
+    return index
+
+
+def find_cnpj_position(df: pd.DataFrame, cnpj, index: Optional[CNPJIndex] = None) -> Optional[int]:
+    """
+    Posição da empresa no DataFrame: O(1) com índice, senão uma varredura.
+
+    Args:
+        df: DataFrame com dados
+        cnpj: CNPJ da empresa
+        index: Índice de CNPJ construído sobre df (padrão: o da carga, ver
+               resolve_cnpj_index)
+
+    Returns:
+        int ou None: Posição (iloc), ou None se não encontrada
+    """
+    index = resolve_cnpj_index(df, index)
+    if index is not None:
+        return index.position(cnpj)
+
+    if df.empty or 'cnpj' not in df.columns:
+        return None
+
+    # Comparação na coluna nativa (sem converter para object)
+    matches = np.flatnonzero((df['cnpj'] == cnpj).to_numpy(dtype=bool, na_value=False))
+    return int(matches[0]) if len(matches) else None
+
+
+def get_cnpj_index(df: pd.DataFrame) -> Optional[CNPJIndex]:
+    """
+    Obtém o índice de CNPJ do DataFrame, construindo-o uma vez por carga.
+
+    É reaproveitado enquanto df.attrs['snapshot_token'] e a ordem das linhas
+    não mudarem (ver database.derived). Sem token, o índice não é guardado.
+
+    Args:
+        df: DataFrame principal (sem filtros)
+
+    Returns:
+        CNPJIndex ou None: Índice, ou None se não houver coluna cnpj
+    """
+    return snapshot_cached(df, 'cnpj_index', build_cnpj_index, columns=['cnpj'])
@@ -0,0 +1,226 @@
+"""
+Representação Compacta de DataFrames
+
+Aplica, no momento da carga, os tipos compactos declarados em
+schemas.MAIN_COMPACT_DTYPES: categorias para rótulos, texto Arrow contíguo
+para CNPJ/razão social, float32 para escores e percentuais e o menor inteiro
+possível para contagens. A conversão é feita sobre a tabela Arrow, antes de
+gerar o DataFrame, para não materializar a versão larga em pandas.
+"""
+
+from typing import Optional, Dict, Any, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from ..config.settings import MEMORY_CONFIG
+from .schemas import MAIN_COMPACT_DTYPES, resolve_column_type
+
+# Inteiros Arrow em ordem crescente de largura e o dtype pandas nullable
+_INT_TYPES = [
+    (pa.int8(), 'Int8'),
+    (pa.int16(), 'Int16'),
+    (pa.int32(), 'Int32'),
+    (pa.int64(), 'Int64'),
+]
+
+_FLOAT32_MAX = float(np.finfo(np.float32).max)
+
+
+def _smallest_int_type(column: pa.ChunkedArray) -> Optional[pa.DataType]:
+    """Menor inteiro Arrow que comporta a coluna, ou None se houver frações."""
+    if column.null_count == len(column):
+        return pa.int8()
+
+    if pa.types.is_floating(column.type):
+        valid = pc.drop_null(column)
+        if not pc.all(pc.equal(valid, pc.floor(valid))).as_py():
+            return None
+
+    bounds = pc.min_max(column)
+    low, high = bounds['min'].as_py(), bounds['max'].as_py()
+
+    for arrow_type, _ in _INT_TYPES:
+        info = np.iinfo(arrow_type.to_pandas_dtype())
+        if info.min <= low and high <= info.max:
+            return arrow_type
+
+    return None
+
+
+def _compact_column(column: pa.ChunkedArray, kind: Optional[str],
+                    category_max_ratio: float) -> pa.ChunkedArray:
+    """Converte uma coluna Arrow para o tipo compacto declarado."""
+    if pa.types.is_dictionary(column.type) or len(column) == 0:
+        return column
+
+    is_text = pa.types.is_string(column.type) or pa.types.is_large_string(column.type)
+
+    if kind is None and is_text:
+        distinct = pc.count_distinct(column).as_py()
+        if distinct / len(column) <= category_max_ratio:
+            kind = 'category'
+
+    if kind == 'category' and is_text:
+        return column.dictionary_encode()
+
+    if kind == 'float32' and pa.types.is_floating(column.type):
+        bounds = pc.min_max(pc.abs(column))
+        if bounds['max'].as_py() is None or bounds['max'].as_py() <= _FLOAT32_MAX:
+            return pc.cast(column, pa.float32())
+
+    if kind == 'int' and (pa.types.is_floating(column.type) or pa.types.is_integer(column.type)):
+        int_type = _smallest_int_type(column)
+        if int_type is not None:
+            return pc.cast(column, int_type, safe=False)
+
+    return column
+
+
+def compact_arrow_table(table: pa.Table, dtypes: Optional[dict] = None,
+                        category_max_ratio: Optional[float] = None) -> pa.Table:
+    """
+    Converte as colunas de uma tabela Arrow para os tipos compactos.
+
+    Args:
+        table: Tabela a compactar
+        dtypes: Tipos compactos por coluna (padrão: MAIN_COMPACT_DTYPES)
+        category_max_ratio: Razão máxima únicos/linhas para texto não
+                            declarado virar categoria
+
+    Returns:
+        pa.Table: Tabela compactada
+    """
+    dtypes = MAIN_COMPACT_DTYPES if dtypes is None else dtypes
+    if category_max_ratio is None:
+        category_max_ratio = MEMORY_CONFIG['category_max_ratio']
+
+    columns = [
+        _compact_column(column, resolve_column_type(dtypes, name), category_max_ratio)
+        for name, column in zip(table.column_names, table.columns)
+    ]
+
+    return pa.Table.from_arrays(columns, names=table.column_names,
+                                metadata=table.schema.metadata)
+
+
+def _types_mapper(arrow_type: pa.DataType):
+    """Texto Arrow vira string[pyarrow] (buffer contíguo, sem objetos Python)."""
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.StringDtype('pyarrow')
+    return None
+
+
+def arrow_to_compact_pandas(table: pa.Table) -> pd.DataFrame:
+    """
+    Converte tabela Arrow (já compactada) em DataFrame mantendo os tipos.
+
+    Dicionários viram Categorical (categorias ordenadas) e inteiros com
+    nulos viram inteiros nullable (Int8/Int16/...), em vez de float64.
+
+    Args:
+        table: Tabela Arrow
+
+    Returns:
+        pd.DataFrame: DataFrame compacto
+    """
+    df = table.to_pandas(split_blocks=True, types_mapper=_types_mapper)
+
+    nullable = dict((str(arrow_type), name) for arrow_type, name in _INT_TYPES)
+    for field, column in zip(table.schema, table.columns):
+        if pa.types.is_integer(field.type) and column.null_count > 0:
+            df[field.name] = df[field.name].astype(nullable.get(str(field.type), 'Int64'))
+
+        elif pa.types.is_dictionary(field.type):
+            # Categorias em ordem alfabética, como no groupby sobre texto
+            categories = df[field.name].cat.categories
+            if not categories.is_monotonic_increasing:
+                df[field.name] = df[field.name].cat.reorder_categories(categories.sort_values())
+
+    return df
+
+
+def compact_dataframe(df: pd.DataFrame, dtypes: Optional[dict] = None,
+                      category_max_ratio: Optional[float] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Aplica os tipos compactos a um DataFrame e mede o ganho de memória.
+
+    Args:
+        df: DataFrame carregado
+        dtypes: Tipos compactos por coluna (padrão: MAIN_COMPACT_DTYPES)
+        category_max_ratio: Razão máxima únicos/linhas para texto não
+                            declarado virar categoria
+
+    Returns:
+        tuple: (DataFrame compacto, relatório com bytes antes/depois e tipos
+               por coluna)
+    """
+    antes = df.memory_usage(deep=True, index=False)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    compact = arrow_to_compact_pandas(compact_arrow_table(table, dtypes, category_max_ratio))
+    compact.index = df.index
+    compact.attrs.update(df.attrs)
+
+    depois = compact.memory_usage(deep=True, index=False)
+
+    report = summarize_memory_report({
+        col: {
+            'dtype_before': str(df[col].dtype),
+            'dtype_after': str(compact[col].dtype),
+            'bytes_before': int(antes[col]),
+            'bytes_after': int(depois[col]),
+        }
+        for col in df.columns
+    })
+
+    return compact, report
+
+
+def compaction_report(before: pa.Table, after: pa.Table) -> Dict[str, Any]:
+    """
+    Mede o ganho de compact_arrow_table em bytes Arrow, coluna a coluna.
+
+    Usado nas cargas projetadas, que compactam a tabela Arrow sem passar
+    por um DataFrame largo (não há bytes pandas "antes" para medir).
+
+    Args:
+        before: Tabela original
+        after: Tabela compactada (mesmas colunas)
+
+    Returns:
+        dict: Relatório no formato de compact_dataframe
+    """
+    return summarize_memory_report({
+        name: {
+            'dtype_before': str(before.schema.field(name).type),
+            'dtype_after': str(after.schema.field(name).type),
+            'bytes_before': int(before.column(name).nbytes),
+            'bytes_after': int(after.column(name).nbytes),
+        }
+        for name in after.column_names
+    })
+
+
+def summarize_memory_report(columns: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Totaliza o relatório de memória a partir dos dados por coluna.
+
+    Args:
+        columns: Coluna -> tipos e bytes antes/depois
+
+    Returns:
+        dict: Bytes antes/depois, redução percentual e dados por coluna
+    """
+    report = {
+        'bytes_before': sum(col['bytes_before'] for col in columns.values()),
+        'bytes_after': sum(col['bytes_after'] for col in columns.values()),
+        'columns': columns,
+    }
+    report['reduction_pct'] = (
+        (1 - report['bytes_after'] / report['bytes_before']) * 100 if report['bytes_before'] else 0.0
+    )
+
+    return report
@@ -3,13 +3,16 @@ Gerenciamento de Conexões com Banco de Dados
 """
 
 import streamlit as st
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, text, event, exc
+from sqlalchemy.pool import QueuePool
 import pandas as pd
 import ssl
+import threading
+import time
 from typing import Optional
 import warnings
 
-from ..config.settings import IMPALA_CONFIG, IMPALA_CREDENTIALS, TABLES
+from ..config.settings import IMPALA_CONFIG, IMPALA_CREDENTIALS, TABLES, POOL_CONFIG
 
 warnings.filterwarnings('ignore')
 
@@ -22,12 +25,168 @@ else:
     ssl._create_default_https_context = _create_unverified_https_context
 
 
+class PoolMetrics:
+    """Contadores de uso do pool de conexões (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Zera os contadores."""
+        with self._lock:
+            self.connects = 0
+            self.connect_failures = 0
+            self.connect_time_total = 0.0
+            self.connect_time_max = 0.0
+            self.checkouts = 0
+            self.wait_time_total = 0.0
+            self.wait_time_max = 0.0
+            self.liveness_checks = 0
+            self.liveness_failures = 0
+            self.warmup_seconds = None
+            self.warmup_connections = 0
+            self.warmup_error = None
+
+    def record_connect(self, seconds: float, success: bool = True):
+        """Registra abertura de conexão (handshake LDAP/SSL)."""
+        with self._lock:
+            if not success:
+                self.connect_failures += 1
+                return
+            self.connects += 1
+            self.connect_time_total += seconds
+            self.connect_time_max = max(self.connect_time_max, seconds)
+
+    def record_checkout(self, seconds: float):
+        """Registra obtenção de conexão do pool."""
+        with self._lock:
+            self.checkouts += 1
+            self.wait_time_total += seconds
+            self.wait_time_max = max(self.wait_time_max, seconds)
+
+    def record_liveness(self, success: bool):
+        """Registra verificação periódica de conexão."""
+        with self._lock:
+            self.liveness_checks += 1
+            if not success:
+                self.liveness_failures += 1
+
+    def record_warmup(self, seconds: float, opened: int, error: Optional[str] = None):
+        """Registra o pré-aquecimento do pool (conexões abertas e eventual falha)."""
+        with self._lock:
+            self.warmup_seconds = seconds
+            self.warmup_connections = opened
+            self.warmup_error = error
+
+    def as_dict(self) -> dict:
+        """Retorna os contadores com médias calculadas."""
+        with self._lock:
+            return {
+                'connects': self.connects,
+                'connect_failures': self.connect_failures,
+                'connect_ms_avg': self.connect_time_total / self.connects * 1000 if self.connects else 0.0,
+                'connect_ms_max': self.connect_time_max * 1000,
+                'checkouts': self.checkouts,
+                'wait_ms_avg': self.wait_time_total / self.checkouts * 1000 if self.checkouts else 0.0,
+                'wait_ms_max': self.wait_time_max * 1000,
+                'liveness_checks': self.liveness_checks,
+                'liveness_failures': self.liveness_failures,
+                'warmup_seconds': self.warmup_seconds,
+                'warmup_connections': self.warmup_connections,
+                'warmup_error': self.warmup_error,
+            }
+
+
+POOL_METRICS = PoolMetrics()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool que mede o tempo de espera por conexão no checkout."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_METRICS.record_checkout(time.perf_counter() - start)
+
+
+def _attach_pool_events(engine, liveness_interval: float):
+    """
+    Registra eventos de telemetria e verificação periódica de conexões.
+
+    Substitui o pool_pre_ping: a conexão só é testada no checkout se ficou
+    mais de liveness_interval segundos sem verificação.
+    """
+    @event.listens_for(engine, 'do_connect')
+    def _timed_connect(dialect, conn_rec, cargs, cparams):
+        start = time.perf_counter()
+        try:
+            dbapi_conn = dialect.connect(*cargs, **cparams)
+        except Exception:
+            POOL_METRICS.record_connect(time.perf_counter() - start, success=False)
+            raise
+        POOL_METRICS.record_connect(time.perf_counter() - start)
+        conn_rec.info['last_verified'] = time.monotonic()
+        return dbapi_conn
+
+    @event.listens_for(engine, 'checkout')
+    def _check_liveness(dbapi_conn, conn_record, conn_proxy):
+        now = time.monotonic()
+        if now - conn_record.info.get('last_verified', 0) < liveness_interval:
+            return
+
+        try:
+            cursor = dbapi_conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+        except Exception:
+            POOL_METRICS.record_liveness(False)
+            # O pool descarta a conexão e tenta outra
+            raise exc.DisconnectionError()
+
+        POOL_METRICS.record_liveness(True)
+        conn_record.info['last_verified'] = now
+
+
+def warmup_pool(engine, n_connections: int):
+    """
+    Abre e devolve ao pool n_connections conexões autenticadas.
+
+    Roda em segundo plano: uma falha (ex.: autenticação LDAP) interrompe o
+    aquecimento e fica registrada em POOL_METRICS (exibida no Diagnóstico).
+
+    Args:
+        engine: SQLAlchemy engine
+        n_connections: Número de conexões a pré-abrir
+    """
+    start = time.perf_counter()
+    conns = []
+    error = None
+
+    try:
+        for _ in range(n_connections):
+            conns.append(engine.connect())
+    except Exception as e:
+        error = f"{type(e).__name__}: {str(e).splitlines()[0][:200] if str(e) else ''}"
+    finally:
+        for conn in conns:
+            conn.close()
+
+    POOL_METRICS.record_warmup(time.perf_counter() - start, len(conns), error)
+
+
 @st.cache_resource(show_spinner=False)
 def get_engine():
     """
     Cria e retorna engine de conexão com Impala.
     Usa cache para evitar múltiplas conexões.
 
+    O pool é dimensionado por POOL_CONFIG e pré-aquecido em segundo plano
+    com POOL_CONFIG['warmup_connections'] conexões.
+
     Returns:
         SQLAlchemy Engine ou None em caso de erro
     """
@@ -49,10 +208,22 @@ def get_engine():
         engine = create_engine(
             connection_string,
             connect_args=connect_args,
-            pool_pre_ping=True,  # Verifica conexões antes de usar
-            pool_recycle=3600,   # Recicla conexões após 1 hora
+            poolclass=TimedQueuePool,
+            pool_size=POOL_CONFIG['pool_size'],
+            max_overflow=POOL_CONFIG['max_overflow'],
+            pool_timeout=POOL_CONFIG['pool_timeout'],
+            pool_recycle=POOL_CONFIG['pool_recycle'],
         )
 
+        _attach_pool_events(engine, POOL_CONFIG['liveness_interval'])
+
+        n_warmup = min(POOL_CONFIG['warmup_connections'], POOL_CONFIG['pool_size'])
+        if n_warmup > 0:
+            threading.Thread(
+                target=warmup_pool, args=(engine, n_warmup),
+                name='dimp-pool-warmup', daemon=True
+            ).start()
+
         return engine
 
     except Exception as e:
@@ -60,6 +231,28 @@ def get_engine():
         return None
 
 
+def get_pool_metrics() -> dict:
+    """
+    Obtém métricas do pool de conexões.
+
+    Returns:
+        dict: Contadores de conexão/checkout e estado atual do pool
+    """
+    metrics = POOL_METRICS.as_dict()
+    engine = get_engine()
+
+    if engine is not None:
+        pool = engine.pool
+        metrics.update({
+            'pool_size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'idle': pool.checkedin(),
+            'overflow': pool.overflow(),
+        })
+
+    return metrics
+
+
 def test_connection() -> dict:
     """
     Testa a conexão com o banco de dados.
@@ -0,0 +1,112 @@
+"""
+Estruturas Derivadas por Carga
+
+Índices, cubos e tabelas calculados a partir do DataFrame principal são
+construídos uma vez por carga (df.attrs['snapshot_token']) e compartilhados
+entre reruns e sessões. São mantidas apenas as estruturas das
+DERIVED_MAX_LOADS cargas usadas mais recentemente (ex.: a base completa e
+uma seleção trazida do Impala por pushdown, que tem token próprio).
+
+As estruturas guardam posições de linha, então cada uma registra o índice
+do DataFrame em que foi construída: um DataFrame da mesma carga com outra
+ordem de linhas (ex.: df.sort_values(...), que preserva attrs) não a
+reaproveita. Até DERIVED_MAX_VARIANTS conjuntos de linhas (ex.: tabela
+completa e uma seleção filtrada, que também preserva attrs) são mantidos
+por estrutura.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence
+
+import pandas as pd
+
+# Conjuntos de linhas mantidos por estrutura (o mais recente primeiro)
+DERIVED_MAX_VARIANTS = 3
+
+# Cargas mantidas (a usada mais recentemente por último)
+DERIVED_MAX_LOADS = 2
+
+# token -> {(nome, parâmetros, colunas usadas) -> [(índice, estrutura)]}
+_DERIVED: 'OrderedDict[str, Dict[Any, Any]]' = OrderedDict()
+_DERIVED_LOCK = threading.Lock()
+
+
+def mark_snapshot(df: pd.DataFrame, token: str) -> pd.DataFrame:
+    """
+    Identifica df como a carga completa de token.
+
+    Registra o token e a quantidade de linhas da carga: seleções de df
+    herdam attrs, mas com menos linhas (ver is_snapshot_frame).
+
+    Args:
+        df: DataFrame recém-carregado
+        token: Token da carga
+
+    Returns:
+        pd.DataFrame: O próprio df
+    """
+    df.attrs['snapshot_token'] = token
+    df.attrs['snapshot_rows'] = len(df)
+    return df
+
+
+def is_snapshot_frame(df: pd.DataFrame) -> bool:
+    """Indica se df tem token e todas as linhas da sua carga (não é uma seleção)."""
+    return (df.attrs.get('snapshot_token') is not None
+            and df.attrs.get('snapshot_rows') == len(df))
+
+
+def _same_rows(index: pd.Index, other: pd.Index) -> bool:
+    """Indica se dois índices identificam as mesmas linhas na mesma ordem."""
+    return index is other or index.equals(other)
+
+
+def snapshot_cached(df: pd.DataFrame, name: str, builder: Callable[[pd.DataFrame], Any],
+                    args: Hashable = (), columns: Optional[Sequence[str]] = None) -> Any:
+    """
+    Obtém uma estrutura derivada do DataFrame, construindo-a uma vez por carga.
+
+    A chave é o token da carga, o nome, os parâmetros e as colunas de origem
+    da estrutura presentes em df, e não o conjunto de colunas da página:
+    projeções diferentes da mesma carga (ex.: dashboard e estatísticas)
+    compartilham a estrutura. Ela é reaproveitada enquanto df tiver o mesmo
+    índice de linhas da construção. Sem token não é guardada.
+
+    Args:
+        df: DataFrame principal (sem filtros)
+        name: Nome da estrutura (ex.: 'cnpj_index')
+        builder: Função que constrói a estrutura a partir de df
+        args: Parâmetros adicionais que distinguem a estrutura
+        columns: Colunas lidas por builder (padrão: todas as de df)
+
+    Returns:
+        Estrutura construída por builder
+    """
+    token = df.attrs.get('snapshot_token')
+    if token is None:
+        return builder(df)
+
+    used = tuple(df.columns) if columns is None else tuple(c for c in columns if c in df.columns)
+    key = (name, args, used)
+
+    with _DERIVED_LOCK:
+        if token in _DERIVED:
+            _DERIVED.move_to_end(token)
+        variants = list(_DERIVED.get(token, {}).get(key, []))
+
+    for index, value in variants:
+        if _same_rows(index, df.index):
+            return value
+
+    value = builder(df)
+
+    with _DERIVED_LOCK:
+        entries = _DERIVED.setdefault(token, {})
+        _DERIVED.move_to_end(token)
+        while len(_DERIVED) > DERIVED_MAX_LOADS:
+            _DERIVED.popitem(last=False)  # Carga usada há mais tempo
+        variants = entries.get(key, [])
+        entries[key] = [(df.index, value)] + variants[:DERIVED_MAX_VARIANTS - 1]
+
+    return value
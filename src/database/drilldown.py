@@ -0,0 +1,208 @@
+"""
+Drill-Down de Empresas em Lote
+
+Carrega dados principais, sócios, evolução mensal e operações suspeitas de
+várias empresas com uma query por tabela (IN com parâmetros vinculados),
+separando o resultado por CNPJ. As quatro queries de cada bloco rodam em
+paralelo no pool e passam pelo cache de resultados compartilhado (Arrow IPC),
+então reabrir uma empresa não volta ao banco.
+"""
+
+import streamlit as st
+import pandas as pd
+import pyarrow as pa
+from typing import Dict, List, Tuple, Iterable
+
+from ..config.settings import TABLES, CACHE_CONFIG
+from .batch import execute_queries_concurrently
+from .schemas import MAIN_SCHEMA
+
+DRILLDOWN_PARTS = ['principal', 'socios', 'evolucao', 'operacoes']
+
+# Limite de CNPJs por cláusula IN
+DRILLDOWN_CHUNK_SIZE = 500
+
+# Operações suspeitas exibidas por empresa
+DRILLDOWN_OPERACOES_LIMIT = 100
+
+_QUERY_PRINCIPAL = """
+    SELECT *
+    FROM {main}
+    WHERE cnpj IN ({cnpjs})
+"""
+
+_QUERY_SOCIOS = """
+    SELECT
+        cnpj,
+        cpf_socio,
+        nome_socio,
+        nm_qualificacao,
+        CAST(perc_participacao AS DOUBLE) AS perc_participacao,
+        CAST(SUM(vl_total) AS DOUBLE) AS total_recebido,
+        COUNT(DISTINCT referencia) AS meses_recebeu
+    FROM {pagamentos_cpf}
+    WHERE cnpj IN ({cnpjs})
+    GROUP BY cnpj, cpf_socio, nome_socio, nm_qualificacao, perc_participacao
+    ORDER BY cnpj, total_recebido DESC
+"""
+
+_QUERY_EVOLUCAO = """
+    WITH cnpj_pagtos AS (
+        SELECT cnpj, referencia, CAST(SUM(vl_total) AS DOUBLE) AS vl_cnpj
+        FROM {pagamentos_cnpj}
+        WHERE cnpj IN ({cnpjs})
+        GROUP BY cnpj, referencia
+    ),
+    cpf_pagtos AS (
+        SELECT cnpj, referencia, CAST(SUM(vl_total) AS DOUBLE) AS vl_cpf
+        FROM {pagamentos_cpf}
+        WHERE cnpj IN ({cnpjs})
+        GROUP BY cnpj, referencia
+    )
+    SELECT
+        COALESCE(c.cnpj, p.cnpj) AS cnpj,
+        COALESCE(c.referencia, p.referencia) AS referencia,
+        COALESCE(c.vl_cnpj, 0) AS vl_cnpj,
+        COALESCE(p.vl_cpf, 0) AS vl_cpf
+    FROM cnpj_pagtos c
+    FULL OUTER JOIN cpf_pagtos p
+        ON c.cnpj = p.cnpj AND c.referencia = p.referencia
+    ORDER BY cnpj, referencia
+"""
+
+_QUERY_OPERACOES = """
+    SELECT
+        cnpj,
+        referencia,
+        identificador,
+        tipo_identificador,
+        nome_socio,
+        nm_qualificacao,
+        CAST(vl_credito AS DOUBLE) AS vl_credito,
+        CAST(vl_debito AS DOUBLE) AS vl_debito,
+        CAST(vl_pix AS DOUBLE) AS vl_pix,
+        CAST(vl_boleto AS DOUBLE) AS vl_boleto,
+        CAST(vl_transferencia AS DOUBLE) AS vl_transferencia,
+        CAST(vl_dinheiro AS DOUBLE) AS vl_dinheiro,
+        CAST(vl_total AS DOUBLE) AS vl_total
+    FROM (
+        SELECT
+            o.*,
+            ROW_NUMBER() OVER (
+                PARTITION BY cnpj ORDER BY referencia DESC, vl_total DESC
+            ) AS rn
+        FROM {operacoes_suspeitas} o
+        WHERE cnpj IN ({cnpjs})
+    ) ranked
+    WHERE rn <= :limite
+    ORDER BY cnpj, referencia DESC, vl_total DESC
+"""
+
+
+def _in_clause(cnpjs: List[str]) -> Tuple[str, Dict[str, str]]:
+    """Monta placeholders e parâmetros vinculados para uma cláusula IN."""
+    keys = [f"cnpj_{i}" for i in range(len(cnpjs))]
+    return ', '.join(f":{key}" for key in keys), dict(zip(keys, cnpjs))
+
+
+def _chunks(values: List[str], size: int) -> Iterable[List[str]]:
+    """Divide a lista em blocos de até size elementos."""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _split_by_cnpj(df: pd.DataFrame, cnpjs: List[str]) -> Dict[str, pd.DataFrame]:
+    """Separa o resultado de uma query em lote por CNPJ."""
+    empty = df.iloc[0:0]
+    if df.empty:
+        return {cnpj: empty for cnpj in cnpjs}
+
+    groups = {str(key): group.reset_index(drop=True)
+              for key, group in df.groupby('cnpj', sort=False)}
+    return {cnpj: groups.get(cnpj, empty) for cnpj in cnpjs}
+
+
+def load_drilldown_batch(_engine, cnpjs: List[str],
+                         chunk_size: int = DRILLDOWN_CHUNK_SIZE) -> Dict[str, Dict[str, pd.DataFrame]]:
+    """
+    Carrega o drill-down de uma lista de empresas em lote.
+
+    Cada parte (principal, sócios, evolução, operações) custa uma query por
+    bloco de chunk_size CNPJs, em vez de uma query por empresa; as partes de
+    um bloco rodam em paralelo e os resultados ficam no cache de resultados
+    por CACHE_CONFIG['ttl_short'] (ou até as tabelas mudarem).
+
+    Args:
+        _engine: SQLAlchemy engine
+        cnpjs: Lista de CNPJs
+        chunk_size: Máximo de CNPJs por cláusula IN
+
+    Returns:
+        dict: {cnpj: {'principal': df, 'socios': df, 'evolucao': df, 'operacoes': df}}
+    """
+    cnpjs = list(dict.fromkeys(str(c) for c in cnpjs if c))
+    detalhes = {cnpj: {} for cnpj in cnpjs}
+
+    if not cnpjs:
+        return detalhes
+
+    queries = {
+        'principal': (_QUERY_PRINCIPAL, MAIN_SCHEMA),
+        'socios': (_QUERY_SOCIOS, {'cnpj': pa.string()}),
+        'evolucao': (_QUERY_EVOLUCAO, {'cnpj': pa.string()}),
+        'operacoes': (_QUERY_OPERACOES, {'cnpj': pa.string(), 'vl_*': pa.float64()}),
+    }
+
+    for chunk in _chunks(cnpjs, chunk_size):
+        placeholders, params = _in_clause(chunk)
+
+        specs = {}
+        for part, (template, schema) in queries.items():
+            query = template.format(cnpjs=placeholders, **{
+                'main': TABLES['main'],
+                'pagamentos_cpf': TABLES['pagamentos_cpf'],
+                'pagamentos_cnpj': TABLES['pagamentos_cnpj'],
+                'operacoes_suspeitas': TABLES['operacoes_suspeitas'],
+            })
+            part_params = dict(params)
+            if part == 'operacoes':
+                part_params['limite'] = DRILLDOWN_OPERACOES_LIMIT
+            specs[part] = (query, part_params, schema)
+
+        batch = execute_queries_concurrently(_engine, specs, ttl=CACHE_CONFIG['ttl_short'])
+        if batch['errors']:
+            raise RuntimeError('; '.join(f"{part}: {error}" for part, error in batch['errors'].items()))
+
+        for part, df in batch['results'].items():
+            for cnpj, df_cnpj in _split_by_cnpj(df, chunk).items():
+                detalhes[cnpj][part] = df_cnpj
+
+    return detalhes
+
+
+@st.cache_data(ttl=CACHE_CONFIG['ttl_short'], show_spinner=False)
+def _load_empresa_drilldown(_engine, cnpj: str) -> Dict[str, pd.DataFrame]:
+    """Drill-down de uma empresa guardado por TTL curto (erros sobem e não são guardados)."""
+    return load_drilldown_batch(_engine, [cnpj]).get(str(cnpj), {})
+
+
+def load_empresa_drilldown(_engine, cnpj: str) -> Dict[str, pd.DataFrame]:
+    """
+    Carrega o drill-down completo de uma empresa.
+
+    Reruns da página da empresa são atendidos por st.cache_data (TTL curto),
+    mesmo com o cache de resultados desabilitado; a primeira carga passa
+    pelo lote concorrente (load_drilldown_batch).
+
+    Args:
+        _engine: SQLAlchemy engine
+        cnpj: CNPJ da empresa
+
+    Returns:
+        dict: DataFrames 'principal', 'socios', 'evolucao' e 'operacoes'
+    """
+    try:
+        return _load_empresa_drilldown(_engine, str(cnpj))
+    except Exception as e:
+        st.error(f"❌ Erro ao carregar detalhes: {str(e)}")
+        return {}
@@ -0,0 +1,209 @@
+"""
+Leitura de Resultados em Formato Arrow
+
+Os resultados são lidos em lotes diretamente para RecordBatches Arrow, já com
+os tipos declarados em schemas.py, evitando o pd.read_sql + pd.to_numeric.
+"""
+
+import re
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Iterator
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from sqlalchemy import text
+
+from .schemas import resolve_column_type
+
+DEFAULT_BATCH_SIZE = 50000
+
+
+_NAMED_PARAM = re.compile(r'(?<![:\w]):([A-Za-z_]\w*)')
+
+
+def _to_qmark(query: str, params: Dict[str, Any]):
+    """Converte parâmetros :nome (estilo SQLAlchemy) para ? posicionais (DB-API)."""
+    values = []
+
+    def _replace(match):
+        values.append(params[match.group(1)])
+        return '?'
+
+    return _NAMED_PARAM.sub(_replace, query), values
+
+
+@contextmanager
+def _open_cursor(source, query: str, params: Optional[Dict[str, Any]] = None):
+    """
+    Executa a query e entrega o cursor DB-API bruto.
+
+    Aceita SQLAlchemy Engine/Connection ou uma conexão DB-API
+    (sqlite3, duckdb) usada como substituta em testes.
+    """
+    if hasattr(source, 'connect') and hasattr(source, 'dialect'):
+        # SQLAlchemy Engine
+        with source.connect() as conn:
+            result = conn.execute(text(query), params or {})
+            try:
+                yield result.cursor
+            finally:
+                result.close()
+
+    elif hasattr(source, 'dialect'):
+        # SQLAlchemy Connection
+        result = source.execute(text(query), params or {})
+        try:
+            yield result.cursor
+        finally:
+            result.close()
+
+    else:
+        cursor = source.cursor()
+        try:
+            if params:
+                cursor.execute(*_to_qmark(query, params))
+            else:
+                cursor.execute(query)
+            yield cursor
+        finally:
+            cursor.close()
+
+
+def _to_arrow_array(values, arrow_type) -> pa.Array:
+    """Converte uma coluna de valores para o tipo Arrow declarado."""
+    if arrow_type is None:
+        return pa.array(values, from_pandas=True)
+
+    try:
+        return pa.array(values, type=arrow_type, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+
+    # Decimal/str vindos do driver: converte pelo tipo inferido
+    try:
+        return pa.array(values, from_pandas=True).cast(arrow_type, safe=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        if pa.types.is_floating(arrow_type) or pa.types.is_integer(arrow_type):
+            coerced = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce')
+            return pa.array(coerced, type=pa.float64(), from_pandas=True).cast(arrow_type, safe=False)
+        raise
+
+
+def _conform_batch(batch: pa.RecordBatch, schema: Optional[dict]) -> pa.RecordBatch:
+    """Aplica os tipos declarados a um lote vindo de um driver Arrow nativo."""
+    if not schema:
+        return batch
+
+    arrays = []
+    for name, column in zip(batch.schema.names, batch.columns):
+        arrow_type = resolve_column_type(schema, name)
+        if arrow_type is not None and column.type != arrow_type:
+            column = pc.cast(column, arrow_type, safe=False)
+        arrays.append(column)
+
+    return pa.RecordBatch.from_arrays(arrays, names=batch.schema.names)
+
+
+def _rows_to_batch(rows: list, names: list, schema: Optional[dict]) -> pa.RecordBatch:
+    """Transpõe linhas DB-API em colunas e monta um RecordBatch tipado."""
+    columns = list(zip(*rows)) if rows else [()] * len(names)
+    arrays = [
+        _to_arrow_array(list(values), resolve_column_type(schema, name))
+        for name, values in zip(names, columns)
+    ]
+    return pa.RecordBatch.from_arrays(arrays, names=names)
+
+
+def iter_sql_batches(source, query: str, params: Optional[Dict[str, Any]] = None,
+                     schema: Optional[dict] = None,
+                     batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[pa.RecordBatch]:
+    """
+    Executa uma query e produz RecordBatches Arrow tipados.
+
+    Drivers com suporte nativo a Arrow (fetch_record_batch/fetch_arrow_table,
+    ex.: DuckDB e ADBC) são lidos sem passar por tuplas Python.
+
+    Args:
+        source: SQLAlchemy Engine/Connection ou conexão DB-API
+        query: Query SQL (parâmetros no formato :nome para SQLAlchemy)
+        params: Parâmetros da query
+        schema: Tipos declarados (coluna -> tipo Arrow)
+        batch_size: Linhas por lote
+
+    Yields:
+        pa.RecordBatch: Lotes do resultado
+    """
+    with _open_cursor(source, query, params) as cursor:
+        if hasattr(cursor, 'fetch_record_batch'):
+            for batch in cursor.fetch_record_batch(batch_size):
+                yield _conform_batch(batch, schema)
+            return
+
+        if hasattr(cursor, 'fetch_arrow_table'):
+            for batch in cursor.fetch_arrow_table().to_batches(batch_size):
+                yield _conform_batch(batch, schema)
+            return
+
+        if cursor.description is None:
+            return
+
+        names = [col[0] for col in cursor.description]
+        emitted = False
+
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            emitted = True
+            yield _rows_to_batch(rows, names, schema)
+
+        if not emitted:
+            yield _rows_to_batch([], names, schema)
+
+
+def read_sql_arrow(source, query: str, params: Optional[Dict[str, Any]] = None,
+                   schema: Optional[dict] = None,
+                   batch_size: int = DEFAULT_BATCH_SIZE) -> pa.Table:
+    """
+    Executa uma query e retorna uma tabela Arrow tipada.
+
+    Args:
+        source: SQLAlchemy Engine/Connection ou conexão DB-API
+        query: Query SQL
+        params: Parâmetros da query
+        schema: Tipos declarados (coluna -> tipo Arrow)
+        batch_size: Linhas por lote
+
+    Returns:
+        pa.Table: Resultado da query
+    """
+    batches = list(iter_sql_batches(source, query, params, schema, batch_size))
+
+    if not batches:
+        return pa.table({})
+
+    return pa.Table.from_batches(batches)
+
+
+def read_sql_frame(source, query: str, params: Optional[Dict[str, Any]] = None,
+                   schema: Optional[dict] = None,
+                   batch_size: int = DEFAULT_BATCH_SIZE) -> pd.DataFrame:
+    """
+    Executa uma query e retorna DataFrame construído a partir de Arrow.
+
+    Substitui pd.read_sql: as colunas numéricas já chegam tipadas, sem
+    necessidade de pd.to_numeric posterior.
+
+    Args:
+        source: SQLAlchemy Engine/Connection ou conexão DB-API
+        query: Query SQL
+        params: Parâmetros da query
+        schema: Tipos declarados (coluna -> tipo Arrow)
+        batch_size: Linhas por lote
+
+    Returns:
+        pd.DataFrame: Resultado da query
+    """
+    table = read_sql_arrow(source, query, params, schema, batch_size)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
@@ -0,0 +1,142 @@
+"""
+Especificação de Filtros (SQL ou Máscara em Memória)
+"""
+
+from dataclasses import dataclass, fields
+from typing import Optional, List, Tuple, Dict, Any
+
+import numpy as np
+import pandas as pd
+
+from .sorted_index import index_filter_rows
+
+# Atributo do filtro -> (coluna, operador)
+FILTER_COLUMNS = {
+    'classificacao': ('classificacao_risco', 'in'),
+    'regime': ('regime_tributario', 'in'),
+    'municipio': ('municipio', 'in'),
+    'uf': ('uf', 'in'),
+    'score_min': ('score_risco_final', '>='),
+    'score_max': ('score_risco_final', '<='),
+    'perc_cpf_min': ('perc_recebido_cpf', '>='),
+    'valor_min': ('total_geral', '>='),
+}
+
+
+@dataclass
+class FilterSpec:
+    """
+    Filtros do dashboard, compiláveis para cláusula WHERE parametrizada
+    ou para uma única máscara booleana sobre o DataFrame.
+    """
+    classificacao: Optional[List[str]] = None
+    regime: Optional[List[str]] = None
+    municipio: Optional[List[str]] = None
+    uf: Optional[List[str]] = None
+    score_min: Optional[float] = None
+    score_max: Optional[float] = None
+    perc_cpf_min: Optional[float] = None
+    valor_min: Optional[float] = None
+
+    def active(self) -> List[Tuple[str, str, str, Any]]:
+        """Lista (atributo, coluna, operador, valor) dos filtros ativos."""
+        result = []
+        for field in fields(self):
+            value = getattr(self, field.name)
+            column, op = FILTER_COLUMNS[field.name]
+            if op == 'in' and not value:
+                continue
+            if op != 'in' and value is None:
+                continue
+            result.append((field.name, column, op, value))
+        return result
+
+    def is_empty(self) -> bool:
+        """Indica se nenhum filtro está ativo."""
+        return not self.active()
+
+    def to_sql(self) -> Tuple[str, Dict[str, Any]]:
+        """
+        Compila os filtros para cláusula WHERE com parâmetros vinculados.
+
+        Returns:
+            tuple: (cláusula sem 'WHERE', dicionário de parâmetros)
+        """
+        clauses = []
+        params = {}
+
+        for name, column, op, value in self.active():
+            if op == 'in':
+                keys = [f"f_{name}_{i}" for i in range(len(value))]
+                params.update(zip(keys, value))
+                placeholders = ', '.join(f":{key}" for key in keys)
+                clauses.append(f"{column} IN ({placeholders})")
+            else:
+                params[f"f_{name}"] = value
+                clauses.append(f"{column} {op} :f_{name}")
+
+        return ' AND '.join(clauses), params
+
+    def to_mask(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Compila os filtros para uma única máscara booleana.
+
+        Filtros sobre colunas ausentes são ignorados.
+
+        Args:
+            df: DataFrame a filtrar
+
+        Returns:
+            np.ndarray: Máscara booleana com len(df) posições
+        """
+        mask = np.ones(len(df), dtype=bool)
+
+        for _, column, op, value in self.active():
+            if column not in df.columns:
+                continue
+
+            if op == 'in':
+                mask &= df[column].isin(value).to_numpy()
+                continue
+
+            values = df[column].to_numpy(dtype=float, na_value=np.nan)
+            if op == '>=':
+                mask &= values >= value
+            else:
+                mask &= values <= value
+
+        return mask
+
+    def ranges(self) -> Dict[str, Tuple[Optional[float], Optional[float]]]:
+        """Filtros de faixa ativos por coluna: coluna -> (mínimo, máximo)."""
+        result = {}
+        for _, column, op, value in self.active():
+            if op == 'in':
+                continue
+            low, high = result.get(column, (None, None))
+            result[column] = (value, high) if op == '>=' else (low, value)
+        return result
+
+    def apply(self, df: pd.DataFrame, indexes: Optional[dict] = None) -> pd.DataFrame:
+        """
+        Aplica os filtros em memória com uma única seleção de linhas.
+
+        Com índices ordenados (sorted_index.get_sorted_indexes(df)), a faixa
+        mais seletiva vira uma busca binária e os demais filtros só são
+        avaliados nas linhas dessa faixa.
+
+        Args:
+            df: DataFrame a filtrar
+            indexes: Índices ordenados construídos sobre df (opcional)
+
+        Returns:
+            pd.DataFrame: Linhas que atendem aos filtros
+        """
+        if indexes:
+            found = index_filter_rows(indexes, self.ranges(), len(df))
+            if found is not None:
+                _, rows = found
+                subset = df.iloc[rows]
+                return subset[self.to_mask(subset)]
+
+        return df[self.to_mask(df)]
@@ -0,0 +1,184 @@
+"""
+Impressão Digital de Tabelas para Validação de Caches
+
+Em vez de TTLs fixos, os caches guardam a impressão digital das tabelas de
+origem e só são reutilizados enquanto ela não muda. No Impala a impressão
+vem dos metadados do catálogo (SHOW TABLE STATS: linhas, arquivos e tamanho
+por partição, e transient_lastDdlTime do DESCRIBE FORMATTED), sem varrer
+dados. Em outros bancos (ex.: DuckDB/SQLite locais) usa-se COUNT(*).
+"""
+
+import hashlib
+import re
+import threading
+import time
+from typing import Optional, Dict, Iterable, List
+
+from ..config.settings import TABLES, FRESHNESS_CONFIG
+from .fetch import read_sql_frame
+
+# Colunas do SHOW TABLE STATS que mudam quando os dados são reescritos
+_STATS_COLUMNS = ['#Rows', '#Files', 'Size']
+
+_FINGERPRINTS: Dict[str, tuple] = {}
+_FINGERPRINTS_LOCK = threading.Lock()
+
+
+def _dialect_name(source) -> str:
+    """Nome do dialeto SQLAlchemy (vazio para conexões DB-API)."""
+    return getattr(getattr(source, 'dialect', None), 'name', '') or ''
+
+
+def _digest(*parts) -> str:
+    return hashlib.sha1('|'.join(str(p) for p in parts).encode('utf-8')).hexdigest()[:16]
+
+
+def _impala_fingerprint(source, table: str) -> str:
+    """Impressão digital a partir dos metadados do catálogo Impala."""
+    stats = read_sql_frame(source, f"SHOW TABLE STATS {table}")
+    cols = [col for col in _STATS_COLUMNS if col in stats.columns] or list(stats.columns)
+    stats_repr = stats[cols].astype(str).to_csv(index=False)
+
+    ddl_time = ''
+    formatted = read_sql_frame(source, f"DESCRIBE FORMATTED {table}")
+    for row in formatted.astype(str).itertuples(index=False):
+        values = [value.strip() for value in row]
+        if 'transient_lastDdlTime' in values:
+            position = values.index('transient_lastDdlTime')
+            ddl_time = values[position + 1] if position + 1 < len(values) else ''
+            break
+
+    return _digest(stats_repr, ddl_time)
+
+
+def _count_fingerprint(source, table: str) -> str:
+    """Equivalente local: contagem de linhas."""
+    df = read_sql_frame(source, f"SELECT COUNT(*) AS qtd FROM {table}")
+    return _digest(int(df.iloc[0, 0]))
+
+
+def get_table_fingerprint(source, table: str, max_age: Optional[float] = None) -> str:
+    """
+    Obtém a impressão digital de uma tabela.
+
+    O valor é memorizado no processo por FRESHNESS_CONFIG['check_interval']
+    segundos, para que a validação não gere uma consulta a cada leitura.
+
+    Args:
+        source: SQLAlchemy Engine/Connection ou conexão DB-API
+        table: Nome completo da tabela
+        max_age: Idade máxima do valor memorizado (padrão: check_interval)
+
+    Returns:
+        str: Impressão digital (muda quando a tabela é reescrita)
+    """
+    max_age = FRESHNESS_CONFIG['check_interval'] if max_age is None else max_age
+    now = time.time()
+
+    with _FINGERPRINTS_LOCK:
+        cached = _FINGERPRINTS.get(table)
+    if cached and now - cached[0] <= max_age:
+        return cached[1]
+
+    if _dialect_name(source) == 'impala':
+        fingerprint = _impala_fingerprint(source, table)
+    else:
+        fingerprint = _count_fingerprint(source, table)
+
+    with _FINGERPRINTS_LOCK:
+        _FINGERPRINTS[table] = (now, fingerprint)
+
+    return fingerprint
+
+
+def get_table_fingerprints(source, tables: Iterable[str]) -> Dict[str, str]:
+    """
+    Obtém impressões digitais de várias tabelas.
+
+    Args:
+        source: SQLAlchemy Engine/Connection ou conexão DB-API
+        tables: Nomes completos das tabelas
+
+    Returns:
+        dict: tabela -> impressão digital
+    """
+    return {table: get_table_fingerprint(source, table) for table in sorted(set(tables))}
+
+
+def forget_fingerprints(table: Optional[str] = None):
+    """
+    Descarta impressões memorizadas, forçando nova consulta.
+
+    Args:
+        table: Tabela específica (padrão: todas)
+    """
+    with _FINGERPRINTS_LOCK:
+        if table is None:
+            _FINGERPRINTS.clear()
+        else:
+            _FINGERPRINTS.pop(table, None)
+
+
+def get_table_version(source, table: str) -> Optional[str]:
+    """
+    Versão de uma tabela para compor chaves de cache (ex.: @st.cache_data).
+
+    Args:
+        source: SQLAlchemy Engine/Connection ou conexão DB-API
+        table: Nome completo da tabela
+
+    Returns:
+        str ou None: Impressão digital, ou None se a validação estiver
+                     desabilitada ou os metadados indisponíveis
+    """
+    if not FRESHNESS_CONFIG['enabled']:
+        return None
+
+    try:
+        return get_table_fingerprint(source, table)
+    except Exception:
+        return None
+
+
+def find_source_tables(query: str) -> List[str]:
+    """
+    Identifica as tabelas de TABLES referenciadas por uma query.
+
+    Args:
+        query: Query SQL
+
+    Returns:
+        list: Nomes completos das tabelas encontradas
+    """
+    found = []
+    for table in TABLES.values():
+        if re.search(rf'(?<![\w.]){re.escape(table)}(?!\w)', query, flags=re.IGNORECASE):
+            found.append(table)
+    return sorted(set(found))
+
+
+def get_query_fingerprints(source, query: str) -> Optional[Dict[str, str]]:
+    """
+    Impressões digitais das tabelas lidas por uma query.
+
+    Args:
+        source: SQLAlchemy Engine/Connection ou conexão DB-API
+        query: Query SQL
+
+    Returns:
+        dict ou None: tabela -> impressão digital; None quando a validação
+                      está desabilitada, a query não lê tabelas conhecidas
+                      ou os metadados não puderam ser consultados
+    """
+    if not FRESHNESS_CONFIG['enabled']:
+        return None
+
+    tables = find_source_tables(query)
+    if not tables:
+        return None
+
+    try:
+        return get_table_fingerprints(source, tables)
+    except Exception:
+        # Sem metadados: quem chamou recai no TTL
+        return None
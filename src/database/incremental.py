@@ -0,0 +1,282 @@
+"""
+Sincronização Incremental de Tabelas Particionadas
+
+Mantém uma cópia local (snapshot) de tabelas que crescem mês a mês e, a cada
+atualização, busca no banco apenas as partições (referencia) novas ou
+alteradas, identificadas por uma impressão digital COUNT/SUM por partição.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Tuple, Optional
+
+import numpy as np
+import streamlit as st
+import pandas as pd
+
+from ..config.settings import TABLES, CACHE_CONFIG, SNAPSHOT_CONFIG, INCREMENTAL_CONFIG
+from .derived import mark_snapshot
+from .fetch import read_sql_frame
+from .freshness import get_table_version
+from .schemas import PAGAMENTOS_SCHEMA
+from .snapshot import _table_slug, load_snapshot, save_snapshot, get_freshness_token
+
+
+# Chave da partição nula no estado da sincronização
+NULL_PARTITION = 'null'
+
+
+def partition_key(value) -> str:
+    """
+    Chave textual de uma partição, usada no estado e na cópia local.
+
+    Valores inteiros guardados como float (ex.: 202401.0) viram '202401',
+    para que a coluna local case com as chaves do banco qualquer que seja
+    o tipo com que foi lida.
+
+    Args:
+        value: Valor da coluna de partição
+
+    Returns:
+        str: Chave da partição (NULL_PARTITION para nulos)
+    """
+    if value is None or pd.isna(value):
+        return NULL_PARTITION
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _partition_mask(column: pd.Series, keys) -> np.ndarray:
+    """Linhas cuja partição (por partition_key) está em keys, normalizando só os valores distintos."""
+    codes, uniques = pd.factorize(column, use_na_sentinel=False)
+    selected = [i for i, value in enumerate(uniques) if partition_key(value) in keys]
+    return np.isin(codes, selected)
+
+
+def _merge_partitions(local_df: Optional[pd.DataFrame], fetched: pd.DataFrame,
+                      partition_column: str) -> pd.DataFrame:
+    """
+    Junta a cópia local (ordenada por partição) e as partições buscadas.
+
+    As partições buscadas são inseridas nas suas posições, em blocos, sem
+    reordenar a tabela inteira; só o lote buscado é ordenado. Nulos ficam
+    no fim. Uma cópia local fora de ordem é reordenada por completo.
+    """
+    fetched = fetched.sort_values(partition_column, kind='stable', na_position='last')
+
+    if local_df is None or local_df.empty:
+        return fetched.reset_index(drop=True)
+    if fetched.empty:
+        return local_df.reset_index(drop=True)
+
+    local_column = local_df[partition_column]
+    n_valid = int(local_column.notna().sum())
+    ordered = (local_column.iloc[:n_valid].is_monotonic_increasing
+               and local_column.iloc[n_valid:].isna().all())
+
+    if not ordered:
+        merged = pd.concat([local_df, fetched], ignore_index=True)
+        return merged.sort_values(partition_column, kind='stable', na_position='last').reset_index(drop=True)
+
+    fetched_valid = fetched[partition_column].notna().to_numpy()
+    fetched_nulls = fetched[~fetched_valid]
+    fetched = fetched[fetched_valid]
+
+    # Posição de inserção de cada linha buscada na parte não nula da cópia local
+    cuts = np.searchsorted(local_column.iloc[:n_valid].to_numpy(),
+                           fetched[partition_column].to_numpy(), side='right')
+
+    pieces, start = [], 0
+    for cut in np.unique(cuts):
+        pieces.append(local_df.iloc[start:cut])
+        pieces.append(fetched.iloc[np.searchsorted(cuts, cut, 'left'):np.searchsorted(cuts, cut, 'right')])
+        start = int(cut)
+    pieces += [local_df.iloc[start:], fetched_nulls]
+
+    return pd.concat([piece for piece in pieces if not piece.empty], ignore_index=True)
+
+
+def get_sync_state_path(table: str) -> Path:
+    """Caminho do arquivo de estado da sincronização de uma tabela."""
+    return Path(SNAPSHOT_CONFIG['dir']) / f"{_table_slug(table)}__sync.json"
+
+
+def load_sync_state(table: str) -> Dict[str, Any]:
+    """
+    Carrega o estado da última sincronização.
+
+    Args:
+        table: Nome completo da tabela
+
+    Returns:
+        dict: Estado ('token', 'last_partition', 'partitions') ou vazio
+    """
+    path = get_sync_state_path(table)
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_sync_state(table: str, state: Dict[str, Any]):
+    """Grava o estado de forma atômica."""
+    path = get_sync_state_path(table)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def get_partition_fingerprints(_engine, table: str, partition_column: str,
+                               checksum_column: str) -> pd.DataFrame:
+    """
+    Consulta a impressão digital (linhas e soma) de cada partição.
+
+    Args:
+        _engine: SQLAlchemy engine
+        table: Nome completo da tabela
+        partition_column: Coluna de partição (ex.: referencia)
+        checksum_column: Coluna numérica somada como checksum
+
+    Returns:
+        pd.DataFrame: partição, qtd_linhas, checksum
+
+    O checksum soma a coluna em centavos inteiros (BIGINT): a soma inteira é
+    exata e não depende da ordem em que o Impala agrega as linhas, ao
+    contrário de uma soma em DOUBLE.
+    """
+    query = f"""
+        SELECT
+            {partition_column} AS particao,
+            COUNT(*) AS qtd_linhas,
+            SUM(CAST(ROUND({checksum_column} * 100) AS BIGINT)) AS checksum
+        FROM {table}
+        GROUP BY {partition_column}
+    """
+    return read_sql_frame(_engine, query)
+
+
+def _fingerprint(qtd_linhas, checksum) -> str:
+    """Representação estável da impressão digital de uma partição."""
+    checksum = 'null' if pd.isna(checksum) else str(int(checksum))
+    return f"{int(qtd_linhas)}:{checksum}"
+
+
+def sync_table_incremental(_engine, table_key: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Atualiza a cópia local de uma tabela buscando só partições novas/alteradas.
+
+    Args:
+        _engine: SQLAlchemy engine
+        table_key: Chave em TABLES configurada em INCREMENTAL_CONFIG
+
+    Returns:
+        tuple: (DataFrame completo atualizado, relatório da sincronização)
+    """
+    config = INCREMENTAL_CONFIG[table_key]
+    table = TABLES[table_key]
+    partition_column = config['partition_column']
+
+    state = load_sync_state(table)
+    local_df = load_snapshot(table, token=state['token']) if state.get('token') else None
+    known = state.get('partitions', {}) if local_df is not None else {}
+
+    remote = get_partition_fingerprints(_engine, table, partition_column, config['checksum_column'])
+    remote_values = {partition_key(value): value for value in remote['particao'].tolist()}
+    remote_fp = {
+        partition_key(particao): _fingerprint(qtd, checksum)
+        for particao, qtd, checksum in zip(remote['particao'].tolist(),
+                                           remote['qtd_linhas'].tolist(),
+                                           remote['checksum'].tolist())
+    }
+
+    novas = sorted(p for p in remote_fp if p not in known)
+    alteradas = sorted(p for p in remote_fp if p in known and known[p] != remote_fp[p])
+    removidas = sorted(p for p in known if p not in remote_fp)
+    buscar = novas + alteradas
+
+    report = {
+        'table': table,
+        'novas': novas,
+        'alteradas': alteradas,
+        'removidas': removidas,
+        'rows_fetched': 0,
+        'bytes_fetched': 0,
+        'full_reload': local_df is None,
+    }
+
+    if not buscar and not removidas and local_df is not None:
+        report['total_rows'] = len(local_df)
+        return local_df, report
+
+    fetched = pd.DataFrame()
+    if buscar:
+        valores = [remote_values[p] for p in buscar if p != NULL_PARTITION]
+        keys = [f"p_{i}" for i in range(len(valores))]
+        params = dict(zip(keys, valores))
+
+        # IN não casa nulos: a partição nula é buscada com IS NULL
+        conditions = [f"{partition_column} IN ({', '.join(f':{key}' for key in keys)})"] if keys else []
+        if NULL_PARTITION in buscar:
+            conditions.append(f"{partition_column} IS NULL")
+
+        query = f"SELECT * FROM {table} WHERE {' OR '.join(conditions)}"
+        fetched = read_sql_frame(_engine, query, params, schema=PAGAMENTOS_SCHEMA)
+        report['rows_fetched'] = len(fetched)
+        report['bytes_fetched'] = int(fetched.memory_usage(deep=True).sum())
+
+    if local_df is not None:
+        descartar = set(alteradas) | set(removidas)
+        if descartar:
+            local_df = local_df[~_partition_mask(local_df[partition_column], descartar)]
+
+    merged = _merge_partitions(local_df, fetched, partition_column)
+
+    token = get_freshness_token()
+    save_snapshot(merged, table, token)
+    mark_snapshot(merged, token)
+
+    _save_sync_state(table, {
+        'token': token,
+        'partition_column': partition_column,
+        'last_partition': max((p for p in remote_fp if p != NULL_PARTITION), default=None),
+        'partitions': remote_fp,
+        'synced_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+    })
+
+    report['total_rows'] = len(merged)
+    return merged, report
+
+
+def load_table_incremental(_engine, table_key: str) -> pd.DataFrame:
+    """
+    Carrega uma tabela particionada completa via sincronização incremental.
+
+    A sincronização (que consulta as impressões por partição) só é refeita
+    quando os metadados da tabela mudam.
+
+    Args:
+        _engine: SQLAlchemy engine
+        table_key: Chave em TABLES configurada em INCREMENTAL_CONFIG
+
+    Returns:
+        pd.DataFrame: Dados completos da tabela
+    """
+    return _load_table_incremental(_engine, table_key,
+                                   get_table_version(_engine, TABLES[table_key]))
+
+
+@st.cache_data(ttl=CACHE_CONFIG['ttl_long'], max_entries=4,
+               show_spinner="⏳ Sincronizando pagamentos...")
+def _load_table_incremental(_engine, table_key: str, versao: Optional[str]) -> pd.DataFrame:
+    """Sincroniza uma versão da tabela (ver load_table_incremental)."""
+    try:
+        df, _ = sync_table_incremental(_engine, table_key)
+        return df
+    except Exception as e:
+        st.warning(f"⚠️ Erro na sincronização de {TABLES[table_key]}: {str(e)[:100]}")
+        return pd.DataFrame()
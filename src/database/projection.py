@@ -0,0 +1,100 @@
+"""
+Cache de Projeções de Colunas
+
+Guarda tabelas Arrow por versão da tabela de origem e atende qualquer lista
+de colunas contida numa tabela já carregada, sem voltar ao banco. Uma nova
+carga mais larga substitui as mais estreitas que ela cobre.
+"""
+
+import threading
+from typing import Optional, Sequence, List, Set
+
+import pyarrow as pa
+
+
+def project_table(table: pa.Table, columns: Sequence[str]) -> pa.Table:
+    """
+    Seleciona colunas de uma tabela Arrow (sem cópia), ignorando as ausentes.
+
+    Args:
+        table: Tabela de origem
+        columns: Colunas desejadas, na ordem de saída
+
+    Returns:
+        pa.Table: Tabela projetada
+    """
+    available = set(table.column_names)
+    return table.select([col for col in columns if col in available])
+
+
+class ProjectionCache:
+    """Tabelas Arrow de uma mesma origem, indexadas pela versão."""
+
+    def __init__(self, max_tables: int = 4):
+        self.max_tables = max_tables
+        self._version = None
+        self._tables: List[pa.Table] = []
+        self._lock = threading.Lock()
+
+    def _reset_if_stale(self, version: Optional[str]):
+        if version != self._version:
+            self._version = version
+            self._tables = []
+
+    def get(self, version: Optional[str], columns: Sequence[str]) -> Optional[pa.Table]:
+        """
+        Busca uma tabela que contenha todas as colunas pedidas.
+
+        Args:
+            version: Versão da tabela de origem
+            columns: Colunas desejadas
+
+        Returns:
+            pa.Table ou None: Projeção das colunas, ou None se nenhuma tabela
+                              carregada as cobre
+        """
+        wanted = set(columns)
+
+        with self._lock:
+            self._reset_if_stale(version)
+            for table in self._tables:
+                if wanted <= set(table.column_names):
+                    return project_table(table, columns)
+
+        return None
+
+    def known_columns(self, version: Optional[str]) -> Set[str]:
+        """Colunas já carregadas para a versão (base para ampliar a próxima carga)."""
+        with self._lock:
+            self._reset_if_stale(version)
+            return {col for table in self._tables for col in table.column_names}
+
+    def row_count(self, version: Optional[str]) -> Optional[int]:
+        """Linhas das tabelas já carregadas para a versão (None se nenhuma)."""
+        with self._lock:
+            self._reset_if_stale(version)
+            return self._tables[0].num_rows if self._tables else None
+
+    def put(self, version: Optional[str], table: pa.Table):
+        """
+        Registra uma tabela carregada, descartando as que ela cobre.
+
+        Args:
+            version: Versão da tabela de origem
+            table: Tabela carregada
+        """
+        columns = set(table.column_names)
+
+        with self._lock:
+            self._reset_if_stale(version)
+            self._tables = [
+                t for t in self._tables if not set(t.column_names) <= columns
+            ]
+            self._tables.insert(0, table)
+            del self._tables[self.max_tables:]
+
+    def clear(self):
+        """Descarta todas as tabelas."""
+        with self._lock:
+            self._version = None
+            self._tables = []
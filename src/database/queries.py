@@ -2,48 +2,249 @@
 Queries e Funções de Carregamento de Dados
 """
 
+import json
+
 import streamlit as st
 import pandas as pd
-from sqlalchemy import text
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Sequence
 
-from ..config.settings import TABLES, CACHE_CONFIG
+from ..config.settings import TABLES, CACHE_CONFIG, FILTERS_CONFIG, INCREMENTAL_CONFIG, MEMORY_CONFIG
 from .connection import get_engine
+from .batch import execute_queries_concurrently
+from .cnpj_index import CNPJIndex, find_cnpj_position, get_cnpj_index
+from .compact import (
+    compact_arrow_table, arrow_to_compact_pandas, compact_dataframe,
+    compaction_report, summarize_memory_report
+)
+from .derived import mark_snapshot
+from .fetch import read_sql_frame, read_sql_arrow
+from .filters import FilterSpec
+from .freshness import get_table_version
+from .incremental import load_table_incremental
+from .projection import ProjectionCache, project_table
+from .result_cache import cached_read_arrow, cached_read_sql, make_cache_key
+from .schemas import (
+    MAIN_SCHEMA, SOCIOS_SCHEMA, PAGAMENTOS_SCHEMA,
+    SOCIOS_MULTIPLOS_SCHEMA, OPERACOES_SCHEMA
+)
+from .snapshot import load_snapshot, load_snapshot_table, save_snapshot, get_freshness_token
+from .search_index import SearchIndex, get_search_index
+from .sorted_index import get_sorted_indexes
+
+# Projeções da tabela principal já carregadas neste processo
+MAIN_PROJECTIONS = ProjectionCache()
+
+
+def _main_data_query(columns: Optional[Sequence[str]] = None) -> str:
+    """Query da tabela principal (todas as colunas ou apenas as pedidas)."""
+    select = ', '.join(columns) if columns else '*'
+    return f"""
+        SELECT {select}
+        FROM {TABLES['main']}
+        WHERE score_risco_final IS NOT NULL
+            AND total_geral > 0
+    """
+
+
+def _fetch_main_table(_engine, columns: Sequence[str]):
+    """
+    Consulta colunas da tabela principal como tabela Arrow.
+
+    Args:
+        _engine: SQLAlchemy engine
+        columns: Colunas existentes a trazer
+
+    Returns:
+        pa.Table: Dados projetados
+    """
+    return read_sql_arrow(_engine, _main_data_query(columns), schema=MAIN_SCHEMA)
+
+
+def _fetch_main_data(_engine) -> pd.DataFrame:
+    """
+    Consulta a tabela dimp_score_final no banco.
+
+    Args:
+        _engine: SQLAlchemy engine
+
+    Returns:
+        pd.DataFrame: Dados principais com tipos convertidos
+    """
+    # Tipos numéricos aplicados na leitura Arrow (sem pd.to_numeric)
+    df = read_sql_frame(_engine, _main_data_query(), schema=MAIN_SCHEMA)
+
+    return df
 
 
-@st.cache_data(ttl=CACHE_CONFIG['ttl_long'], show_spinner="⏳ Carregando dados principais...")
-def load_main_data(_engine) -> pd.DataFrame:
+def load_main_data(_engine, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
     """
     Carrega dados principais da tabela dimp_score_final.
 
+    O cache vale até a tabela mudar: a versão (impressão digital dos
+    metadados) faz parte da chave, então uma reconstrução noturna da tabela
+    invalida o resultado na próxima verificação.
+
     Args:
         _engine: SQLAlchemy engine
+        columns: Colunas necessárias (padrão: todas); colunas inexistentes
+                 na tabela são ignoradas
 
     Returns:
         pd.DataFrame: Dados principais
     """
+    versao = get_table_version(_engine, TABLES['main'])
+
+    if columns is None:
+        return _load_main_data(_engine, versao)
+
+    return _load_main_projection(_engine, list(dict.fromkeys(columns)), versao)
+
+
+def get_main_columns(_engine) -> List[str]:
+    """
+    Lista as colunas existentes em dimp_score_final.
+
+    Args:
+        _engine: SQLAlchemy engine
+
+    Returns:
+        list: Nomes das colunas
+    """
+    df = cached_read_sql(_engine, f"DESCRIBE {TABLES['main']}", ttl=CACHE_CONFIG['ttl_extra_long'])
+    return df.iloc[:, 0].astype(str).str.strip().tolist()
+
+
+def get_main_row_count(_engine) -> Optional[int]:
+    """
+    Conta as linhas da tabela principal (mesmos critérios da carga).
+
+    Usa as projeções já carregadas no processo quando existem; caso
+    contrário consulta COUNT(*) no banco, passando pelo cache de resultados.
+
+    Args:
+        _engine: SQLAlchemy engine
+
+    Returns:
+        int ou None: Quantidade de linhas, ou None se a contagem falhar
+    """
+    versao = get_table_version(_engine, TABLES['main'])
+
+    rows = MAIN_PROJECTIONS.row_count(versao)
+    if rows is not None:
+        return rows
+
     try:
-        query = f"""
-            SELECT *
-            FROM {TABLES['main']}
-            WHERE score_risco_final IS NOT NULL
-                AND total_geral > 0
-        """
+        df = cached_read_sql(_engine, _main_data_query(['COUNT(*) AS qtd']),
+                             ttl=CACHE_CONFIG['ttl_long'])
+        return int(df['qtd'].iloc[0])
+    except Exception:
+        return None
+
+
+def _load_main_projection(_engine, columns: List[str], versao: Optional[str]) -> pd.DataFrame:
+    """
+    Carrega apenas as colunas pedidas da tabela principal.
+
+    Ordem de busca: projeções já carregadas no processo, snapshot local
+    (memory-map, lê só as colunas usadas) e, por fim, o banco com SELECT
+    restrito às colunas. A nova carga inclui as colunas já conhecidas, para
+    que a nova tabela cubra também os pedidos anteriores, e é compactada
+    uma única vez antes de entrar no cache de projeções. O ganho da
+    compactação (bytes Arrow por coluna) fica nos metadados da tabela e o
+    relatório das colunas pedidas vai para df.attrs['memory_report'].
+
+    Args:
+        _engine: SQLAlchemy engine
+        columns: Colunas pedidas
+        versao: Impressão digital da tabela
+
+    Returns:
+        pd.DataFrame: Dados principais projetados
+    """
+    try:
+        table = MAIN_PROJECTIONS.get(versao, columns)
+
+        if table is None:
+            wanted = MAIN_PROJECTIONS.known_columns(versao) | set(columns)
+            found = load_snapshot_table(TABLES['main'], fingerprint=versao)
+
+            if found is not None:
+                snapshot_table, token = found
+                table = project_table(
+                    snapshot_table, [col for col in snapshot_table.column_names if col in wanted]
+                )
+            else:
+                existentes = get_main_columns(_engine)
+                table = _fetch_main_table(_engine, [col for col in existentes if col in wanted])
+                token = get_freshness_token()
+
+            # Identifica a carga (reuso de estruturas derivadas, ex.: cubo de KPIs)
+            table = table.replace_schema_metadata(
+                dict(table.schema.metadata or {}, snapshot_token=token)
+            )
+
+            if MEMORY_CONFIG['compact_dtypes']:
+                compact = compact_arrow_table(table)
+                report = compaction_report(table, compact)
+                table = compact.replace_schema_metadata(
+                    dict(compact.schema.metadata or {}, memory_report=json.dumps(report['columns']))
+                )
+
+            MAIN_PROJECTIONS.put(versao, table)
+
+        df = arrow_to_compact_pandas(project_table(table, columns))
+        metadata = table.schema.metadata or {}
+
+        token = metadata.get(b'snapshot_token')
+        if token:
+            mark_snapshot(df, token.decode('utf-8'))
+
+        if b'memory_report' in metadata:
+            by_column = json.loads(metadata[b'memory_report'])
+            df.attrs['memory_report'] = summarize_memory_report(
+                {col: by_column[col] for col in df.columns if col in by_column}
+            )
+
+        return df
+
+    except Exception as e:
+        st.error(f"❌ Erro ao carregar dados principais: {str(e)}")
+        return pd.DataFrame()
+
 
-        with _engine.connect() as conn:
-            df = pd.read_sql(text(query), conn)
+@st.cache_resource(ttl=CACHE_CONFIG['ttl_long'], max_entries=2,
+                   show_spinner="⏳ Carregando dados principais...")
+def _load_main_data(_engine, versao: Optional[str]) -> pd.DataFrame:
+    """
+    Carrega dados principais de uma versão da tabela dimp_score_final.
+
+    Usa o snapshot local mais recente da mesma versão quando disponível;
+    caso contrário consulta o banco e grava um novo snapshot para os demais
+    processos.
+
+    O DataFrame fica em st.cache_resource: todas as sessões recebem o mesmo
+    objeto, sem a cópia (pickle) que st.cache_data faria a cada acesso.
+    Quem precisar alterá-lo deve trabalhar sobre uma cópia.
+
+    Args:
+        _engine: SQLAlchemy engine
+        versao: Impressão digital da tabela (None = sem validação, só idade)
+
+    Returns:
+        pd.DataFrame: Dados principais
+    """
+    try:
+        df = load_snapshot(TABLES['main'], fingerprint=versao)
 
-        # Conversões de tipos
-        numeric_cols = [
-            'score_risco_final', 'total_geral', 'total_recebido_cpf',
-            'total_recebido_cnpj', 'perc_recebido_cpf', 'perc_recebido_cnpj',
-            'qtd_socios_recebendo', 'score_proporcao', 'score_volume_cpf',
-            'score_qtd_socios', 'score_desvio_regime', 'score_consistencia'
-        ]
+        if df is None:
+            df = _fetch_main_data(_engine)
+            token = get_freshness_token()
+            save_snapshot(df, TABLES['main'], token, fingerprint=versao)
+            mark_snapshot(df, token)
 
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
+        if MEMORY_CONFIG['compact_dtypes']:
+            df, report = compact_dataframe(df)
+            df.attrs['memory_report'] = report
 
         return df
 
@@ -52,7 +253,22 @@ def load_main_data(_engine) -> pd.DataFrame:
         return pd.DataFrame()
 
 
-@st.cache_data(ttl=CACHE_CONFIG['ttl_medium'], show_spinner="⏳ Carregando sócios...")
+def refresh_main_snapshot(_engine) -> Optional[str]:
+    """
+    Reconstrói o snapshot da tabela principal (uso fora do horário de pico).
+
+    Args:
+        _engine: SQLAlchemy engine
+
+    Returns:
+        str ou None: Caminho do snapshot gravado
+    """
+    versao = get_table_version(_engine, TABLES['main'])
+    df = _fetch_main_data(_engine)
+    path = save_snapshot(df, TABLES['main'], fingerprint=versao)
+    return str(path) if path is not None else None
+
+
 def load_socios_data(_engine, cnpj: Optional[str] = None) -> pd.DataFrame:
     """
     Carrega dados de sócios.
@@ -67,11 +283,14 @@ def load_socios_data(_engine, cnpj: Optional[str] = None) -> pd.DataFrame:
     try:
         query = f"SELECT * FROM {TABLES['socios']}"
 
+        params = {}
+
         if cnpj:
-            query += f" WHERE cnpj = '{cnpj}'"
+            query += " WHERE cnpj = :cnpj"
+            params['cnpj'] = cnpj
 
-        with _engine.connect() as conn:
-            df = pd.read_sql(text(query), conn)
+        df = cached_read_sql(_engine, query, params, schema=SOCIOS_SCHEMA,
+                             ttl=CACHE_CONFIG['ttl_medium'])
 
         return df
 
@@ -80,7 +299,6 @@ def load_socios_data(_engine, cnpj: Optional[str] = None) -> pd.DataFrame:
         return pd.DataFrame()
 
 
-@st.cache_data(ttl=CACHE_CONFIG['ttl_medium'], show_spinner="⏳ Carregando pagamentos...")
 def load_pagamentos_cpf(_engine, cnpj: Optional[str] = None) -> pd.DataFrame:
     """
     Carrega pagamentos recebidos via CPF.
@@ -93,18 +311,21 @@ def load_pagamentos_cpf(_engine, cnpj: Optional[str] = None) -> pd.DataFrame:
         pd.DataFrame: Dados de pagamentos CPF
     """
     try:
+        if not cnpj and 'pagamentos_cpf' in INCREMENTAL_CONFIG:
+            # Tabela completa: cópia local atualizada só nas partições novas
+            return load_table_incremental(_engine, 'pagamentos_cpf')
+
         query = f"SELECT * FROM {TABLES['pagamentos_cpf']}"
 
-        if cnpj:
-            query += f" WHERE cnpj = '{cnpj}'"
+        params = {}
 
-        with _engine.connect() as conn:
-            df = pd.read_sql(text(query), conn)
+        if cnpj:
+            query += " WHERE cnpj = :cnpj"
+            params['cnpj'] = cnpj
 
-        # Converter colunas de valor para numérico
-        valor_cols = [col for col in df.columns if col.startswith('vl_')]
-        for col in valor_cols:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+        # Colunas vl_* já chegam como float64 pela leitura Arrow
+        df = cached_read_sql(_engine, query, params, schema=PAGAMENTOS_SCHEMA,
+                             ttl=CACHE_CONFIG['ttl_medium'])
 
         return df
 
@@ -113,7 +334,6 @@ def load_pagamentos_cpf(_engine, cnpj: Optional[str] = None) -> pd.DataFrame:
         return pd.DataFrame()
 
 
-@st.cache_data(ttl=CACHE_CONFIG['ttl_medium'], show_spinner="⏳ Carregando pagamentos CNPJ...")
 def load_pagamentos_cnpj(_engine, cnpj: Optional[str] = None) -> pd.DataFrame:
     """
     Carrega pagamentos recebidos via CNPJ.
@@ -126,18 +346,21 @@ def load_pagamentos_cnpj(_engine, cnpj: Optional[str] = None) -> pd.DataFrame:
         pd.DataFrame: Dados de pagamentos CNPJ
     """
     try:
+        if not cnpj and 'pagamentos_cnpj' in INCREMENTAL_CONFIG:
+            # Tabela completa: cópia local atualizada só nas partições novas
+            return load_table_incremental(_engine, 'pagamentos_cnpj')
+
         query = f"SELECT * FROM {TABLES['pagamentos_cnpj']}"
 
-        if cnpj:
-            query += f" WHERE cnpj = '{cnpj}'"
+        params = {}
 
-        with _engine.connect() as conn:
-            df = pd.read_sql(text(query), conn)
+        if cnpj:
+            query += " WHERE cnpj = :cnpj"
+            params['cnpj'] = cnpj
 
-        # Converter colunas de valor para numérico
-        valor_cols = [col for col in df.columns if col.startswith('vl_')]
-        for col in valor_cols:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+        # Colunas vl_* já chegam como float64 pela leitura Arrow
+        df = cached_read_sql(_engine, query, params, schema=PAGAMENTOS_SCHEMA,
+                             ttl=CACHE_CONFIG['ttl_medium'])
 
         return df
 
@@ -146,7 +369,6 @@ def load_pagamentos_cnpj(_engine, cnpj: Optional[str] = None) -> pd.DataFrame:
         return pd.DataFrame()
 
 
-@st.cache_data(ttl=CACHE_CONFIG['ttl_long'], show_spinner="⏳ Carregando sócios múltiplos...")
 def load_socios_multiplos(_engine) -> pd.DataFrame:
     """
     Carrega dados de sócios com participação em múltiplas empresas.
@@ -164,8 +386,8 @@ def load_socios_multiplos(_engine) -> pd.DataFrame:
             ORDER BY qtd_empresas DESC, total_recebido DESC
         """
 
-        with _engine.connect() as conn:
-            df = pd.read_sql(text(query), conn)
+        df = cached_read_sql(_engine, query, schema=SOCIOS_MULTIPLOS_SCHEMA,
+                             ttl=CACHE_CONFIG['ttl_long'])
 
         return df
 
@@ -174,7 +396,6 @@ def load_socios_multiplos(_engine) -> pd.DataFrame:
         return pd.DataFrame()
 
 
-@st.cache_data(ttl=CACHE_CONFIG['ttl_medium'], show_spinner="⏳ Carregando operações suspeitas...")
 def load_operacoes_suspeitas(_engine, limit: int = 1000) -> pd.DataFrame:
     """
     Carrega operações suspeitas detalhadas.
@@ -194,8 +415,8 @@ def load_operacoes_suspeitas(_engine, limit: int = 1000) -> pd.DataFrame:
             LIMIT {limit}
         """
 
-        with _engine.connect() as conn:
-            df = pd.read_sql(text(query), conn)
+        df = cached_read_sql(_engine, query, schema=OPERACOES_SCHEMA,
+                             ttl=CACHE_CONFIG['ttl_medium'])
 
         return df
 
@@ -204,6 +425,181 @@ def load_operacoes_suspeitas(_engine, limit: int = 1000) -> pd.DataFrame:
         return pd.DataFrame()
 
 
+def _resumo_queries() -> Dict[str, str]:
+    """Queries agregadas do resumo geral (independentes entre si)."""
+    main = TABLES['main']
+    return {
+        'colunas': f"DESCRIBE {main}",
+        'panorama': f"""
+            SELECT
+                COUNT(DISTINCT cnpj) AS total_empresas,
+                COUNT(DISTINCT CASE WHEN classificacao_risco = 'ALTO' THEN cnpj END) AS empresas_alto_risco,
+                COUNT(DISTINCT CASE WHEN classificacao_risco = 'MÉDIO-ALTO' THEN cnpj END) AS empresas_medio_alto,
+                CAST(SUM(total_geral) AS DOUBLE) AS volume_total,
+                CAST(SUM(total_recebido_cpf) AS DOUBLE) AS volume_cpf,
+                CAST(SUM(total_recebido_cnpj) AS DOUBLE) AS volume_cnpj,
+                CAST(AVG(perc_recebido_cpf) AS DOUBLE) AS media_perc_cpf,
+                CAST(AVG(score_risco_final) AS DOUBLE) AS media_score,
+                COUNT(DISTINCT CASE WHEN perc_recebido_cpf >= 80 THEN cnpj END) AS empresas_80pct_cpf
+            FROM {main}
+        """,
+        'dist_risco': f"""
+            SELECT
+                classificacao_risco,
+                COUNT(*) AS qtd_empresas,
+                CAST(SUM(total_recebido_cpf) AS DOUBLE) AS volume_cpf,
+                CAST(AVG(score_risco_final) AS DOUBLE) AS score_medio
+            FROM {main}
+            GROUP BY classificacao_risco
+        """,
+        'top_municipios': f"""
+            SELECT
+                municipio,
+                uf,
+                COUNT(DISTINCT cnpj) AS qtd_empresas,
+                CAST(SUM(total_recebido_cpf) AS DOUBLE) AS volume_cpf
+            FROM {main}
+            WHERE municipio IS NOT NULL
+            GROUP BY municipio, uf
+            ORDER BY volume_cpf DESC
+            LIMIT 20
+        """,
+        'por_uf': f"""
+            SELECT
+                uf,
+                COUNT(*) AS qtd_empresas,
+                CAST(SUM(total_recebido_cpf) AS DOUBLE) AS volume_cpf,
+                CAST(AVG(score_risco_final) AS DOUBLE) AS score_medio
+            FROM {main}
+            WHERE uf IS NOT NULL
+            GROUP BY uf
+            ORDER BY volume_cpf DESC
+        """,
+    }
+
+
+def _resumo_grouping_sets_query() -> str:
+    """
+    Query única com GROUPING SETS para todos os agregados do resumo.
+
+    GROUPING_ID(classificacao_risco, municipio, uf) identifica o conjunto:
+    7 = total, 3 = por classificação, 4 = por município/UF, 6 = por UF.
+    Como dimp_score_final tem uma linha por CNPJ, COUNT(*) equivale ao
+    COUNT(DISTINCT cnpj) das queries separadas.
+    """
+    return f"""
+        SELECT
+            classificacao_risco,
+            municipio,
+            uf,
+            GROUPING_ID(classificacao_risco, municipio, uf) AS grupo,
+            COUNT(*) AS qtd_empresas,
+            SUM(CASE WHEN classificacao_risco = 'ALTO' THEN 1 ELSE 0 END) AS empresas_alto_risco,
+            SUM(CASE WHEN classificacao_risco = 'MÉDIO-ALTO' THEN 1 ELSE 0 END) AS empresas_medio_alto,
+            SUM(CASE WHEN perc_recebido_cpf >= 80 THEN 1 ELSE 0 END) AS empresas_80pct_cpf,
+            CAST(SUM(total_geral) AS DOUBLE) AS volume_total,
+            CAST(SUM(total_recebido_cpf) AS DOUBLE) AS volume_cpf,
+            CAST(SUM(total_recebido_cnpj) AS DOUBLE) AS volume_cnpj,
+            CAST(AVG(perc_recebido_cpf) AS DOUBLE) AS media_perc_cpf,
+            CAST(AVG(score_risco_final) AS DOUBLE) AS score_medio
+        FROM {TABLES['main']}
+        GROUP BY GROUPING SETS ((), (classificacao_risco), (municipio, uf), (uf))
+    """
+
+
+def _split_grouping_sets(df: pd.DataFrame) -> Dict[str, Any]:
+    """Separa o resultado do GROUPING SETS nas partes do resumo."""
+    resumo = {}
+
+    total = df[df['grupo'] == 7]
+    if not total.empty:
+        row = total.iloc[0]
+        resumo['panorama'] = {
+            'total_empresas': row['qtd_empresas'],
+            'empresas_alto_risco': row['empresas_alto_risco'],
+            'empresas_medio_alto': row['empresas_medio_alto'],
+            'volume_total': row['volume_total'],
+            'volume_cpf': row['volume_cpf'],
+            'volume_cnpj': row['volume_cnpj'],
+            'media_perc_cpf': row['media_perc_cpf'],
+            'media_score': row['score_medio'],
+            'empresas_80pct_cpf': row['empresas_80pct_cpf'],
+        }
+    else:
+        resumo['panorama'] = {}
+
+    resumo['dist_risco'] = df.loc[
+        df['grupo'] == 3, ['classificacao_risco', 'qtd_empresas', 'volume_cpf', 'score_medio']
+    ].reset_index(drop=True)
+
+    resumo['top_municipios'] = df.loc[
+        (df['grupo'] == 4) & df['municipio'].notna(),
+        ['municipio', 'uf', 'qtd_empresas', 'volume_cpf']
+    ].sort_values('volume_cpf', ascending=False).head(20).reset_index(drop=True)
+
+    resumo['por_uf'] = df.loc[
+        (df['grupo'] == 6) & df['uf'].notna(),
+        ['uf', 'qtd_empresas', 'volume_cpf', 'score_medio']
+    ].sort_values('volume_cpf', ascending=False).reset_index(drop=True)
+
+    return resumo
+
+
+def load_resumo_geral(_engine, mode: str = 'concurrent') -> Dict[str, Any]:
+    """
+    Carrega agregados do dashboard executivo.
+
+    Os agregados são reaproveitados enquanto dimp_score_final não mudar.
+
+    Args:
+        _engine: SQLAlchemy engine
+        mode: 'concurrent' (queries em paralelo) ou 'grouping_sets'
+              (uma única varredura da tabela)
+
+    Returns:
+        dict: 'colunas_disponiveis', 'panorama', 'dist_risco',
+              'top_municipios', 'por_uf' e 'timings' (segundos por query)
+    """
+    return _load_resumo_geral(_engine, mode, get_table_version(_engine, TABLES['main']))
+
+
+@st.cache_data(ttl=CACHE_CONFIG['ttl_long'], max_entries=4,
+               show_spinner="⏳ Carregando resumo geral...")
+def _load_resumo_geral(_engine, mode: str, versao: Optional[str]) -> Dict[str, Any]:
+    """Carrega os agregados de uma versão de dimp_score_final (ver load_resumo_geral)."""
+    queries = _resumo_queries()
+
+    if mode == 'grouping_sets':
+        queries = {
+            'colunas': queries['colunas'],
+            'grouping_sets': _resumo_grouping_sets_query(),
+        }
+
+    batch = execute_queries_concurrently(_engine, queries)
+    results = batch['results']
+
+    for name, error in batch['errors'].items():
+        st.warning(f"⚠️ Erro ao carregar resumo ({name}): {error[:100]}")
+
+    resumo = {
+        'colunas_disponiveis': results['colunas'].iloc[:, 0].tolist() if 'colunas' in results else [],
+        'timings': dict(batch['timings'], total=batch['elapsed'])
+    }
+
+    if mode == 'grouping_sets':
+        if 'grouping_sets' in results:
+            resumo.update(_split_grouping_sets(results['grouping_sets']))
+        return resumo
+
+    df_panorama = results.get('panorama', pd.DataFrame())
+    resumo['panorama'] = df_panorama.to_dict('records')[0] if not df_panorama.empty else {}
+
+    for name in ['dist_risco', 'top_municipios', 'por_uf']:
+        resumo[name] = results.get(name, pd.DataFrame())
+
+    return resumo
+
+
 def filter_data(
     df: pd.DataFrame,
     classificacao: Optional[List[str]] = None,
@@ -213,11 +609,15 @@ def filter_data(
     score_min: Optional[float] = None,
     score_max: Optional[float] = None,
     perc_cpf_min: Optional[float] = None,
-    valor_min: Optional[float] = None
+    valor_min: Optional[float] = None,
+    indexes: Optional[dict] = None
 ) -> pd.DataFrame:
     """
     Aplica filtros ao DataFrame.
 
+    Com os índices ordenados de df (get_sorted_indexes), filtros de faixa
+    seletivos viram buscas binárias em vez de varrer a coluna.
+
     Args:
         df: DataFrame a filtrar
         classificacao: Lista de classificações de risco
@@ -228,52 +628,125 @@ def filter_data(
         score_max: Score máximo
         perc_cpf_min: Percentual CPF mínimo
         valor_min: Valor mínimo total
+        indexes: Índices ordenados construídos sobre df (opcional)
 
     Returns:
         pd.DataFrame: DataFrame filtrado
     """
-    df_filtered = df.copy()
+    spec = FilterSpec(
+        classificacao=classificacao, regime=regime, municipio=municipio, uf=uf,
+        score_min=score_min, score_max=score_max,
+        perc_cpf_min=perc_cpf_min, valor_min=valor_min
+    )
+
+    return spec.apply(df, indexes)
+
+
+def load_filtered_main_data(_engine, spec: FilterSpec,
+                            columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    Carrega da tabela principal apenas as linhas que atendem aos filtros.
+
+    Os filtros são enviados ao Impala como cláusula WHERE parametrizada. O
+    resultado recebe os tipos compactos e um snapshot_token próprio (versão
+    da tabela + filtros), para que os índices derivados sejam construídos
+    uma vez por seleção.
+
+    Args:
+        _engine: SQLAlchemy engine
+        spec: Especificação dos filtros
+        columns: Colunas necessárias (padrão: todas)
+
+    Returns:
+        pd.DataFrame: Dados filtrados
+    """
+    try:
+        where, params = spec.to_sql()
 
-    if classificacao and 'classificacao_risco' in df.columns:
-        df_filtered = df_filtered[df_filtered['classificacao_risco'].isin(classificacao)]
+        if columns is not None:
+            existentes = set(get_main_columns(_engine))
+            columns = [col for col in dict.fromkeys(columns) if col in existentes]
 
-    if regime and 'regime_tributario' in df.columns:
-        df_filtered = df_filtered[df_filtered['regime_tributario'].isin(regime)]
+        query = _main_data_query(columns)
 
-    if municipio and 'municipio' in df.columns:
-        df_filtered = df_filtered[df_filtered['municipio'].isin(municipio)]
+        if where:
+            query += f" AND {where}"
 
-    if uf and 'uf' in df.columns:
-        df_filtered = df_filtered[df_filtered['uf'].isin(uf)]
+        table = cached_read_arrow(_engine, query, params, schema=MAIN_SCHEMA,
+                                  ttl=CACHE_CONFIG['ttl_long'])
 
-    if score_min is not None and 'score_risco_final' in df.columns:
-        df_filtered = df_filtered[df_filtered['score_risco_final'] >= score_min]
+        if MEMORY_CONFIG['compact_dtypes']:
+            table = compact_arrow_table(table)
 
-    if score_max is not None and 'score_risco_final' in df.columns:
-        df_filtered = df_filtered[df_filtered['score_risco_final'] <= score_max]
+        df = arrow_to_compact_pandas(table)
 
-    if perc_cpf_min is not None and 'perc_recebido_cpf' in df.columns:
-        df_filtered = df_filtered[df_filtered['perc_recebido_cpf'] >= perc_cpf_min]
+        versao = get_table_version(_engine, TABLES['main'])
+        mark_snapshot(df, f"pushdown:{versao}:{make_cache_key(query, params, MAIN_SCHEMA)[:16]}")
+
+        return df
+
+    except Exception as e:
+        st.error(f"❌ Erro ao filtrar dados no servidor: {str(e)}")
+        return pd.DataFrame()
 
-    if valor_min is not None and 'total_geral' in df.columns:
-        df_filtered = df_filtered[df_filtered['total_geral'] >= valor_min]
 
-    return df_filtered
+def get_filtered_main_data(_engine, spec: FilterSpec,
+                           df: Optional[pd.DataFrame] = None,
+                           columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    Aplica filtros escolhendo entre máscara em memória e pushdown para o banco.
 
+    A decisão é tomada antes de carregar a base: sem df, bases de até
+    FILTERS_CONFIG['pushdown_min_rows'] linhas (ou sem filtros) são
+    carregadas (load_main_data) e filtradas localmente; acima disso apenas
+    as linhas filtradas são trazidas do Impala. Com df já carregado, o
+    filtro é sempre local, pois a base já está em memória.
 
-def search_empresa(df: pd.DataFrame, search_term: str) -> pd.DataFrame:
+    Args:
+        _engine: SQLAlchemy engine
+        spec: Especificação dos filtros
+        df: DataFrame principal já carregado (opcional)
+        columns: Colunas necessárias (padrão: as de df, ou todas)
+
+    Returns:
+        pd.DataFrame: Dados filtrados
+    """
+    if df is None:
+        rows = None if spec.is_empty() else get_main_row_count(_engine)
+
+        if rows is not None and rows > FILTERS_CONFIG['pushdown_min_rows']:
+            return load_filtered_main_data(_engine, spec, columns)
+
+        df = load_main_data(_engine, columns)
+
+    # Índices ordenados só para a base carregada (construídos uma vez por carga)
+    indexes = get_sorted_indexes(df) if df.attrs.get('snapshot_token') else None
+    return spec.apply(df, indexes)
+
+
+def search_empresa(df: pd.DataFrame, search_term: str, limit: Optional[int] = None,
+                   index: Optional[SearchIndex] = None) -> pd.DataFrame:
     """
     Busca empresa por CNPJ ou razão social.
 
+    Com o índice de busca de df (get_search_index), a consulta não percorre
+    as colunas: CNPJ por prefixo, razão social por prefixo ou trecho
+    (ignorando acentos), com resultados ordenados por relevância.
+
     Args:
         df: DataFrame com dados
         search_term: Termo de busca
+        limit: Quantidade máxima de resultados (None = todos)
+        index: Índice de busca construído sobre df (opcional)
 
     Returns:
         pd.DataFrame: Resultados da busca
     """
     if not search_term:
-        return df
+        return df if limit is None else df.head(limit)
+
+    if index is not None:
+        return df.iloc[index.search(search_term, limit)]
 
     search_term = search_term.upper().strip()
 
@@ -287,29 +760,30 @@ def search_empresa(df: pd.DataFrame, search_term: str) -> pd.DataFrame:
             search_term, na=False, regex=False
         )
 
-    return df[mask]
+    return df[mask] if limit is None else df[mask].head(limit)
 
 
-def get_empresa_details(df: pd.DataFrame, cnpj: str) -> Optional[Dict[str, Any]]:
+def get_empresa_details(df: pd.DataFrame, cnpj: str,
+                        index: Optional[CNPJIndex] = None) -> Optional[Dict[str, Any]]:
     """
     Obtém detalhes de uma empresa específica.
 
     Args:
         df: DataFrame com dados
         cnpj: CNPJ da empresa
+        index: Índice de CNPJ de df (padrão: o da carga, get_cnpj_index)
 
     Returns:
         dict ou None: Dicionário com dados da empresa
     """
-    empresa = df[df['cnpj'] == cnpj]
+    position = find_cnpj_position(df, cnpj, index)
 
-    if empresa.empty:
+    if position is None:
         return None
 
-    return empresa.iloc[0].to_dict()
+    return df.iloc[position].to_dict()
 
 
-@st.cache_data(ttl=CACHE_CONFIG['ttl_long'])
 def get_unique_values(_engine, table: str, column: str) -> List[Any]:
     """
     Obtém valores únicos de uma coluna.
@@ -330,8 +804,7 @@ def get_unique_values(_engine, table: str, column: str) -> List[Any]:
             ORDER BY {column}
         """
 
-        with _engine.connect() as conn:
-            df = pd.read_sql(text(query), conn)
+        df = cached_read_sql(_engine, query, ttl=CACHE_CONFIG['ttl_long'])
 
         return df[column].tolist() if not df.empty else []
 
@@ -340,7 +813,6 @@ def get_unique_values(_engine, table: str, column: str) -> List[Any]:
         return []
 
 
-@st.cache_data(ttl=CACHE_CONFIG['ttl_short'])
 def execute_custom_query(_engine, query: str) -> pd.DataFrame:
     """
     Executa query customizada.
@@ -353,8 +825,7 @@ def execute_custom_query(_engine, query: str) -> pd.DataFrame:
         pd.DataFrame: Resultado da query
     """
     try:
-        with _engine.connect() as conn:
-            df = pd.read_sql(text(query), conn)
+        df = cached_read_sql(_engine, query, ttl=CACHE_CONFIG['ttl_short'])
         return df
     except Exception as e:
         st.error(f"❌ Erro ao executar query: {str(e)}")
@@ -0,0 +1,360 @@
+"""
+Cache de Resultados de Queries (Arrow IPC Compartilhado)
+
+Resultados são indexados pelo SQL normalizado mais os parâmetros e gravados
+como arquivos Arrow IPC num diretório local comum a todos os processos. As
+leituras usam memory-map (sem cópia nem pickle), a ordem de uso é mantida
+pelo mtime dos arquivos (LRU entre processos) e o total em disco é limitado
+por RESULT_CACHE_CONFIG['max_bytes'].
+
+Cada entrada guarda a impressão digital das tabelas de origem (freshness.py)
+e é descartada assim que alguma delas muda; o TTL só é usado quando os
+metadados não estão disponíveis.
+
+Não depende do runtime do Streamlit: pode ser usado por scripts e jobs.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+import pandas as pd
+import pyarrow as pa
+
+from ..config.settings import RESULT_CACHE_CONFIG
+from .fetch import read_sql_arrow, DEFAULT_BATCH_SIZE
+from .freshness import get_query_fingerprints
+from .snapshot import write_ipc_atomic, read_snapshot_table
+
+RESULT_EXTENSION = '.arrow'
+_META_EXPIRES = b'dimp.expires_at'
+_META_QUERY = b'dimp.query'
+_META_SOURCES = b'dimp.sources'
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(query: str) -> str:
+    """Normaliza espaços e ';' final para que queries equivalentes compartilhem a chave."""
+    return _WHITESPACE.sub(' ', query).strip().rstrip(';').strip()
+
+
+def make_cache_key(query: str, params: Optional[Dict[str, Any]] = None,
+                   schema: Optional[dict] = None) -> str:
+    """
+    Gera a chave de cache de uma query.
+
+    Args:
+        query: Query SQL
+        params: Parâmetros da query
+        schema: Tipos declarados (alteram o resultado, logo fazem parte da chave)
+
+    Returns:
+        str: Hash SHA-256 hexadecimal
+    """
+    payload = json.dumps({
+        'sql': normalize_sql(query),
+        'params': params or {},
+        'schema': {name: str(tipo) for name, tipo in (schema or {}).items()},
+    }, sort_keys=True, default=str)
+
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    Armazenamento de resultados em arquivos Arrow IPC com despejo LRU.
+
+    Subclasses podem trocar o meio de armazenamento (ex.: memória
+    compartilhada) mantendo a interface get/put/invalidate/clear/stats.
+    """
+
+    def __init__(self, directory, max_bytes: int, max_entries: Optional[int] = None):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'stale': 0, 'writes': 0, 'evictions': 0}
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{RESULT_EXTENSION}"
+
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def get(self, key: str, fingerprints: Optional[Dict[str, str]] = None) -> Optional[pa.Table]:
+        """
+        Lê um resultado do cache.
+
+        Args:
+            key: Chave gerada por make_cache_key
+            fingerprints: Impressões digitais atuais das tabelas de origem;
+                          a entrada só vale se forem iguais às gravadas
+
+        Returns:
+            pa.Table ou None: Tabela apoiada no arquivo mapeado, ou None se
+                              ausente, expirada ou desatualizada
+        """
+        path = self._path(key)
+
+        try:
+            table = read_snapshot_table(path)
+        except (OSError, pa.ArrowInvalid):
+            self._count('misses')
+            return None
+
+        metadata = table.schema.metadata or {}
+        expires_at = metadata.get(_META_EXPIRES)
+        if expires_at and float(expires_at) < time.time():
+            self.invalidate(key)
+            self._count('misses')
+            return None
+
+        if fingerprints is not None:
+            stored = metadata.get(_META_SOURCES)
+            if stored is None or json.loads(stored) != fingerprints:
+                # Tabela de origem mudou desde a gravação
+                self.invalidate(key)
+                self._count('stale')
+                self._count('misses')
+                return None
+
+        # Atualiza o mtime: ordem de uso compartilhada entre processos
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self._count('hits')
+        return table
+
+    def put(self, key: str, table: pa.Table, ttl: Optional[float] = None,
+            query: Optional[str] = None,
+            fingerprints: Optional[Dict[str, str]] = None) -> Path:
+        """
+        Grava um resultado no cache e aplica o limite de tamanho.
+
+        Args:
+            key: Chave gerada por make_cache_key
+            table: Resultado a gravar
+            ttl: Validade em segundos (None = até ser despejado)
+            query: SQL de origem, gravado como metadado para diagnóstico
+            fingerprints: Impressões digitais das tabelas de origem
+
+        Returns:
+            Path: Caminho do arquivo gravado
+        """
+        metadata = dict(table.schema.metadata or {})
+        if ttl is not None:
+            metadata[_META_EXPIRES] = str(time.time() + ttl).encode()
+        if query:
+            metadata[_META_QUERY] = normalize_sql(query).encode('utf-8')
+        if fingerprints is not None:
+            metadata[_META_SOURCES] = json.dumps(fingerprints, sort_keys=True).encode('utf-8')
+
+        path = write_ipc_atomic(table.replace_schema_metadata(metadata), self._path(key))
+        self._count('writes')
+        self.evict()
+        return path
+
+    def _entries(self):
+        """Lista (mtime, tamanho, caminho) das entradas em disco."""
+        if not self.directory.exists():
+            return []
+
+        entries = []
+        for path in self.directory.glob(f"*{RESULT_EXTENSION}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        return entries
+
+    def evict(self) -> int:
+        """
+        Remove as entradas menos usadas até respeitar os limites.
+
+        Arquivos ainda mapeados por outros processos continuam válidos para
+        eles até serem fechados.
+
+        Returns:
+            int: Quantidade de entradas removidas
+        """
+        entries = sorted(self._entries(), key=lambda e: e[0])
+        total = sum(size for _, size, _ in entries)
+        count = len(entries)
+        removed = 0
+
+        for _, size, path in entries:
+            over_bytes = total > self.max_bytes
+            over_count = self.max_entries is not None and count > self.max_entries
+            if not (over_bytes or over_count):
+                break
+
+            try:
+                path.unlink()
+            except OSError:
+                continue
+
+            total -= size
+            count -= 1
+            removed += 1
+
+        if removed:
+            self._count('evictions', removed)
+
+        return removed
+
+    def invalidate(self, key: str):
+        """Remove uma entrada do cache."""
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+    def clear(self) -> int:
+        """
+        Remove todas as entradas do cache.
+
+        Returns:
+            int: Quantidade de entradas removidas
+        """
+        removed = 0
+        for _, _, path in self._entries():
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna estatísticas do cache.
+
+        Returns:
+            dict: Entradas e bytes em disco, limites e contadores do processo
+        """
+        entries = self._entries()
+        with self._lock:
+            counters = dict(self._counters)
+
+        lookups = counters['hits'] + counters['misses']
+        counters['hit_rate'] = counters['hits'] / lookups if lookups else 0.0
+
+        return dict(
+            counters,
+            entries=len(entries),
+            bytes=sum(size for _, size, _ in entries),
+            max_bytes=self.max_bytes,
+            directory=str(self.directory)
+        )
+
+
+_RESULT_CACHE: Optional[ResultCache] = None
+_RESULT_CACHE_LOCK = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """
+    Retorna o cache de resultados do processo (None se desabilitado).
+
+    Returns:
+        ResultCache ou None
+    """
+    global _RESULT_CACHE
+
+    if not RESULT_CACHE_CONFIG['enabled']:
+        return None
+
+    with _RESULT_CACHE_LOCK:
+        if _RESULT_CACHE is None:
+            _RESULT_CACHE = ResultCache(
+                RESULT_CACHE_CONFIG['dir'],
+                max_bytes=RESULT_CACHE_CONFIG['max_bytes'],
+                max_entries=RESULT_CACHE_CONFIG['max_entries']
+            )
+        return _RESULT_CACHE
+
+
+def set_result_cache(cache: Optional[ResultCache]):
+    """
+    Substitui o cache de resultados do processo (ex.: outro armazenamento).
+
+    Args:
+        cache: Nova instância, ou None para voltar à configuração padrão
+    """
+    global _RESULT_CACHE
+
+    with _RESULT_CACHE_LOCK:
+        _RESULT_CACHE = cache
+
+
+def cached_read_arrow(source, query: str, params: Optional[Dict[str, Any]] = None,
+                      schema: Optional[dict] = None, ttl: Optional[float] = None,
+                      batch_size: int = DEFAULT_BATCH_SIZE) -> pa.Table:
+    """
+    Executa uma query passando pelo cache de resultados.
+
+    Quando as tabelas lidas pela query têm impressão digital disponível, o
+    resultado vale até elas mudarem e o ttl é ignorado.
+
+    Args:
+        source: SQLAlchemy Engine/Connection ou conexão DB-API
+        query: Query SQL
+        params: Parâmetros da query
+        schema: Tipos declarados (coluna -> tipo Arrow)
+        ttl: Validade do resultado em segundos (sem impressão digital)
+        batch_size: Linhas por lote na leitura do banco
+
+    Returns:
+        pa.Table: Resultado (memory-map do cache, ou lido do banco)
+    """
+    cache = get_result_cache()
+    if cache is None:
+        return read_sql_arrow(source, query, params, schema, batch_size)
+
+    key = make_cache_key(query, params, schema)
+    fingerprints = get_query_fingerprints(source, query)
+
+    table = cache.get(key, fingerprints)
+    if table is not None:
+        return table
+
+    table = read_sql_arrow(source, query, params, schema, batch_size)
+
+    try:
+        cache.put(key, table, ttl=ttl if fingerprints is None else None,
+                  query=query, fingerprints=fingerprints)
+    except OSError:
+        # Disco cheio ou sem permissão: segue sem cache
+        pass
+
+    return table
+
+
+def cached_read_sql(source, query: str, params: Optional[Dict[str, Any]] = None,
+                    schema: Optional[dict] = None, ttl: Optional[float] = None) -> pd.DataFrame:
+    """
+    Versão DataFrame de cached_read_arrow (substitui read_sql_frame nos loaders).
+
+    Args:
+        source: SQLAlchemy Engine/Connection ou conexão DB-API
+        query: Query SQL
+        params: Parâmetros da query
+        schema: Tipos declarados (coluna -> tipo Arrow)
+        ttl: Validade do resultado em segundos
+
+    Returns:
+        pd.DataFrame: Resultado da query
+    """
+    table = cached_read_arrow(source, query, params, schema, ttl)
+    return table.to_pandas(split_blocks=True)
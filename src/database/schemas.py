@@ -0,0 +1,95 @@
+"""
+Tipos Declarados das Colunas das Tabelas DIMP
+"""
+
+import pyarrow as pa
+
+# Chaves terminadas em '*' valem para todas as colunas com o prefixo
+MAIN_SCHEMA = {
+    'cnpj': pa.string(),
+    'nm_razao_social': pa.string(),
+    'classificacao_risco': pa.string(),
+    'regime_tributario': pa.string(),
+    'municipio': pa.string(),
+    'uf': pa.string(),
+    'nm_cnae1': pa.string(),
+    'score_risco_final': pa.float64(),
+    'total_geral': pa.float64(),
+    'total_recebido_cpf': pa.float64(),
+    'total_recebido_cnpj': pa.float64(),
+    'perc_recebido_cpf': pa.float64(),
+    'perc_recebido_cnpj': pa.float64(),
+    'qtd_socios_recebendo': pa.float64(),
+    'score_proporcao': pa.float64(),
+    'score_volume_cpf': pa.float64(),
+    'score_qtd_socios': pa.float64(),
+    'score_desvio_regime': pa.float64(),
+    'score_consistencia': pa.float64(),
+}
+
+SOCIOS_SCHEMA = {
+    'cnpj': pa.string(),
+    'cpf_socio': pa.string(),
+    'nome_socio': pa.string(),
+    'perc_participacao': pa.float64(),
+}
+
+PAGAMENTOS_SCHEMA = {
+    'cnpj': pa.string(),
+    'cpf_socio': pa.string(),
+    'vl_*': pa.float64(),
+}
+
+SOCIOS_MULTIPLOS_SCHEMA = {
+    'cpf_socio': pa.string(),
+    'qtd_empresas': pa.int64(),
+    'total_recebido': pa.float64(),
+}
+
+OPERACOES_SCHEMA = {
+    'cnpj': pa.string(),
+    'score_risco_final': pa.float64(),
+    'vl_*': pa.float64(),
+}
+
+# Representação compacta em memória aplicada após a carga (compact.py):
+# 'category' = rótulos de baixa cardinalidade, 'string' = texto Arrow
+# contíguo, 'float32' = escores/percentuais (0-100), 'int' = menor inteiro
+# que comporte os valores (nullable se houver nulos). Valores monetários
+# permanecem float64 para não perder precisão nas somas.
+MAIN_COMPACT_DTYPES = {
+    'cnpj': 'string',
+    'nm_razao_social': 'string',
+    'classificacao_risco': 'category',
+    'regime_tributario': 'category',
+    'municipio': 'category',
+    'uf': 'category',
+    'nm_cnae1': 'category',
+    'score_*': 'float32',
+    'perc_*': 'float32',
+    'qtd_*': 'int',
+}
+
+
+def resolve_column_type(schema: dict, column: str):
+    """
+    Obtém o tipo declarado de uma coluna, considerando prefixos ('vl_*').
+
+    Args:
+        schema: Dicionário coluna -> tipo Arrow
+        column: Nome da coluna
+
+    Returns:
+        pa.DataType ou None: Tipo declarado
+    """
+    if not schema:
+        return None
+
+    if column in schema:
+        return schema[column]
+
+    for key, arrow_type in schema.items():
+        if key.endswith('*') and column.startswith(key[:-1]):
+            return arrow_type
+
+    return None
@@ -0,0 +1,329 @@
+"""
+Índice de Busca de Empresas (CNPJ e Razão Social)
+
+Construído uma vez por carga (snapshot_token) para que a busca do ranking
+não reprocesse as colunas a cada tecla:
+
+- CNPJ: dígitos em array ordenado; prefixos por busca binária e trechos
+  por varredura vetorizada (Arrow) dos dígitos
+- Razão social: texto normalizado (maiúsculas, sem acentos) com
+  - início do nome e de cada palavra em arrays ordenados (prefixos,
+    inclusive de termos com várias palavras)
+  - índice invertido de trigramas para trechos no meio das palavras
+    (termos com 3 ou mais caracteres)
+
+Os resultados são ordenados por relevância: prefixo do CNPJ, prefixo da
+razão social, prefixo de palavra e, por fim, trecho em qualquer posição
+(razão social e CNPJ). Cada empresa aparece uma única vez.
+"""
+
+import re
+import unicodedata
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .derived import snapshot_cached
+
+# Bytes usados como chave ordenável dos inícios de palavra (termos mais
+# longos são conferidos no texto completo)
+SEARCH_KEY_BYTES = 16
+
+# Trigramas (os mais raros) usados para obter candidatos a trecho
+SEARCH_MAX_TRIGRAMS = 3
+
+_SEPARATOR = 0
+_SPACE = ord(' ')
+_CNPJ_PUNCTUATION = re.compile(r'[\s./-]')
+
+
+def normalize_search_text(text: str) -> str:
+    """
+    Normaliza texto para busca: sem acentos, maiúsculas e espaços simples.
+
+    Args:
+        text: Texto original
+
+    Returns:
+        str: Texto normalizado (ASCII)
+    """
+    text = str(text)
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(text.upper().split())
+
+
+def _normalize_values(values) -> List[str]:
+    """Aplica normalize_search_text a uma coluna (nulos viram texto vazio)."""
+    return [normalize_search_text(value) if isinstance(value, str) else '' for value in values]
+
+
+def _prefix_range(keys: np.ndarray, prefix: bytes) -> tuple:
+    """Intervalo [início, fim) das chaves ordenadas que começam com prefix."""
+    width = keys.dtype.itemsize
+    prefix = prefix[:width]
+    start = np.searchsorted(keys, np.array(prefix, dtype=keys.dtype), side='left')
+    upper = prefix + b'\xff' * (width - len(prefix))
+    stop = np.searchsorted(keys, np.array(upper, dtype=keys.dtype), side='right')
+    return int(start), int(stop)
+
+
+def _first_unique(rows: np.ndarray, limit: Optional[int]) -> np.ndarray:
+    """
+    Primeiras ocorrências de rows, na ordem, até limit linhas distintas.
+
+    Com limite, só a janela necessária é examinada (dobrando enquanto as
+    repetições impedirem de completá-lo).
+    """
+    size = len(rows) if limit is None else min(len(rows), limit)
+    while True:
+        window = rows[:size]
+        _, first = np.unique(window, return_index=True)
+        unique = window[np.sort(first)]
+        if limit is None or len(unique) >= limit or size == len(rows):
+            return unique[:limit]
+        size = min(len(rows), 2 * size)
+
+
+class SearchIndex:
+    """Índice de busca por CNPJ e razão social de um DataFrame."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.n_rows = len(df)
+        self._build_cnpj(df)
+        self._build_names(df)
+
+    # ------------------------------------------------------------------
+    # Construção
+    # ------------------------------------------------------------------
+
+    def _build_cnpj(self, df: pd.DataFrame):
+        if 'cnpj' not in df.columns:
+            self.cnpj_keys = None
+            return
+
+        cnpj = pa.array(df['cnpj'].astype(object), type=pa.string(), from_pandas=True)
+        digits = pc.replace_substring_regex(pc.fill_null(cnpj, ''), r'\D', '')
+        self.cnpj_digits = digits
+        keys = digits.to_numpy(zero_copy_only=False).astype('S14')
+        self.cnpj_order = np.argsort(keys, kind='stable').astype(np.int32)
+        self.cnpj_keys = keys[self.cnpj_order]
+
+    def _build_names(self, df: pd.DataFrame):
+        if 'nm_razao_social' not in df.columns:
+            self.blob = None
+            return
+
+        names = _normalize_values(df['nm_razao_social'].tolist())
+        lengths = np.fromiter(map(len, names), dtype=np.int64, count=len(names))
+
+        # Textos concatenados com separador nulo; offsets por linha
+        self.blob = '\x00'.join(names).encode('ascii') + b'\x00'
+        self.starts = np.concatenate([[0], np.cumsum(lengths + 1)[:-1]])
+        self.lengths = lengths
+
+        buf = np.frombuffer(self.blob, dtype=np.uint8)
+        row_of = np.repeat(np.arange(len(names), dtype=np.int32), lengths + 1)
+
+        self._build_word_starts(buf, row_of)
+        self._build_trigrams(buf, row_of)
+
+    def _build_word_starts(self, buf: np.ndarray, row_of: np.ndarray):
+        """Array ordenado dos primeiros bytes a partir de cada início de palavra."""
+        previous = np.concatenate([[_SEPARATOR], buf[:-1]])
+        is_start = (buf != _SEPARATOR) & (buf != _SPACE) & ((previous == _SEPARATOR) | (previous == _SPACE))
+        positions = np.flatnonzero(is_start)
+
+        # Chave de largura fixa: bytes até o fim do nome (zeros depois)
+        padded = np.concatenate([buf, np.zeros(SEARCH_KEY_BYTES, dtype=np.uint8)])
+        window = np.zeros((len(positions), SEARCH_KEY_BYTES), dtype=np.uint8)
+        inside = np.ones(len(positions), dtype=bool)
+        for k in range(SEARCH_KEY_BYTES):
+            column = padded[positions + k]
+            inside &= column != _SEPARATOR
+            window[:, k] = np.where(inside, column, 0)
+
+        keys = window.view(f'S{SEARCH_KEY_BYTES}').ravel()
+        rows = row_of[positions]
+
+        # Início do nome e demais palavras em arrays separados (relevâncias distintas)
+        at_name_start = positions == self.starts[rows]
+        self.prefix_keys = {}
+        for group, selected in (('name', at_name_start), ('word', ~at_name_start)):
+            order = np.flatnonzero(selected)
+            order = order[np.argsort(keys[order], kind='stable')]
+            self.prefix_keys[group] = (keys[order], rows[order], positions[order])
+
+    def _build_trigrams(self, buf: np.ndarray, row_of: np.ndarray):
+        """Índice invertido trigrama -> linhas (formato CSR)."""
+        if len(buf) < 3:
+            self.trigram_ids = np.array([], dtype=np.int64)
+            self.trigram_ptr = np.zeros(1, dtype=np.int64)
+            self.trigram_rows = np.array([], dtype=np.int32)
+            return
+
+        first, second, third = buf[:-2], buf[1:-1], buf[2:]
+        valid = (first != _SEPARATOR) & (second != _SEPARATOR) & (third != _SEPARATOR)
+
+        ids = (first[valid].astype(np.int32) << 16) | (second[valid].astype(np.int32) << 8) | third[valid]
+        rows = row_of[:-2][valid]
+
+        # Ordenação estável por trigrama: as linhas já vêm crescentes, então
+        # pares repetidos (trigrama que aparece duas vezes no nome) ficam lado a lado
+        order = np.argsort(ids, kind='stable')
+        ids, rows = ids[order], rows[order]
+        distinct = np.ones(len(ids), dtype=bool)
+        distinct[1:] = (ids[1:] != ids[:-1]) | (rows[1:] != rows[:-1])
+        ids, rows = ids[distinct], rows[distinct]
+
+        starts = np.flatnonzero(np.concatenate([[True], ids[1:] != ids[:-1]]))
+        self.trigram_ids = ids[starts]
+        self.trigram_ptr = np.append(starts, len(rows))
+        self.trigram_rows = rows
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def _trigram_postings(self, trigram: bytes) -> np.ndarray:
+        key = (trigram[0] << 16) | (trigram[1] << 8) | trigram[2]
+        position = np.searchsorted(self.trigram_ids, key)
+        if position == len(self.trigram_ids) or self.trigram_ids[position] != key:
+            return self.trigram_rows[:0]
+        return self.trigram_rows[self.trigram_ptr[position]:self.trigram_ptr[position + 1]]
+
+    def _contains(self, row: int, term: bytes) -> bool:
+        start = self.starts[row]
+        return self.blob.find(term, start, start + self.lengths[row]) != -1
+
+    def _search_cnpj(self, digits: str) -> np.ndarray:
+        start, stop = _prefix_range(self.cnpj_keys, digits.encode('ascii'))
+        return self.cnpj_order[start:stop]
+
+    def _search_cnpj_substring(self, digits: str, exclude: np.ndarray,
+                               limit: Optional[int]) -> np.ndarray:
+        """Linhas cujo CNPJ contém os dígitos em qualquer posição."""
+        mask = pc.match_substring(self.cnpj_digits, digits)
+        rows = np.flatnonzero(mask.to_numpy(zero_copy_only=False)).astype(np.int32)
+        if len(exclude) and len(rows):
+            rows = rows[~np.isin(rows, exclude)]
+        return rows[:limit]
+
+    def _search_prefix(self, group: str, term: bytes, limit: Optional[int]) -> np.ndarray:
+        """Linhas cujo nome (group='name') ou alguma palavra seguinte (group='word') começa com o termo."""
+        keys, rows, positions = self.prefix_keys[group]
+        start, stop = _prefix_range(keys, term)
+
+        if len(term) <= SEARCH_KEY_BYTES:
+            # Um nome pode ter várias palavras com o prefixo: distintas até o limite
+            return _first_unique(rows[start:stop], limit)
+
+        ok = np.fromiter(
+            (self.blob.startswith(term, pos) for pos in positions[start:stop].tolist()),
+            dtype=bool, count=stop - start
+        )
+        return _first_unique(rows[start:stop][ok], limit)
+
+    def _search_substring(self, term: bytes, exclude: np.ndarray,
+                          limit: Optional[int]) -> np.ndarray:
+        """Linhas que contêm o termo em qualquer posição (trigramas + conferência)."""
+        if len(term) < 3:
+            return np.array([], dtype=np.int32)
+
+        # Interseção a partir das listas mais raras; a conferência final no
+        # texto dispensa usar todos os trigramas
+        postings = sorted(
+            (self._trigram_postings(term[i:i + 3]) for i in range(len(term) - 2)),
+            key=len
+        )[:SEARCH_MAX_TRIGRAMS]
+
+        base, others = postings[0], postings[1:]
+        block = len(base) if limit is None else max(4 * limit, 1024)
+        found: List[np.ndarray] = []
+        total = 0
+
+        # Com limite, os candidatos são conferidos em blocos até completá-lo
+        for begin in range(0, len(base), max(block, 1)):
+            candidates = base[begin:begin + block]
+            for other in others:
+                if len(candidates) == 0:
+                    break
+                position = np.minimum(np.searchsorted(other, candidates), len(other) - 1)
+                candidates = candidates[other[position] == candidates]
+
+            if len(exclude) and len(candidates):
+                candidates = candidates[~np.isin(candidates, exclude)]
+
+            if len(term) > 3:
+                candidates = np.array(
+                    [row for row in candidates.tolist() if self._contains(row, term)],
+                    dtype=np.int32
+                )
+
+            found.append(candidates)
+            total += len(candidates)
+            if limit is not None and total >= limit:
+                break
+
+        result = np.concatenate(found) if found else np.array([], dtype=np.int32)
+        return result[:limit]
+
+    def search(self, term: str, limit: Optional[int] = None) -> np.ndarray:
+        """
+        Busca empresas por CNPJ ou razão social (prefixo ou trecho).
+
+        Args:
+            term: Termo digitado (acentos e maiúsculas são ignorados)
+            limit: Quantidade máxima de resultados (None = todos)
+
+        Returns:
+            np.ndarray: Posições (iloc) distintas das empresas, por relevância
+        """
+        groups: List[np.ndarray] = []
+
+        digits = _CNPJ_PUNCTUATION.sub('', term or '')
+        by_cnpj = digits.isdigit() and self.cnpj_keys is not None
+        if by_cnpj:
+            groups.append(self._search_cnpj(digits))
+
+        normalized = normalize_search_text(term or '')
+        by_name = bool(normalized) and self.blob is not None
+        if by_name:
+            encoded = normalized.encode('ascii')
+            groups.append(self._search_prefix('name', encoded, limit))
+            groups.append(self._search_prefix('word', encoded, limit))
+
+        # Remove repetidos mantendo a primeira ocorrência (maior relevância);
+        # um nome pode estar nos dois grupos de prefixo
+        ranked = _first_unique(np.concatenate(groups), limit) if groups else np.array([], dtype=np.int32)
+
+        # Trechos só quando os prefixos distintos não completam o limite
+        if by_name and (limit is None or len(ranked) < limit):
+            remaining = None if limit is None else limit - len(ranked)
+            ranked = np.concatenate([ranked, self._search_substring(encoded, ranked, remaining)])
+
+        if by_cnpj and (limit is None or len(ranked) < limit):
+            remaining = None if limit is None else limit - len(ranked)
+            ranked = np.concatenate([ranked, self._search_cnpj_substring(digits, ranked, remaining)])
+
+        return ranked.astype(np.int32, copy=False)
+
+
+def get_search_index(df: pd.DataFrame) -> SearchIndex:
+    """
+    Obtém o índice de busca do DataFrame, construindo-o uma vez por carga.
+
+    É reaproveitado enquanto df.attrs['snapshot_token'] e a ordem das linhas
+    não mudarem (ver database.derived). Sem token, o índice não é guardado.
+
+    Args:
+        df: DataFrame principal (sem filtros)
+
+    Returns:
+        SearchIndex: Índice de busca
+    """
+    return snapshot_cached(df, 'search_index', SearchIndex,
+                           columns=['cnpj', 'nm_razao_social'])
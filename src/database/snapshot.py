@@ -0,0 +1,242 @@
+"""
+Snapshots Locais de Resultados (Arrow IPC)
+
+Resultados de queries são gravados em disco no formato Arrow IPC, com tipos
+preservados, e relidos via memory-map por qualquer processo do servidor.
+"""
+
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Tuple
+
+import pandas as pd
+import pyarrow as pa
+
+from ..config.settings import SNAPSHOT_CONFIG
+from .derived import mark_snapshot
+
+SNAPSHOT_EXTENSION = '.arrow'
+_META_FINGERPRINT = b'dimp.fingerprint'
+
+
+def _table_slug(table: str) -> str:
+    """Converte nome de tabela em prefixo seguro para nome de arquivo."""
+    return re.sub(r'[^A-Za-z0-9_]+', '_', table).strip('_').lower()
+
+
+def get_freshness_token() -> str:
+    """
+    Gera token de atualização baseado no instante atual.
+
+    Returns:
+        str: Token ordenável (YYYYMMDDTHHMMSS)
+    """
+    return time.strftime('%Y%m%dT%H%M%S')
+
+
+def get_snapshot_path(table: str, token: str) -> Path:
+    """
+    Obtém caminho do arquivo de snapshot de uma tabela.
+
+    Args:
+        table: Nome completo da tabela
+        token: Token de atualização
+
+    Returns:
+        Path: Caminho do arquivo
+    """
+    return Path(SNAPSHOT_CONFIG['dir']) / f"{_table_slug(table)}__{token}{SNAPSHOT_EXTENSION}"
+
+
+def list_snapshots(table: str) -> List[Dict[str, Any]]:
+    """
+    Lista snapshots existentes de uma tabela, do mais recente ao mais antigo.
+
+    Args:
+        table: Nome completo da tabela
+
+    Returns:
+        list: Lista de dicionários com token, caminho, idade e tamanho
+    """
+    base_dir = Path(SNAPSHOT_CONFIG['dir'])
+    if not base_dir.exists():
+        return []
+
+    prefix = f"{_table_slug(table)}__"
+    now = time.time()
+    snapshots = []
+
+    for path in base_dir.glob(f"{prefix}*{SNAPSHOT_EXTENSION}"):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+
+        snapshots.append({
+            'token': path.name[len(prefix):-len(SNAPSHOT_EXTENSION)],
+            'path': path,
+            'age': now - stat.st_mtime,
+            'size_bytes': stat.st_size
+        })
+
+    return sorted(snapshots, key=lambda s: s['token'], reverse=True)
+
+
+def write_ipc_atomic(arrow_table: pa.Table, path: Path) -> Path:
+    """
+    Grava tabela Arrow em arquivo IPC de forma atômica.
+
+    A escrita é feita em arquivo temporário e publicada com os.replace, de modo
+    que outros processos nunca leiam um arquivo incompleto. O temporário é
+    exclusivo do processo e da thread, para que sessões do mesmo servidor
+    gravando a mesma chave não sobrescrevam nem apaguem o arquivo uma da outra.
+
+    Args:
+        arrow_table: Tabela a gravar
+        path: Caminho final do arquivo
+
+    Returns:
+        Path: Caminho gravado
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    try:
+        with pa.OSFile(str(tmp_path), 'wb') as sink:
+            with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+                writer.write_table(arrow_table)
+
+        os.replace(tmp_path, path)
+    except Exception:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+    return path
+
+
+def save_snapshot(df: pd.DataFrame, table: str, token: Optional[str] = None,
+                  fingerprint: Optional[str] = None) -> Optional[Path]:
+    """
+    Grava DataFrame como snapshot Arrow IPC.
+
+    Args:
+        df: DataFrame a gravar
+        table: Nome completo da tabela de origem
+        token: Token de atualização (padrão: instante atual)
+        fingerprint: Impressão digital da tabela de origem no momento da carga
+
+    Returns:
+        Path ou None: Caminho do snapshot gravado
+    """
+    if not SNAPSHOT_CONFIG['enabled'] or df is None or df.empty:
+        return None
+
+    token = token or get_freshness_token()
+    path = get_snapshot_path(table, token)
+    arrow_table = pa.Table.from_pandas(df, preserve_index=False)
+
+    if fingerprint is not None:
+        metadata = dict(arrow_table.schema.metadata or {})
+        metadata[_META_FINGERPRINT] = fingerprint.encode('utf-8')
+        arrow_table = arrow_table.replace_schema_metadata(metadata)
+
+    write_ipc_atomic(arrow_table, path)
+
+    # Remove snapshots antigos da mesma tabela
+    for old in list_snapshots(table)[SNAPSHOT_CONFIG['keep']:]:
+        try:
+            old['path'].unlink()
+        except OSError:
+            pass
+
+    return path
+
+
+def read_snapshot_table(path: Path) -> pa.Table:
+    """
+    Lê snapshot via memory-map, sem copiar os buffers para a memória do processo.
+
+    Args:
+        path: Caminho do arquivo de snapshot
+
+    Returns:
+        pa.Table: Tabela Arrow apoiada no arquivo mapeado
+    """
+    with pa.memory_map(str(path), 'r') as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def load_snapshot_table(table: str, token: Optional[str] = None,
+                        max_age: Optional[float] = None,
+                        fingerprint: Optional[str] = None) -> Optional[Tuple[pa.Table, str]]:
+    """
+    Localiza e mapeia o snapshot válido de uma tabela, sem convertê-lo.
+
+    Args:
+        table: Nome completo da tabela
+        token: Token exato a carregar (opcional)
+        max_age: Idade máxima em segundos (padrão: SNAPSHOT_CONFIG['max_age'])
+        fingerprint: Impressão digital atual da tabela; snapshots gravados
+                     com outra impressão são ignorados
+
+    Returns:
+        tuple ou None: (tabela Arrow mapeada, token do snapshot)
+    """
+    if not SNAPSHOT_CONFIG['enabled']:
+        return None
+
+    if token is not None:
+        path = get_snapshot_path(table, token)
+        if not path.exists():
+            return None
+    else:
+        max_age = SNAPSHOT_CONFIG['max_age'] if max_age is None else max_age
+        candidates = [s for s in list_snapshots(table) if s['age'] <= max_age]
+        if not candidates:
+            return None
+        path = candidates[0]['path']
+        token = candidates[0]['token']
+
+    try:
+        arrow_table = read_snapshot_table(path)
+    except (OSError, pa.ArrowInvalid):
+        # Arquivo removido ou corrompido: força nova carga do banco
+        return None
+
+    if fingerprint is not None:
+        stored = (arrow_table.schema.metadata or {}).get(_META_FINGERPRINT)
+        if stored is None or stored.decode('utf-8') != fingerprint:
+            # Tabela reescrita depois do snapshot
+            return None
+
+    return arrow_table, token
+
+
+def load_snapshot(table: str, token: Optional[str] = None,
+                  max_age: Optional[float] = None,
+                  fingerprint: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """
+    Carrega o snapshot de uma tabela, se houver um válido.
+
+    Args:
+        table: Nome completo da tabela
+        token: Token exato a carregar (opcional)
+        max_age: Idade máxima em segundos (padrão: SNAPSHOT_CONFIG['max_age'])
+        fingerprint: Impressão digital atual da tabela; snapshots gravados
+                     com outra impressão são ignorados
+
+    Returns:
+        pd.DataFrame ou None: Dados do snapshot
+    """
+    found = load_snapshot_table(table, token, max_age, fingerprint)
+    if found is None:
+        return None
+
+    arrow_table, token = found
+    df = arrow_table.to_pandas()
+
+    return mark_snapshot(df, token)
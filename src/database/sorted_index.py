@@ -0,0 +1,220 @@
+"""
+Índices Ordenados de Colunas Numéricas
+
+Guarda, para as colunas usadas em filtros de faixa, a permutação que ordena
+a coluna (argsort) e os valores já ordenados. Um filtro >= / <= vira um par
+de buscas binárias (searchsorted) e uma fatia da permutação, sem varrer a
+tabela; o top-N de uma coluna indexada lê as últimas posições da permutação.
+Os índices são construídos uma vez por carga (snapshot_token).
+"""
+
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .derived import snapshot_cached
+
+# Colunas indexadas por padrão
+SORTED_INDEX_COLUMNS = ['score_risco_final', 'total_geral', 'perc_recebido_cpf']
+
+# Fração máxima de linhas na faixa para filtrar pelo índice (acima disso a
+# máscara sobre a coluna inteira é mais barata que ordenar as posições)
+SORTED_INDEX_MAX_FRACTION = 0.2
+
+
+class SortedColumnIndex:
+    """
+    Permutação que ordena uma coluna numérica (nulos no início).
+
+    Empates ficam em ordem decrescente de posição, de modo que a permutação
+    invertida reproduz nlargest(keep='first').
+    """
+
+    def __init__(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        nulls = np.isnan(values)
+        keys = np.where(nulls, -np.inf, values)
+
+        order = len(keys) - 1 - np.argsort(keys[::-1], kind='stable')
+        self.order = order.astype(np.int32) if len(order) < 2**31 else order
+        self.keys = keys[order]
+        self.null_count = int(np.count_nonzero(nulls))
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def bounds(self, low: Optional[float] = None,
+               high: Optional[float] = None) -> Tuple[int, int]:
+        """
+        Posições [início, fim) da faixa na ordem do índice.
+
+        Nulos só entram quando não há limite (mesma regra da máscara).
+
+        Args:
+            low: Valor mínimo (inclusive)
+            high: Valor máximo (inclusive)
+
+        Returns:
+            tuple: (início, fim)
+        """
+        if low is not None:
+            start = int(np.searchsorted(self.keys, low, side='left'))
+            start = max(start, self.null_count)
+        else:
+            start = self.null_count if high is not None else 0
+
+        stop = int(np.searchsorted(self.keys, high, side='right')) if high is not None else len(self)
+
+        return start, max(start, stop)
+
+    def rows(self, low: Optional[float] = None, high: Optional[float] = None) -> np.ndarray:
+        """
+        Posições das linhas dentro da faixa (ordem crescente do valor).
+
+        Args:
+            low: Valor mínimo (inclusive)
+            high: Valor máximo (inclusive)
+
+        Returns:
+            np.ndarray: Posições (iloc) das linhas
+        """
+        start, stop = self.bounds(low, high)
+        return self.order[start:stop]
+
+    def top(self, n: int, ascending: bool = False,
+            accept: Optional[Callable[[np.ndarray], np.ndarray]] = None) -> np.ndarray:
+        """
+        Posições das n linhas com maiores (ou menores) valores, sem nulos.
+
+        Args:
+            n: Quantidade de linhas
+            ascending: True para os menores valores
+            accept: Função que recebe posições candidatas e devolve a máscara
+                    das aceitas (ex.: demais filtros); os candidatos são
+                    lidos em blocos até completar n
+
+        Returns:
+            np.ndarray: Posições (iloc) em ordem de classificação
+        """
+        valid = self.order[self.null_count:]
+        if not ascending:
+            valid = valid[::-1]
+
+        if accept is None:
+            return valid[:n]
+
+        found = []
+        total = 0
+        block = max(4 * n, 1024)
+
+        for start in range(0, len(valid), block):
+            candidates = valid[start:start + block]
+            candidates = candidates[accept(candidates)]
+            found.append(candidates[:n - total])
+            total += len(found[-1])
+            if total >= n:
+                break
+
+        return np.concatenate(found) if found else valid[:0]
+
+
+def build_sorted_indexes(df: pd.DataFrame,
+                         columns: Sequence[str] = SORTED_INDEX_COLUMNS) -> Dict[str, SortedColumnIndex]:
+    """
+    Constrói os índices ordenados das colunas existentes no DataFrame.
+
+    Args:
+        df: DataFrame principal
+        columns: Colunas a indexar
+
+    Returns:
+        dict: coluna -> SortedColumnIndex
+    """
+    return {
+        column: SortedColumnIndex(df[column].to_numpy(dtype=np.float64, na_value=np.nan))
+        for column in columns if column in df.columns
+    }
+
+
+def get_sorted_indexes(df: pd.DataFrame) -> Dict[str, SortedColumnIndex]:
+    """
+    Obtém os índices ordenados do DataFrame, construindo-os uma vez por carga.
+
+    São reaproveitados enquanto df.attrs['snapshot_token'] e a ordem das
+    linhas não mudarem (ver database.derived). Sem token, os índices não são
+    guardados.
+
+    Args:
+        df: DataFrame principal (sem filtros)
+
+    Returns:
+        dict: coluna -> SortedColumnIndex
+    """
+    return snapshot_cached(df, 'sorted_indexes', build_sorted_indexes,
+                           columns=SORTED_INDEX_COLUMNS)
+
+
+def index_filter_rows(indexes: Dict[str, SortedColumnIndex], ranges: Dict[str, tuple],
+                      n_rows: int) -> Optional[Tuple[str, np.ndarray]]:
+    """
+    Escolhe o filtro de faixa mais seletivo atendível por índice.
+
+    Args:
+        indexes: coluna -> SortedColumnIndex
+        ranges: coluna -> (mínimo, máximo) dos filtros de faixa
+        n_rows: Total de linhas da tabela
+
+    Returns:
+        tuple ou None: (coluna, posições em ordem crescente), ou None se
+                       nenhuma faixa indexada for seletiva o bastante
+    """
+    best = None
+
+    for column, (low, high) in ranges.items():
+        if column not in indexes:
+            continue
+        start, stop = indexes[column].bounds(low, high)
+        if best is None or stop - start < best[1][1] - best[1][0]:
+            best = (column, (start, stop))
+
+    if best is None:
+        return None
+
+    column, (start, stop) = best
+    if stop - start > n_rows * SORTED_INDEX_MAX_FRACTION:
+        return None
+
+    return column, np.sort(indexes[column].order[start:stop])
+
+
+def top_rows(df: pd.DataFrame, column: str, n: int, ascending: bool = False,
+             spec=None, indexes: Optional[Dict[str, SortedColumnIndex]] = None) -> pd.DataFrame:
+    """
+    Top N linhas por uma coluna, usando o índice ordenado quando disponível.
+
+    Com índice, só as posições candidatas são lidas (e só elas passam pelos
+    filtros de spec); sem índice, equivale a nlargest/nsmallest sobre as
+    linhas filtradas.
+
+    Args:
+        df: DataFrame (o mesmo usado para construir indexes)
+        column: Coluna de ordenação
+        n: Quantidade de linhas
+        ascending: True para os menores valores
+        spec: FilterSpec a aplicar antes do top N (opcional)
+        indexes: Índices de df (ver get_sorted_indexes)
+
+    Returns:
+        pd.DataFrame: Top N linhas
+    """
+    if indexes and column in indexes:
+        accept = None
+        if spec is not None and not spec.is_empty():
+            accept = lambda rows: spec.to_mask(df.iloc[rows])
+        return df.iloc[indexes[column].top(n, ascending, accept)]
+
+    if spec is not None:
+        df = spec.apply(df)
+
+    return df.nsmallest(n, column) if ascending else df.nlargest(n, column)
@@ -0,0 +1,237 @@
+"""
+Leitura em Streaming das Tabelas de Pagamentos
+
+As tabelas dimp_pagamentos_cpf/cnpj são lidas em blocos tipados, e as
+agregações (totais mensais, somas por sócio, KPIs) são acumuladas bloco a
+bloco, de modo que a memória fica limitada ao tamanho do bloco mais os
+agregados, e não à tabela inteira.
+"""
+
+import time
+import tracemalloc
+from typing import Dict, Any, Iterator, Optional, Iterable
+
+import streamlit as st
+import pandas as pd
+import pyarrow as pa
+
+from ..analytics.sketches import sketch_stream
+from ..config.settings import TABLES, CACHE_CONFIG
+from .fetch import iter_sql_batches
+from .schemas import PAGAMENTOS_SCHEMA
+
+STREAM_CHUNK_SIZE = 100000
+
+
+def iter_pagamentos(_engine, table_key: str = 'pagamentos_cpf', cnpj: Optional[str] = None,
+                    chunksize: int = STREAM_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Lê uma tabela de pagamentos em blocos tipados.
+
+    Args:
+        _engine: SQLAlchemy engine
+        table_key: 'pagamentos_cpf' ou 'pagamentos_cnpj'
+        cnpj: CNPJ específico (opcional)
+        chunksize: Linhas por bloco
+
+    Yields:
+        pd.DataFrame: Bloco com colunas vl_* em float64
+    """
+    query = f"SELECT * FROM {TABLES[table_key]}"
+    params = {}
+
+    if cnpj:
+        query += " WHERE cnpj = :cnpj"
+        params['cnpj'] = cnpj
+
+    for batch in iter_sql_batches(_engine, query, params, schema=PAGAMENTOS_SCHEMA,
+                                  batch_size=chunksize):
+        yield batch.to_pandas()
+
+
+class PagamentosAggregator:
+    """
+    Acumula agregados de pagamentos bloco a bloco.
+
+    Os agregados parciais são combinados a cada bloco, então a memória
+    ocupada é proporcional ao número de meses/sócios, não ao de linhas.
+    """
+
+    def __init__(self, value_column: str = 'vl_total', period_column: str = 'referencia'):
+        self.value_column = value_column
+        self.period_column = period_column
+        self.rows = 0
+        self.chunks = 0
+        self.totais_vl = pd.Series(dtype='float64')
+        self.mensal = pd.DataFrame(columns=['volume', 'qtd_pagamentos'], dtype='float64')
+        self.por_socio = pd.DataFrame(columns=['volume', 'qtd_pagamentos'], dtype='float64')
+        self.cnpjs = set()
+
+    @staticmethod
+    def _combine(acc: pd.DataFrame, part: pd.DataFrame) -> pd.DataFrame:
+        """Soma agregados parciais alinhando pelo índice."""
+        if acc.empty:
+            return part
+        return acc.add(part, fill_value=0)
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """
+        Incorpora um bloco aos agregados.
+
+        Args:
+            chunk: Bloco de pagamentos
+        """
+        if chunk.empty:
+            return
+
+        self.rows += len(chunk)
+        self.chunks += 1
+
+        valor_cols = [col for col in chunk.columns if col.startswith('vl_')]
+        if valor_cols:
+            self.totais_vl = self.totais_vl.add(chunk[valor_cols].sum(), fill_value=0)
+
+        if self.value_column not in chunk.columns:
+            return
+
+        if self.period_column in chunk.columns:
+            part = chunk.groupby(self.period_column)[self.value_column].agg(['sum', 'count'])
+            part.columns = ['volume', 'qtd_pagamentos']
+            self.mensal = self._combine(self.mensal, part)
+
+        if 'cpf_socio' in chunk.columns and 'cnpj' in chunk.columns:
+            part = chunk.groupby(['cnpj', 'cpf_socio'])[self.value_column].agg(['sum', 'count'])
+            part.columns = ['volume', 'qtd_pagamentos']
+            self.por_socio = self._combine(self.por_socio, part)
+
+        if 'cnpj' in chunk.columns:
+            self.cnpjs.update(chunk['cnpj'].dropna().unique().tolist())
+
+    def result(self) -> Dict[str, Any]:
+        """
+        Retorna os agregados finais.
+
+        Returns:
+            dict: 'mensal', 'por_socio' (DataFrames) e 'kpis'
+        """
+        mensal = self.mensal.sort_index().reset_index()
+        if not mensal.empty:
+            mensal.columns = [self.period_column, 'volume', 'qtd_pagamentos']
+
+        por_socio = self.por_socio.sort_values('volume', ascending=False).reset_index()
+
+        kpis = {
+            'total_pagamentos': self.rows,
+            'volume_total': float(self.totais_vl.get(self.value_column, 0.0)),
+            'volume_por_tipo': self.totais_vl.to_dict(),
+            'qtd_empresas': len(self.cnpjs),
+            'qtd_socios': int(por_socio['cpf_socio'].nunique()) if 'cpf_socio' in por_socio.columns else 0,
+            'qtd_meses': len(mensal),
+        }
+
+        return {'mensal': mensal, 'por_socio': por_socio, 'kpis': kpis}
+
+
+def aggregate_pagamentos_stream(chunks: Iterable[pd.DataFrame],
+                                track_memory: bool = False) -> Dict[str, Any]:
+    """
+    Consome blocos de pagamentos e calcula os agregados incrementalmente.
+
+    Args:
+        chunks: Iterável de blocos (ex.: iter_pagamentos)
+        track_memory: Mede o pico de memória Python da passada completa
+                      (tracemalloc deixa a passada bem mais lenta; usar só
+                      em diagnóstico)
+
+    Returns:
+        dict: Agregados de PagamentosAggregator.result() e 'memoria' com
+              pico Python/NumPy (tracemalloc, só com track_memory), pico
+              Arrow e maior bloco
+    """
+    aggregator = PagamentosAggregator()
+    memoria = {
+        'peak_python_bytes': None,
+        'peak_arrow_bytes': 0,
+        'max_chunk_bytes': 0,
+        'seconds': 0.0
+    }
+
+    started_tracing = track_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if track_memory:
+        tracemalloc.reset_peak()
+
+    start = time.perf_counter()
+    arrow_base = pa.total_allocated_bytes()
+
+    try:
+        for chunk in chunks:
+            aggregator.update(chunk)
+            memoria['max_chunk_bytes'] = max(
+                memoria['max_chunk_bytes'], int(chunk.memory_usage(deep=True).sum())
+            )
+            memoria['peak_arrow_bytes'] = max(
+                memoria['peak_arrow_bytes'], pa.total_allocated_bytes() - arrow_base
+            )
+            del chunk
+
+        if track_memory:
+            memoria['peak_python_bytes'] = tracemalloc.get_traced_memory()[1]
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+
+    memoria['seconds'] = time.perf_counter() - start
+
+    result = aggregator.result()
+    result['memoria'] = dict(memoria, rows=aggregator.rows, chunks=aggregator.chunks)
+    return result
+
+
+@st.cache_data(ttl=CACHE_CONFIG['ttl_medium'], show_spinner="⏳ Agregando pagamentos...")
+def load_pagamentos_resumo(_engine, table_key: str = 'pagamentos_cpf',
+                           cnpj: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Calcula agregados de uma tabela de pagamentos em uma passada em streaming.
+
+    Args:
+        _engine: SQLAlchemy engine
+        table_key: 'pagamentos_cpf' ou 'pagamentos_cnpj'
+        cnpj: CNPJ específico (opcional)
+
+    Returns:
+        dict: 'mensal', 'por_socio', 'kpis' e 'memoria'
+    """
+    try:
+        return aggregate_pagamentos_stream(iter_pagamentos(_engine, table_key, cnpj))
+    except Exception as e:
+        st.warning(f"⚠️ Erro ao agregar pagamentos: {str(e)[:100]}")
+        return {}
+
+
+@st.cache_data(ttl=CACHE_CONFIG['ttl_medium'], show_spinner="⏳ Resumindo distribuição dos pagamentos...")
+def load_pagamentos_quantis(_engine, table_key: str = 'pagamentos_cpf',
+                            value_column: str = 'vl_total',
+                            group_column: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Resume a distribuição de uma coluna de pagamentos em uma passada em streaming.
+
+    O resultado (GroupedQuantileSketches.to_dict) é pequeno e serializável,
+    então fica no cache; percentis, limites de IQR e limiares de outliers
+    são obtidos de GroupedQuantileSketches.from_dict(...) sem reler a tabela.
+
+    Args:
+        _engine: SQLAlchemy engine
+        table_key: 'pagamentos_cpf' ou 'pagamentos_cnpj'
+        value_column: Coluna de valores
+        group_column: Coluna de agrupamento (ex.: 'referencia' para mês), opcional
+
+    Returns:
+        dict: Resumos serializados, ou {} em caso de erro
+    """
+    try:
+        return sketch_stream(iter_pagamentos(_engine, table_key), value_column, group_column).to_dict()
+    except Exception as e:
+        st.warning(f"⚠️ Erro ao resumir pagamentos: {str(e)[:100]}")
+        return {}
@@ -7,6 +7,7 @@ import pandas as pd
 import numpy as np
 from typing import Optional
 from ..config.settings import COLOR_SCHEME
+from ..database.sorted_index import top_rows
 
 
 def create_risk_distribution_pie(df: pd.DataFrame) -> go.Figure:
@@ -15,6 +16,7 @@ def create_risk_distribution_pie(df: pd.DataFrame) -> go.Figure:
         return go.Figure()
 
     dist = df['classificacao_risco'].value_counts()
+    dist = dist[dist > 0]  # Categorias sem empresas após o filtro
 
     fig = go.Figure(data=[go.Pie(
         labels=dist.index,
@@ -34,12 +36,13 @@ def create_risk_distribution_pie(df: pd.DataFrame) -> go.Figure:
     return fig
 
 
-def create_top_empresas_bar(df: pd.DataFrame, n: int = 10) -> go.Figure:
-    """Gráfico de barras - top empresas"""
+def create_top_empresas_bar(df: pd.DataFrame, n: int = 10, spec=None,
+                            indexes: Optional[dict] = None) -> go.Figure:
+    """Gráfico de barras - top empresas (índice ordenado de df, se informado)"""
     if df.empty:
         return go.Figure()
 
-    top = df.nlargest(n, 'score_risco_final')
+    top = top_rows(df, 'score_risco_final', n, spec=spec, indexes=indexes)
 
     fig = go.Figure(data=[
         go.Bar(
@@ -93,7 +96,7 @@ def create_geographic_map(df: pd.DataFrame) -> go.Figure:
     if df.empty or 'uf' not in df.columns:
         return go.Figure()
 
-    uf_data = df.groupby('uf').agg({
+    uf_data = df.groupby('uf', observed=True).agg({
         'cnpj': 'count',
         'total_geral': 'sum',
         'score_risco_final': 'mean'
@@ -177,7 +180,7 @@ def create_sunburst(df: pd.DataFrame) -> go.Figure:
         return go.Figure()
 
     # Criar hierarquia: UF -> Município -> Classificação
-    hierarchy = df.groupby(['uf', 'municipio', 'classificacao_risco']).agg({
+    hierarchy = df.groupby(['uf', 'municipio', 'classificacao_risco'], observed=True).agg({
         'total_geral': 'sum'
     }).reset_index()
 
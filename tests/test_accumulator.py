@@ -0,0 +1,118 @@
+"""
+Testes do acumulador incremental de KPIs contra o cálculo direto sobre as linhas filtradas.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analytics import accumulator
+from src.analytics.accumulator import KPIAccumulator, KPIRowData, get_kpi_accumulator
+from src.analytics.kpis import calculate_kpis
+from src.database.derived import mark_snapshot
+from src.database.filters import FilterSpec
+
+
+def _sample_data(n: int = 5000, seed: int = 0) -> pd.DataFrame:
+    """DataFrame sintético com nulos em perc_recebido_cpf e score_risco_final."""
+    rng = np.random.default_rng(seed)
+    total = rng.lognormal(12, 1.5, n)
+    cpf = total * rng.uniform(0, 1, n)
+
+    df = pd.DataFrame({
+        'cnpj': [f"{i:014d}" for i in range(n)],
+        'classificacao_risco': rng.choice(['ALTO', 'MÉDIO-ALTO', 'MÉDIO', 'BAIXO'], n),
+        'regime_tributario': rng.choice(['SIMPLES', 'NORMAL', 'MEI'], n),
+        'uf': rng.choice(['SC', 'PR', 'RS'], n),
+        'municipio': rng.choice([f"MUN{i}" for i in range(40)], n),
+        'score_risco_final': rng.uniform(0, 100, n),
+        'total_geral': total,
+        'total_recebido_cpf': cpf,
+        'total_recebido_cnpj': total - cpf,
+        'perc_recebido_cpf': cpf / total * 100,
+        'qtd_socios_recebendo': rng.integers(0, 8, n).astype(float),
+    })
+
+    df.loc[rng.random(n) < 0.05, 'perc_recebido_cpf'] = np.nan
+    df.loc[rng.random(n) < 0.02, 'score_risco_final'] = np.nan
+    return df
+
+
+# Sequência de interações: sliders de faixa (caminho incremental) e trocas
+# de filtros de lista (recálculo pela máscara)
+SPECS = [
+    FilterSpec(),
+    FilterSpec(score_min=0, score_max=100, perc_cpf_min=0),
+    FilterSpec(score_min=40, score_max=100, perc_cpf_min=0),
+    FilterSpec(score_min=45, score_max=90, perc_cpf_min=0),
+    FilterSpec(score_min=30, score_max=95, perc_cpf_min=20),
+    FilterSpec(score_min=30, score_max=95, perc_cpf_min=20, regime=['SIMPLES']),
+    FilterSpec(score_min=35, score_max=95, perc_cpf_min=10, regime=['SIMPLES']),
+    FilterSpec(score_min=35, score_max=95, perc_cpf_min=10, regime=['SIMPLES'], valor_min=2e5),
+    FilterSpec(score_min=99.9, perc_cpf_min=99.9),
+    FilterSpec(score_min=200),
+    FilterSpec(score_min=10, classificacao=['ALTO', 'MÉDIO-ALTO']),
+]
+
+
+def _assert_kpis_equal(result: dict, expected: dict):
+    assert result.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, float):
+            assert result[key] == pytest.approx(value, rel=1e-9, abs=1e-6, nan_ok=True), key
+        else:
+            assert result[key] == value, key
+
+
+def test_accumulator_matches_filtered_rows_along_interactions():
+    df = _sample_data()
+    acc = KPIAccumulator(KPIRowData(df))
+
+    for spec in SPECS:
+        expected_rows = spec.apply(df)
+        _assert_kpis_equal(acc.update(spec).kpis(), calculate_kpis(expected_rows))
+
+        stats = acc.stats('total_geral')
+        assert stats['count'] == len(expected_rows)
+        if len(expected_rows) > 1:
+            assert stats['mean'] == pytest.approx(expected_rows['total_geral'].mean(), rel=1e-9)
+            assert stats['std'] == pytest.approx(expected_rows['total_geral'].std(), rel=1e-6)
+
+
+def test_slider_moves_touch_only_the_rows_between_bounds():
+    df = _sample_data()
+    acc = KPIAccumulator(KPIRowData(df)).update(FilterSpec(score_min=40, perc_cpf_min=0))
+    assert acc.last_delta_rows == len(df)
+
+    acc.update(FilterSpec(score_min=41, perc_cpf_min=0))
+    moved = int(df['score_risco_final'].between(40, 41, inclusive='left').sum())
+    assert acc.last_delta_rows == moved
+
+    acc.update(FilterSpec(score_min=41, perc_cpf_min=0))
+    assert acc.last_delta_rows == 0
+
+
+def test_periodic_rebuild_keeps_results(monkeypatch):
+    monkeypatch.setattr(accumulator, 'ACCUMULATOR_REBUILD_EVERY', 2)
+    df = _sample_data()
+    acc = KPIAccumulator(KPIRowData(df))
+
+    for low in [10, 20, 30, 40, 50, 60]:
+        spec = FilterSpec(score_min=low, perc_cpf_min=0)
+        _assert_kpis_equal(acc.update(spec).kpis(), calculate_kpis(spec.apply(df)))
+
+
+def test_accumulator_is_shared_per_load_and_reset_on_new_load():
+    store = {}
+    df = mark_snapshot(_sample_data(), 'teste-acumulador-1')
+
+    first = get_kpi_accumulator(df, store)
+    assert get_kpi_accumulator(df, store) is first
+
+    reloaded = mark_snapshot(_sample_data(seed=1), 'teste-acumulador-2')
+    second = get_kpi_accumulator(reloaded, store)
+    assert second is not first and store['kpi_accumulator'] is second
+
+    spec = FilterSpec(score_min=50, perc_cpf_min=0)
+    _assert_kpis_equal(second.update(spec).kpis(), calculate_kpis(spec.apply(reloaded)))
+    assert get_kpi_accumulator(pd.DataFrame(), store) is None
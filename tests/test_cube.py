@@ -0,0 +1,74 @@
+"""
+Testes do cubo de KPIs contra o cálculo direto sobre as linhas filtradas.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analytics.cube import KPICube
+from src.analytics.kpis import calculate_kpis
+from src.database.filters import FilterSpec
+
+
+def _sample_data(n: int = 5000, seed: int = 0) -> pd.DataFrame:
+    """DataFrame sintético com nulos em perc_recebido_cpf e score_risco_final."""
+    rng = np.random.default_rng(seed)
+    total = rng.lognormal(12, 1.5, n)
+    cpf = total * rng.uniform(0, 1, n)
+
+    df = pd.DataFrame({
+        'cnpj': [f"{i:014d}" for i in range(n)],
+        'classificacao_risco': rng.choice(['ALTO', 'MÉDIO-ALTO', 'MÉDIO', 'BAIXO'], n),
+        'regime_tributario': rng.choice(['SIMPLES', 'NORMAL', 'MEI'], n),
+        'uf': rng.choice(['SC', 'PR', 'RS'], n),
+        'municipio': rng.choice([f"MUN{i}" for i in range(40)], n),
+        'nm_cnae1': rng.choice([f"CNAE {i}" for i in range(30)], n),
+        'score_risco_final': rng.uniform(0, 100, n),
+        'total_geral': total,
+        'total_recebido_cpf': cpf,
+        'total_recebido_cnpj': total - cpf,
+        'perc_recebido_cpf': cpf / total * 100,
+        'qtd_socios_recebendo': rng.integers(0, 8, n).astype(float),
+    })
+
+    df.loc[rng.random(n) < 0.05, 'perc_recebido_cpf'] = np.nan
+    df.loc[rng.random(n) < 0.02, 'score_risco_final'] = np.nan
+    return df
+
+
+SPECS = [
+    FilterSpec(perc_cpf_min=0),
+    FilterSpec(score_min=0, score_max=100, perc_cpf_min=0),
+    FilterSpec(score_min=50, perc_cpf_min=0),
+    FilterSpec(perc_cpf_min=30, regime=['SIMPLES']),
+    FilterSpec(score_max=100, classificacao=['ALTO', 'MÉDIO-ALTO']),
+]
+
+
+@pytest.mark.parametrize('spec', SPECS)
+def test_cube_kpis_match_filtered_rows_with_nulls(spec):
+    df = _sample_data()
+    cube = KPICube.build(df)
+    assert cube.supports(spec)
+
+    expected = calculate_kpis(spec.apply(df))
+    result = cube.kpis(spec)
+
+    assert result['total_empresas'] == expected['total_empresas']
+    for key, value in expected.items():
+        if isinstance(value, float):
+            assert result[key] == pytest.approx(value, rel=1e-9, nan_ok=True), key
+        else:
+            assert result[key] == value, key
+
+
+def test_cube_municipios_match_filtered_rows_with_nulls():
+    df = _sample_data()
+    spec = FilterSpec(perc_cpf_min=0)
+    filtered = spec.apply(df)
+
+    result = KPICube.build(df).by_municipio(spec, top_n=len(df)).set_index('municipio')
+    expected = filtered.groupby('municipio')['cnpj'].count()
+
+    assert result['qtd_empresas'].sort_index().tolist() == expected.sort_index().tolist()
@@ -0,0 +1,150 @@
+"""
+Testes de hipótese em lote contra scipy.stats e as correções calculadas à mão.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from src.analytics.hypothesis import REST_LABEL, adjust_p_values, run_group_tests
+
+
+def _sample_data() -> pd.DataFrame:
+    """Grupos de tamanhos e médias diferentes, com empates e nulos."""
+    rng = np.random.default_rng(0)
+    sizes = {'SIMPLES': 400, 'LUCRO PRESUMIDO': 250, 'LUCRO REAL': 120, 'MEI': 60, 'OUTRO': 1}
+    frames = []
+    for shift, (group, size) in enumerate(sizes.items()):
+        values = np.round(rng.lognormal(5 + 0.2 * shift, 1, size), 0)
+        frames.append(pd.DataFrame({'regime_tributario': group, 'total_geral': values}))
+    df = pd.concat(frames, ignore_index=True)
+    df.loc[rng.choice(len(df), 20, replace=False), 'total_geral'] = np.nan
+    df.loc[rng.choice(len(df), 5, replace=False), 'regime_tributario'] = None
+    return df.sample(frac=1, random_state=0).reset_index(drop=True)
+
+
+def _group_values(df: pd.DataFrame, group, rest: bool = False) -> np.ndarray:
+    """Valores válidos de um grupo (ou dos demais grupos com 2+ linhas)."""
+    valid = df.dropna(subset=['regime_tributario', 'total_geral'])
+    sizes = valid['regime_tributario'].value_counts()
+    valid = valid[valid['regime_tributario'].isin(sizes[sizes >= 2].index)]
+    mask = valid['regime_tributario'] == group
+    return valid.loc[~mask if rest else mask, 'total_geral'].to_numpy()
+
+
+def _reference(test: str, a: np.ndarray, b: np.ndarray):
+    if test == 'ttest':
+        return stats.ttest_ind(a, b)
+    return stats.mannwhitneyu(a, b, alternative='two-sided', method='asymptotic')
+
+
+@pytest.mark.parametrize('test', ['ttest', 'mannwhitneyu'])
+def test_pairwise_matches_scipy(test):
+    df = _sample_data()
+    result = run_group_tests(df, 'total_geral', 'regime_tributario', test=test,
+                             mode='pairwise', correction=None)
+
+    # 'OUTRO' tem uma linha só e fica de fora: 4 grupos, 6 pares
+    assert len(result) == 6
+    for row in result.itertuples():
+        a, b = _group_values(df, row.group_a), _group_values(df, row.group_b)
+        expected = _reference(test, a, b)
+        assert (row.n_a, row.n_b) == (len(a), len(b))
+        assert row.mean_a == pytest.approx(a.mean())
+        assert row.statistic == pytest.approx(expected.statistic)
+        assert row.p_value == pytest.approx(expected.pvalue, rel=1e-8, abs=1e-300)
+
+
+@pytest.mark.parametrize('test', ['ttest', 'mannwhitneyu'])
+def test_one_vs_rest_matches_scipy(test):
+    df = _sample_data()
+    result = run_group_tests(df, 'total_geral', 'regime_tributario', test=test,
+                             mode='one_vs_rest', correction=None)
+
+    assert len(result) == 4
+    assert (result['group_b'] == REST_LABEL).all()
+    for row in result.itertuples():
+        a, b = _group_values(df, row.group_a), _group_values(df, row.group_a, rest=True)
+        expected = _reference(test, a, b)
+        assert (row.n_a, row.n_b) == (len(a), len(b))
+        assert row.mean_b == pytest.approx(b.mean())
+        assert row.statistic == pytest.approx(expected.statistic)
+        assert row.p_value == pytest.approx(expected.pvalue, rel=1e-8, abs=1e-300)
+
+
+def _mean_difference(a, b, axis):
+    return np.mean(a, axis=axis) - np.mean(b, axis=axis)
+
+
+@pytest.mark.parametrize('mode', ['pairwise', 'one_vs_rest'])
+def test_permutation_matches_scipy_within_sampling_noise(mode):
+    df = _sample_data()
+    result = run_group_tests(df, 'total_geral', 'regime_tributario', test='permutation',
+                             mode=mode, correction=None, n_permutations=1999, seed=1)
+
+    assert result.attrs['sampled_rows'] is None
+    for row in result.itertuples():
+        a = _group_values(df, row.group_a)
+        if mode == 'pairwise':
+            b = _group_values(df, row.group_b)
+        else:
+            b = _group_values(df, row.group_a, rest=True)
+        expected = stats.permutation_test((a, b), _mean_difference, n_resamples=1999,
+                                          vectorized=True, random_state=0)
+        assert row.statistic == pytest.approx(expected.statistic)
+        # Erro de Monte Carlo de cada p-valor < 0.012 com 1999 permutações
+        assert row.p_value == pytest.approx(expected.pvalue, abs=0.05)
+
+
+def _manual_correction(p_values: np.ndarray, method: str) -> np.ndarray:
+    """Correções pela definição, laço a laço."""
+    m = len(p_values)
+    order = np.argsort(p_values, kind='stable')
+    adjusted = np.empty(m)
+    if method == 'bonferroni':
+        return np.minimum(p_values * m, 1.0)
+    if method == 'holm':
+        running = 0.0
+        for k, i in enumerate(order):
+            running = max(running, (m - k) * p_values[i])
+            adjusted[i] = min(running, 1.0)
+        return adjusted
+    running = 1.0
+    for k in range(m - 1, -1, -1):
+        i = order[k]
+        running = min(running, p_values[i] * m / (k + 1))
+        adjusted[i] = min(running, 1.0)
+    return adjusted
+
+
+@pytest.mark.parametrize('method', ['bonferroni', 'holm', 'fdr_bh'])
+def test_adjust_p_values_matches_definition(method):
+    p_values = np.random.default_rng(3).uniform(0, 0.2, 25)
+    p_values[[4, 9]] = p_values[2]
+
+    np.testing.assert_allclose(adjust_p_values(p_values, method), _manual_correction(p_values, method))
+
+
+def test_adjust_p_values_keeps_nulls_out_of_the_count():
+    p_values = np.array([0.01, np.nan, 0.04])
+    adjusted = adjust_p_values(p_values, 'bonferroni')
+
+    assert np.isnan(adjusted[1])
+    np.testing.assert_allclose(adjusted[[0, 2]], [0.02, 0.08])
+    with pytest.raises(ValueError):
+        adjust_p_values(p_values, 'sidak')
+
+
+def test_result_attrs_and_significance():
+    df = _sample_data()
+    result = run_group_tests(df, 'total_geral', 'regime_tributario', test='ttest',
+                             mode='pairwise', correction='holm', alpha=0.05)
+
+    assert result.attrs['correction'] == 'holm'
+    assert result.attrs['total_rows'] == len(df)
+    assert result.attrs['sampled_rows'] is None
+    np.testing.assert_allclose(result['p_adjusted'],
+                               _manual_correction(result['p_value'].to_numpy(), 'holm'))
+    assert (result['significant'] == (result['p_adjusted'] < 0.05)).all()
+    assert result['p_adjusted'].is_monotonic_increasing
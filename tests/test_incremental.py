@@ -0,0 +1,103 @@
+"""
+Testes da sincronização incremental contra a leitura completa da tabela.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import sqlalchemy as sa
+
+from src.database import incremental
+from src.database.incremental import partition_key, sync_table_incremental
+
+TABLE = 'pagamentos'
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.setitem(incremental.TABLES, 'pagamentos_cpf', TABLE)
+    monkeypatch.setitem(incremental.SNAPSHOT_CONFIG, 'dir', str(tmp_path / 'snapshots'))
+    monkeypatch.setitem(incremental.SNAPSHOT_CONFIG, 'enabled', True)
+
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    rng = np.random.default_rng(0)
+    referencias = [202401, 202402, 202403, None]
+    rows = [
+        {'cnpj': f"{i:014d}", 'cpf_socio': f"{i % 7:011d}", 'referencia': ref,
+         'vl_total': round(float(rng.uniform(0, 1000)), 2)}
+        for ref in referencias for i in range(25)
+    ]
+    with engine.begin() as conn:
+        conn.execute(sa.text(f"CREATE TABLE {TABLE} (cnpj TEXT, cpf_socio TEXT, "
+                             f"referencia INTEGER, vl_total REAL)"))
+        conn.execute(sa.text(f"INSERT INTO {TABLE} VALUES (:cnpj, :cpf_socio, :referencia, :vl_total)"),
+                     rows)
+    return engine
+
+
+def _execute(engine, sql):
+    with engine.begin() as conn:
+        conn.execute(sa.text(sql))
+
+
+def _assert_matches_table(engine, merged):
+    expected = pd.read_sql(f"SELECT * FROM {TABLE}", engine)
+    keys = ['referencia', 'cnpj', 'vl_total']
+
+    def normalized(df):
+        df = df[keys].copy()
+        df['referencia'] = df['referencia'].map(partition_key)
+        return df.sort_values(keys).reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(normalized(merged), normalized(expected), check_dtype=False)
+
+    # Partições em ordem, nulos no fim
+    column = merged['referencia']
+    n_valid = int(column.notna().sum())
+    assert column.iloc[:n_valid].is_monotonic_increasing
+    assert column.iloc[n_valid:].isna().all()
+
+
+def test_partition_key_normalizes_integral_floats_and_nulls():
+    assert partition_key(202401) == partition_key(202401.0) == partition_key(np.float64(202401)) == '202401'
+    assert partition_key(None) == partition_key(np.nan) == partition_key(pd.NA) == incremental.NULL_PARTITION
+    assert partition_key('2024-01') == '2024-01'
+
+
+def test_unchanged_table_fetches_nothing(engine):
+    first, report = sync_table_incremental(engine, 'pagamentos_cpf')
+    assert report['full_reload'] and report['rows_fetched'] == 100
+    _assert_matches_table(engine, first)
+
+    second, report = sync_table_incremental(engine, 'pagamentos_cpf')
+    assert report['rows_fetched'] == 0 and not report['alteradas']
+    assert len(second) == 100
+
+
+def test_altered_new_and_removed_partitions_match_table(engine):
+    sync_table_incremental(engine, 'pagamentos_cpf')
+
+    _execute(engine, f"UPDATE {TABLE} SET vl_total = vl_total + 1 WHERE referencia = 202402")
+    _execute(engine, f"UPDATE {TABLE} SET vl_total = vl_total + 1 WHERE referencia IS NULL")
+    _execute(engine, f"DELETE FROM {TABLE} WHERE referencia = 202401")
+    _execute(engine, f"INSERT INTO {TABLE} SELECT cnpj, cpf_socio, 202312, vl_total FROM {TABLE} "
+                     f"WHERE referencia = 202403")
+    _execute(engine, f"INSERT INTO {TABLE} SELECT cnpj, cpf_socio, 202404, vl_total FROM {TABLE} "
+                     f"WHERE referencia = 202403")
+
+    merged, report = sync_table_incremental(engine, 'pagamentos_cpf')
+
+    assert report['novas'] == ['202312', '202404']
+    assert report['alteradas'] == sorted(['202402', incremental.NULL_PARTITION])
+    assert report['removidas'] == ['202401']
+    assert report['rows_fetched'] == 100
+    _assert_matches_table(engine, merged)
+
+
+def test_partition_checksum_ignores_sub_cent_noise(engine):
+    sync_table_incremental(engine, 'pagamentos_cpf')
+    _execute(engine, f"UPDATE {TABLE} SET vl_total = vl_total + 0.0000001 WHERE referencia = 202402")
+
+    _, report = sync_table_incremental(engine, 'pagamentos_cpf')
+
+    assert report['alteradas'] == []
@@ -0,0 +1,135 @@
+"""
+Testes do cache de resultados Arrow IPC contra a leitura direta do banco.
+"""
+
+import os
+
+import pyarrow as pa
+import pytest
+import sqlalchemy as sa
+
+from src.database import result_cache
+from src.database.result_cache import (
+    ResultCache, cached_read_arrow, make_cache_key, set_result_cache,
+)
+
+QUERY = "SELECT cnpj, total_geral FROM empresas ORDER BY cnpj"
+
+
+def _table(n: int = 10, offset: int = 0) -> pa.Table:
+    return pa.table({'cnpj': [f"{i:014d}" for i in range(n)],
+                     'total_geral': [float(i + offset) for i in range(n)]})
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(tmp_path / 'results', max_bytes=10 * 1024**2, max_entries=3)
+
+
+def test_cache_key_ignores_whitespace_but_not_params_or_schema():
+    key = make_cache_key(QUERY)
+
+    assert make_cache_key(f"  {QUERY.replace(' ', chr(10))} ;") == key
+    assert make_cache_key(QUERY, {'uf': 'SC'}) != key
+    assert make_cache_key(QUERY, schema={'total_geral': pa.float32()}) != key
+
+
+def test_put_then_get_round_trip(cache):
+    table = _table()
+    cache.put('a', table, query=QUERY)
+
+    cached = cache.get('a')
+    assert cached.equals(table)
+    assert cache.get('ausente') is None
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['writes'], stats['entries']) == (1, 1, 1, 1)
+
+
+def test_expired_entry_is_removed(cache):
+    cache.put('a', _table(), ttl=-1)
+
+    assert cache.get('a') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_fingerprint_mismatch_invalidates_entry(cache):
+    cache.put('a', _table(), fingerprints={'empresas': 'v1'})
+
+    assert cache.get('a', {'empresas': 'v1'}) is not None
+    assert cache.get('a', {'empresas': 'v2'}) is None
+    assert cache.get('a', {'empresas': 'v1'}) is None
+    assert cache.stats()['stale'] == 1
+
+
+def test_eviction_removes_least_recently_used(cache):
+    for age, key in enumerate(['a', 'b', 'c']):
+        cache.put(key, _table())
+        os.utime(cache._path(key), (1000 + age, 1000 + age))
+
+    # Leitura renova 'a'; 'b' passa a ser a menos usada
+    assert cache.get('a') is not None
+    cache.put('d', _table())
+
+    assert cache.get('b') is None
+    assert all(cache.get(key) is not None for key in ['a', 'c', 'd'])
+    assert cache.stats()['evictions'] == 1
+
+
+def test_eviction_respects_max_bytes(tmp_path):
+    cache = ResultCache(tmp_path / 'results', max_bytes=10 * 1024**2)
+    entry_bytes = cache.put('a', _table(1000)).stat().st_size
+    cache.max_bytes = entry_bytes + entry_bytes // 2
+
+    os.utime(cache._path('a'), (1000, 1000))
+    cache.put('b', _table(1000))
+
+    assert cache.get('a') is None and cache.get('b') is not None
+    assert cache.stats()['bytes'] <= cache.max_bytes
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.setitem(result_cache.RESULT_CACHE_CONFIG, 'enabled', True)
+    set_result_cache(ResultCache(tmp_path / 'results', max_bytes=10 * 1024**2))
+
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    with engine.begin() as conn:
+        conn.execute(sa.text("CREATE TABLE empresas (cnpj TEXT, total_geral REAL)"))
+        conn.execute(sa.text("INSERT INTO empresas VALUES (:cnpj, :total_geral)"),
+                     _table().to_pylist())
+    yield engine
+    set_result_cache(None)
+
+
+def _update_table(engine):
+    with engine.begin() as conn:
+        conn.execute(sa.text("UPDATE empresas SET total_geral = total_geral + 100"))
+
+
+def test_cached_read_follows_source_fingerprint(engine, monkeypatch):
+    version = {'empresas': 'v1'}
+    monkeypatch.setattr(result_cache, 'get_query_fingerprints', lambda source, query: dict(version))
+
+    first = cached_read_arrow(engine, QUERY)
+    _update_table(engine)
+    second = cached_read_arrow(engine, QUERY)
+
+    # Mesma impressão digital: resultado do cache, sem reler o banco
+    assert first.equals(second) and first.equals(_table())
+    assert result_cache.get_result_cache().stats()['hits'] == 1
+
+    version['empresas'] = 'v2'
+    third = cached_read_arrow(engine, QUERY)
+    assert third.column('total_geral').to_pylist() == _table(offset=100).column('total_geral').to_pylist()
+
+
+def test_cached_read_without_fingerprint_uses_ttl(engine, monkeypatch):
+    monkeypatch.setattr(result_cache, 'get_query_fingerprints', lambda source, query: None)
+
+    cached_read_arrow(engine, QUERY, ttl=-1)
+    _update_table(engine)
+    result = cached_read_arrow(engine, QUERY, ttl=-1)
+
+    assert result.column('total_geral').to_pylist() == _table(offset=100).column('total_geral').to_pylist()
+    assert result_cache.get_result_cache().stats()['hits'] == 0
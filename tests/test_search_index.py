@@ -0,0 +1,71 @@
+"""
+Testes do índice de busca contra a busca direta nas colunas.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.database.search_index import SearchIndex, normalize_search_text
+
+
+def _sample_data() -> pd.DataFrame:
+    """Nomes com o termo no início, repetido em palavras seguintes e no meio."""
+    names = (['SILVA SILVA LTDA'] * 60 + ['JOAO SILVA ME'] * 40 + ['ASILVAX'] * 40
+             + ['COMÉRCIO DE AÇÚCAR LTDA'] * 10 + ['PADARIA CENTRAL'] * 30 + [None] * 5)
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'cnpj': [f"{value:014d}" for value in rng.integers(10**12, 10**14, len(names))],
+        'nm_razao_social': names,
+    })
+
+
+def _expected(df: pd.DataFrame, term: str) -> set:
+    """Linhas com o termo em qualquer posição da razão social ou do CNPJ."""
+    normalized = normalize_search_text(term)
+    names = df['nm_razao_social'].map(lambda v: normalize_search_text(v) if isinstance(v, str) else '')
+    mask = names.str.contains(normalized, regex=False)
+    digits = ''.join(ch for ch in term if ch.isdigit())
+    if digits and digits == term.strip():
+        mask |= df['cnpj'].str.contains(digits, regex=False)
+    return set(np.flatnonzero(mask.to_numpy()))
+
+
+@pytest.mark.parametrize('term', ['silva', 'SIL', 'acucar', 'central', 'xyz'])
+def test_search_matches_direct_scan(term):
+    df = _sample_data()
+    result = SearchIndex(df).search(term)
+
+    assert len(result) == len(set(result.tolist()))
+    assert set(result.tolist()) == _expected(df, term)
+
+
+@pytest.mark.parametrize('limit', [1, 59, 60, 100, 101, 139, 140, 500])
+def test_search_limit_returns_distinct_rows_up_to_limit(limit):
+    df = _sample_data()
+    index = SearchIndex(df)
+    full = index.search('silva')
+    limited = index.search('silva', limit=limit)
+
+    assert len(full) == 140
+    assert len(limited) == min(limit, len(full))
+    assert limited.tolist() == full[:limit].tolist()
+
+
+def test_search_ranks_name_prefix_before_word_prefix_and_substring():
+    df = _sample_data()
+    names = df['nm_razao_social'].to_numpy()[SearchIndex(df).search('silva')]
+
+    assert list(names[:60]) == ['SILVA SILVA LTDA'] * 60
+    assert list(names[60:100]) == ['JOAO SILVA ME'] * 40
+    assert list(names[100:]) == ['ASILVAX'] * 40
+
+
+def test_search_cnpj_prefix_and_substring():
+    df = _sample_data()
+    index = SearchIndex(df)
+    cnpj = df['cnpj'].iloc[7]
+
+    assert index.search(cnpj[:6])[0] in set(np.flatnonzero(df['cnpj'].str.startswith(cnpj[:6])))
+    assert 7 in index.search(cnpj[5:11]).tolist()
+    assert set(index.search(cnpj[5:11]).tolist()) == _expected(df, cnpj[5:11])
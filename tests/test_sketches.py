@@ -0,0 +1,96 @@
+"""
+Testes dos resumos de quantis contra os quantis exatos (numpy/pandas).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analytics.sketches import GroupedQuantileSketches, QuantileSketch, sketch_stream
+
+QUANTILES = [0.0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0]
+
+
+def _sample_values(n: int, seed: int = 0) -> np.ndarray:
+    """Valores assimétricos com empates, como os de pagamentos."""
+    rng = np.random.default_rng(seed)
+    values = rng.lognormal(8, 2, n)
+    values[rng.random(n) < 0.1] = 0.0
+    return np.round(values, 2)
+
+
+def _assert_within_rank_error(sketch: QuantileSketch, values: np.ndarray) -> None:
+    """A posição de cada quantil estimado fica dentro de rank_error do pedido."""
+    ordered = np.sort(values)
+    n = len(ordered)
+    tolerance = sketch.rank_error + 1.0 / n
+
+    for q, estimate in zip(QUANTILES, sketch.quantiles(QUANTILES)):
+        low = np.searchsorted(ordered, estimate, side='left') / n
+        high = np.searchsorted(ordered, estimate, side='right') / n
+        assert low - tolerance <= q <= high + tolerance, (q, estimate, low, high)
+
+
+def test_small_input_is_exact():
+    values = _sample_values(500)
+    sketch = QuantileSketch.from_values(values, size=1000)
+
+    assert sketch.rank_error == 0.0
+    np.testing.assert_allclose(sketch.quantiles(QUANTILES), np.quantile(values, QUANTILES))
+
+
+@pytest.mark.parametrize('n,size', [(10_000, 200), (200_000, 500), (200_000, 2000)])
+def test_quantiles_within_rank_error(n, size):
+    values = _sample_values(n)
+    sketch = QuantileSketch.from_values(values, size=size)
+
+    assert sketch.count == n
+    assert sketch.quantile(0.0) == values.min() and sketch.quantile(1.0) == values.max()
+    assert sketch.rank_error < 0.05
+    _assert_within_rank_error(sketch, values)
+
+
+def test_merge_of_chunks_matches_exact_quantiles():
+    values = _sample_values(100_000)
+    merged = QuantileSketch(size=300)
+    for chunk in np.array_split(values, 17):
+        merged.merge(QuantileSketch.from_values(chunk, size=300))
+
+    assert merged.count == len(values)
+    _assert_within_rank_error(merged, values)
+
+
+def test_nulls_are_ignored():
+    values = pd.Series([1.0, None, 3.0, np.nan, 2.0])
+    sketch = QuantileSketch.from_values(values)
+
+    assert sketch.count == 3
+    assert sketch.quantile(0.5) == 2.0
+
+
+def test_to_dict_round_trip():
+    sketch = QuantileSketch.from_values(_sample_values(50_000), size=300)
+    restored = QuantileSketch.from_dict(sketch.to_dict())
+
+    assert restored.count == sketch.count
+    assert restored.rank_error == sketch.rank_error
+    np.testing.assert_array_equal(restored.quantiles(QUANTILES), sketch.quantiles(QUANTILES))
+
+
+def test_grouped_stream_matches_pandas_quantiles_per_group():
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({
+        'referencia': rng.choice([202401, 202402, 202403], 30_000),
+        'vl_total': _sample_values(30_000),
+    })
+    chunks = [df.iloc[i:i + 4000] for i in range(0, len(df), 4000)]
+
+    grouped = sketch_stream(chunks, 'vl_total', 'referencia', size=400)
+    grouped = GroupedQuantileSketches.from_dict(grouped.to_dict())
+    result = grouped.quantiles().set_index('grupo')
+    counts = df.groupby('referencia')['vl_total'].size()
+
+    assert sorted(result.index) == sorted(counts.index)
+    for group, sketch in grouped.sketches.items():
+        assert result.loc[group, 'count'] == counts[group]
+        _assert_within_rank_error(sketch, df.loc[df['referencia'] == group, 'vl_total'].to_numpy())